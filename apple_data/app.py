@@ -1,7 +1,11 @@
 from fastapi import FastAPI
 from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
 import os
+import sys
+
+# 저장소 루트의 공용 모듈 (사전 압축 정적 파일 서빙)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from static_assets import PrecompressedStaticFiles
 
 app = FastAPI(title="Soil Suitability Map")
 
@@ -20,8 +24,9 @@ def get_soil_map():
         return {"error": "index.html not found"}
     return FileResponse(index_path, media_type="text/html")
 
-# 정적 파일 서빙 (CSS, JS)
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+# 정적 파일 서빙 (CSS, JS, 경계 파일)
+# static/assets 의 해시 이름 경계 파일은 .gz/.br 협상 + immutable 캐시 (python ../static_assets.py static 으로 빌드)
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
 
 if __name__ == "__main__":
     import uvicorn
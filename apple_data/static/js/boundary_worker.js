@@ -0,0 +1,53 @@
+// 경계 GeoJSON Web Worker
+// 파일의 ETag 가 같으면 IndexedDB 에 저장된 것을 쓰고, 아니면 내려받아 파싱한 뒤 저장한다.
+// static_assets.py 로 빌드한 해시 이름 자산이 있으면 그 URL 을 버전으로 쓰고 압축본을 받는다 (HEAD 요청 없음).
+// 수 MB 짜리 JSON 파싱이 메인 스레드를 멈추지 않도록 워커에서 처리한다.
+importScripts('/static/js/data_cache.js');
+
+let assetManifest = null;
+
+// 경계 파일의 해시 이름 자산 URL (빌드하지 않았으면 null)
+function assetUrl(url) {
+  if (!assetManifest) {
+    assetManifest = fetch('/static/assets/manifest.json', { cache: 'no-cache' })
+      .then(r => r.ok ? r.json() : {})
+      .catch(() => ({}));
+  }
+  return assetManifest.then(manifest => {
+    const entry = manifest[url.replace(/^\/static\//, '')];
+    return entry ? `/static/assets/${entry.file}` : null;
+  });
+}
+
+async function fileVersion(url) {
+  const head = await fetch(url, { method: 'HEAD' });
+  if (!head.ok) {
+    throw new Error(`HTTP ${head.status}`);
+  }
+  return head.headers.get('ETag') || head.headers.get('Last-Modified') || '';
+}
+
+async function loadBoundary(url) {
+  const asset = await assetUrl(url);
+  const etag = asset || await fileVersion(url);
+
+  const cached = await cacheGet(`boundary:${url}`, etag);
+  if (cached) {
+    return cached;
+  }
+
+  const response = await fetch(asset || url);
+  if (!response.ok) {
+    throw new Error(`HTTP ${response.status}`);
+  }
+  const geojson = await response.json();
+  cachePut(`boundary:${url}`, etag, geojson);
+  return geojson;
+}
+
+self.onmessage = event => {
+  const { id, url } = event.data;
+  loadBoundary(url)
+    .then(geojson => self.postMessage({ id: id, geojson: geojson }))
+    .catch(err => self.postMessage({ id: id, error: String(err) }));
+};
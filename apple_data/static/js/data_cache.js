@@ -0,0 +1,60 @@
+// IndexedDB 캐시 (경계 GeoJSON)
+// 항목은 { key, version, value } 로 저장하고, version(ETag 또는 데이터 버전)이 다르면 사용하지 않는다.
+// boundary_worker.js 에서 importScripts 로 사용한다.
+
+const CACHE_DB_NAME = 'apple-map-cache';
+const CACHE_STORE = 'entries';
+
+let cacheDbPromise = null;
+
+function openCacheDb() {
+  if (!cacheDbPromise) {
+    cacheDbPromise = new Promise((resolve, reject) => {
+      if (typeof indexedDB === 'undefined') {
+        reject(new Error('IndexedDB 를 사용할 수 없습니다'));
+        return;
+      }
+      const request = indexedDB.open(CACHE_DB_NAME, 1);
+      request.onupgradeneeded = () => {
+        request.result.createObjectStore(CACHE_STORE, { keyPath: 'key' });
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => reject(request.error);
+    });
+  }
+  return cacheDbPromise;
+}
+
+// key 의 값 (없거나 version 이 다르면 null, IndexedDB 오류도 null)
+function cacheGet(key, version) {
+  return openCacheDb().then(db => new Promise(resolve => {
+    const request = db.transaction(CACHE_STORE, 'readonly').objectStore(CACHE_STORE).get(key);
+    request.onsuccess = () => {
+      const entry = request.result;
+      resolve(entry && entry.version === version ? entry.value : null);
+    };
+    request.onerror = () => resolve(null);
+  })).catch(() => null);
+}
+
+// 값 저장 (같은 prefix 로 시작하고 version 이 다른 이전 항목은 함께 삭제)
+function cachePut(key, version, value, prefix) {
+  return openCacheDb().then(db => new Promise(resolve => {
+    const tx = db.transaction(CACHE_STORE, 'readwrite');
+    const store = tx.objectStore(CACHE_STORE);
+    if (prefix) {
+      store.openCursor().onsuccess = event => {
+        const cursor = event.target.result;
+        if (!cursor) return;
+        if (cursor.key.startsWith(prefix) && cursor.value.version !== version) {
+          cursor.delete();
+        }
+        cursor.continue();
+      };
+    }
+    store.put({ key: key, version: version, value: value, savedAt: Date.now() });
+    tx.oncomplete = () => resolve(true);
+    tx.onerror = () => resolve(false);
+    tx.onabort = () => resolve(false);
+  })).catch(() => false);
+}
@@ -15,6 +15,29 @@ let currentBoundaryLayer = null;
 let currentLevel = null;
 let boundaryCache = {}; // GeoJSON 캐시
 
+// 경계 파일 로드/파싱은 Web Worker 에서 처리 (IndexedDB 캐시 사용)
+const boundaryWorker = window.Worker ? new Worker('/static/js/boundary_worker.js') : null;
+const workerRequests = {};
+let workerRequestId = 0;
+
+if (boundaryWorker) {
+  boundaryWorker.onmessage = (event) => {
+    const pending = workerRequests[event.data.id];
+    delete workerRequests[event.data.id];
+    if (pending) {
+      event.data.error ? pending.reject(new Error(event.data.error)) : pending.resolve(event.data.geojson);
+    }
+  };
+}
+
+function loadInWorker(url) {
+  return new Promise((resolve, reject) => {
+    const id = ++workerRequestId;
+    workerRequests[id] = { resolve, reject };
+    boundaryWorker.postMessage({ id, url });
+  });
+}
+
 // GeoJSON 파일 로드 함수
 async function loadGeoJSON(url) {
   if (boundaryCache[url]) {
@@ -22,11 +45,16 @@ async function loadGeoJSON(url) {
   }
 
   try {
-    const response = await fetch(url);
-    if (!response.ok) {
-      throw new Error(`HTTP ${response.status}`);
+    let geojson;
+    if (boundaryWorker) {
+      geojson = await loadInWorker(url);
+    } else {
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      geojson = await response.json();
     }
-    const geojson = await response.json();
     boundaryCache[url] = geojson;
     return geojson;
   } catch (error) {
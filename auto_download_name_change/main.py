@@ -1,4 +1,5 @@
 import os
+import sys
 import csv
 import requests
 import xml.etree.ElementTree as ET
@@ -8,9 +9,15 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 from urllib.parse import quote
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pnu_registry import PnuRegistry  # 공용 법정동코드 레지스트리 (저장소 루트)
+from response_cache import ResponseCache  # API 원본 응답 캐시 (저장소 루트)
+from snapshot_store import SnapshotError, publish_collector_outputs
+from bulk_collect import DEFAULT_PAGE_SIZE, BulkCollector, parse_page  # 접두 코드 + 페이지 일괄 수집
+
 
 class SoilAPICollector:
-    def __init__(self):
+    def __init__(self, bulk=True, page_size=DEFAULT_PAGE_SIZE):
         # 인증키
         self.SERVICE_KEY = "fOnrt/nVSCnLI05XSbmySE3F11nxviUIhefxXDnVGGbJusKK04jb0OIAkpbgUuRyca9HwxTfHbi1GiN4UyL/DQ=="
 
@@ -51,77 +58,96 @@ class SoilAPICollector:
              "http://apis.data.go.kr/1390802/SoilEnviron/SoilCharacStat/V2/getSoilFieldGradSpecificInfo", "2-10"]
         ]
 
+        # 법정동코드 레지스트리 (read_pnu_codes 에서 로드)
+        self.registry = None
+
+        # API 원본 응답 캐시 (SOIL_CACHE_MODE=replay 또는 cache-only 로 API 호출 없이 다시 만들 수 있음)
+        self.http_cache = ResponseCache.from_env()
+
         # 스레드 안전을 위한 락
         self.print_lock = Lock()
 
+        # 일일 호출 한도 초과 응답을 받으면 True (일괄 수집을 멈춤)
+        self.quota_exhausted = False
+
+        # 접두 코드(시군구) + 페이지(numOfRows/pageNo) 일괄 수집 사용 여부 (False 면 코드별 호출만)
+        self.bulk = bulk
+        self.page_size = page_size
+
     def read_pnu_codes(self, filename="pnu.csv"):
         """PNU CSV 파일에서 행정코드를 읽어오는 함수"""
-        pnu_codes = []
         try:
-            # UTF-8로 먼저 시도
-            with open(filename, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                next(reader)  # 헤더 건너뛰기
-                for row in reader:
-                    if len(row) > 0:
-                        pnu_codes.append(row[0])  # 첫 번째 열의 행정코드
-        except UnicodeDecodeError:
-            # CP1252로 재시도
-            with open(filename, 'r', encoding='cp1252') as f:
-                reader = csv.reader(f)
-                next(reader)  # 헤더 건너뛰기
-                for row in reader:
-                    if len(row) > 0:
-                        pnu_codes.append(row[0])  # 첫 번째 열의 행정코드
+            self.registry = PnuRegistry.load(filename)
         except FileNotFoundError:
             print(f"파일 {filename}을 찾을 수 없습니다.")
             return []
+        except Exception as e:
+            print(f"파일 읽기 오류: {e}")
+            return []
 
-        return pnu_codes
+        return self.registry.code_strings()
 
-    def get_api_data(self, url, stdg_cd):
-        """개별 API를 호출하여 데이터를 가져오는 함수"""
-        params = {
-            'serviceKey': self.SERVICE_KEY,
-            'STDG_CD': stdg_cd
-        }
+    def wait_before_request(self):
+        """API 호출 전 랜덤 대기 (1.0 ~ 1.1초, 캐시에서 가져올 때는 기다리지 않음)"""
+        time.sleep(random.uniform(1.0, 1.1))
 
+    def fetch_content(self, url, params, label):
+        """응답 캐시 우선으로 응답 본문을 가져오는 함수 (요청 실패나 cache-only 모드의 캐시 없음은 None)"""
         try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-
-            # XML 파싱
-            root = ET.fromstring(response.content)
-
-            # 결과 코드 확인
-            result_code = root.find('.//result_Code')
-            result_msg = root.find('.//result_Msg')
-
-            if result_code is not None and result_code.text == '200':
-                # 성공적으로 데이터를 받은 경우
-                item = root.find('.//item')
-                if item is not None:
-                    data = {}
-                    for child in item:
-                        data[child.tag] = child.text
-                    return data
-                else:
-                    return None
-            else:
-                error_msg = result_msg.text if result_msg is not None else "알 수 없는 오류"
-                with self.print_lock:
-                    print(f"API 오류 - STDG_CD: {stdg_cd}, 오류: {error_msg}")
-                return None
-
+            return self.http_cache.fetch(url, dict(params, serviceKey=self.SERVICE_KEY), timeout=30,
+                                         throttle=self.wait_before_request)
         except requests.exceptions.RequestException as e:
             with self.print_lock:
-                print(f"요청 오류 - STDG_CD: {stdg_cd}, 오류: {e}")
+                print(f"요청 오류 - {label}, 오류: {e}")
             return None
+
+    def get_api_data(self, url, stdg_cd):
+        """개별 API를 호출하여 데이터를 가져오는 함수"""
+        content = self.fetch_content(url, {'STDG_CD': stdg_cd}, f"STDG_CD: {stdg_cd}")
+        return self.parse_response(content, stdg_cd) if content is not None else None
+
+    def parse_page(self, content, label):
+        """API 응답(XML)을 Page 로 변환하는 함수 (XML 오류면 None, API 오류는 출력만 하고 그대로 반환)"""
+        if b'LIMITED_NUMBER_OF_SERVICE_REQUESTS' in content:
+            self.quota_exhausted = True  # 일일 한도 초과 (게이트웨이 응답)
+
+        try:
+            page = parse_page(content)
         except ET.ParseError as e:
             with self.print_lock:
-                print(f"XML 파싱 오류 - STDG_CD: {stdg_cd}, 오류: {e}")
+                print(f"XML 파싱 오류 - {label}, 오류: {e}")
             return None
 
+        if page.result_code != '200':
+            with self.print_lock:
+                print(f"API 오류 - {label}, 오류: {page.message or '알 수 없는 오류'}")
+        return page
+
+    def parse_response(self, content, stdg_cd):
+        """API 응답(XML)을 딕셔너리로 변환하는 함수 (데이터가 없거나 오류면 None)"""
+        page = self.parse_page(content, f"STDG_CD: {stdg_cd}")
+        if page is None or page.result_code != '200' or not page.items:
+            return None
+        return page.items[0]
+
+    def bulk_collector(self, url, cached_only=False):
+        """엔드포인트의 일괄 수집기 (cached_only 면 API 를 호출하지 않고 응답 캐시만 읽음)"""
+        def fetch_page(params):
+            label = f"STDG_CD: {params['STDG_CD']} {params['pageNo']}쪽"
+            if cached_only:
+                content = self.http_cache.lookup(url, params, fresh_only=False)
+            else:
+                content = self.fetch_content(url, params, label)
+            return self.parse_page(content, label) if content is not None else None
+
+        def fetch_code(stdg_cd):
+            if not cached_only:
+                return self.get_api_data(url, stdg_cd)
+            content = self.http_cache.lookup(url, {'STDG_CD': stdg_cd}, fresh_only=False)
+            return self.parse_response(content, stdg_cd) if content is not None else None
+
+        return BulkCollector(self.registry, fetch_page, fetch_code, page_size=self.page_size)
+
     def save_to_csv(self, data_list, filename):
         """데이터를 CSV 파일로 저장하는 함수"""
         if not data_list:
@@ -161,6 +187,9 @@ class SoilAPICollector:
         with self.print_lock:
             print(f"\n=== {api_name} 수집 시작 ===")
 
+        if self.bulk:
+            return self.collect_bulk_api_data(api_config, pnu_codes)
+
         collected_data = []
         successful_count = 0
 
@@ -179,10 +208,6 @@ class SoilAPICollector:
                 collected_data.append(data)
                 successful_count += 1
 
-            # 랜덤 대기 시간 (1.0 ~ 1.1초)
-            wait_time = random.uniform(1.0, 1.1)
-            time.sleep(wait_time)
-
         # 결과 저장
         self.save_to_csv(collected_data, file_prefix)
 
@@ -196,6 +221,38 @@ class SoilAPICollector:
             'failed': len(pnu_codes) - successful_count
         }
 
+    def collect_bulk_api_data(self, api_config, pnu_codes):
+        """접두 코드별 페이지로 한꺼번에 받고, 레지스트리 대비 빠진 코드만 개별 호출하는 함수"""
+        group, seq, api_name, url, file_prefix = api_config
+
+        def progress(stage, done, total):
+            if done == 1 or done % 100 == 0 or done == total:
+                with self.print_lock:
+                    print(f"{api_name}: {'접두 코드' if stage == 'prefix' else '누락 코드'} {done}/{total} 진행 중...")
+
+        collector = self.bulk_collector(url)
+        result = collector.collect(stop=lambda: self.quota_exhausted, progress=progress)
+        self.save_to_csv(list(result.items.values()), file_prefix)
+
+        with self.print_lock:
+            print(f"=== {api_name} 완료: {len(result.items)}/{len(pnu_codes)}건 수집 "
+                  f"(적용률 {collector.coverage(result) * 100:.1f}%, "
+                  f"접두 코드 {result.prefixes}개 {result.pages}쪽, 누락 코드 개별 {result.gap_requests}건, "
+                  f"접두 조회 {'지원' if result.supported else '미지원'}) ===")
+
+        return {
+            'api_name': api_name,
+            'total': len(pnu_codes),
+            'successful': len(result.items),
+            'failed': len(pnu_codes) - len(result.items),
+            'bulk': {
+                'supported': result.supported,
+                'prefixes': result.prefixes,
+                'pages': result.pages,
+                'gap_requests': result.gap_requests
+            }
+        }
+
     def collect_all_data_parallel(self, max_workers=5):
         """모든 API 데이터를 병렬로 수집하는 메인 함수"""
         print("PNU 코드를 읽어오는 중...")
@@ -207,11 +264,15 @@ class SoilAPICollector:
 
         print(f"총 {len(pnu_codes)}개의 PNU 코드를 읽어왔습니다.")
         print(f"총 {len(self.api_configs)}개 API를 병렬로 처리합니다.")
-        print(f"예상 소요 시간: 약 {len(pnu_codes) * 1.05 / 60:.1f}분")
+        if self.bulk:
+            print(f"접두 코드 일괄 수집 (한 쪽에 {self.page_size}건, 빠진 코드만 개별 호출)")
+        else:
+            print(f"예상 소요 시간: 약 {len(pnu_codes) * 1.05 / 60:.1f}분")
         print("=" * 60)
 
         # 결과 저장용
         results = []
+        started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
 
         # ThreadPoolExecutor를 사용한 병렬 처리
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
@@ -245,10 +306,30 @@ class SoilAPICollector:
         print(f"\n전체 통계: {total_successful}/{total_requests}건 성공 "
               f"(성공률: {total_successful / total_requests * 100:.1f}%)")
         print("모든 데이터 수집이 완료되었습니다!")
+        print(self.http_cache.summary())
+        if self.http_cache.mode == 'online':
+            self.http_cache.prune()  # 용량 초과분 정리
+
+        # 수집 결과를 검증해 스냅샷으로 발행 (앱은 snapshots/CURRENT 를 읽음)
+        try:
+            publish_collector_outputs(
+                [config[4] for config in self.api_configs],
+                run_info={
+                    'collector': os.path.basename(os.path.dirname(os.path.abspath(__file__))),
+                    'started_at': started_at,
+                    'results': results
+                },
+                registry=self.registry
+            )
+        except SnapshotError as e:
+            print(f"스냅샷 발행 실패 (기존 스냅샷 유지): {e}")
 
 
 def main():
-    collector = SoilAPICollector()
+    # 사용법: python main.py [per-code]
+    #   (없음)    접두 코드 페이지로 일괄 수집, 빠진 코드만 개별 호출
+    #   per-code  전체 코드에 대해 코드별로 수집 (이전 방식)
+    collector = SoilAPICollector(bulk=not (len(sys.argv) > 1 and sys.argv[1] == "per-code"))
 
     # 병렬 처리 실행 (최대 5개 스레드 사용)
     # 더 많은 스레드를 사용하고 싶다면 max_workers 값을 조정하세요
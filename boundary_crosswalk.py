@@ -0,0 +1,150 @@
+"""경계 GeoJSON 코드 ↔ 법정동코드(stdg_Cd) 대응표
+
+경계 파일의 CTPRVN_CD(시도 2자리) / SIG_CD(시군구 5자리) / EMD_CD(읍면동 8자리)를
+10자리 현행 법정동코드로 바꾸고, 데이터의 stdg_Cd 가 어느 경계 피처에 들어가는지(join_key)를 미리 계산해 둔다.
+지역 이름 문자열 비교(중구/동구처럼 여러 시도에 있는 이름이 섞임) 대신 코드 해시 조회 한 번으로 조인한다.
+
+    경계 코드 42110 (강원도 춘천시, 경계 파일 기준)  ─ pnu.csv 변경전 코드 ─→ 5111000000
+    데이터 코드 4119200000 (부천시원미구)            ─ 상위 구역 ─→ 4119000000 (경계 피처 부천시)
+
+상위 구역은 코드 자릿수로 찾는다 (리 → 읍면동 → 시군구 → 일반구가 있는 시 → 시도).
+일반구는 시와 같은 시군구 자릿수라서 5번째 자리를 0 으로 바꾼 코드(41192 → 41190)가 시가 된다.
+
+경계 파일과 pnu.csv 의 기준 시점이 달라 코드가 바뀐 경우는 PnuRegistry.successor 로 현행 코드에 맞춘다.
+"""
+import json
+import os
+import threading
+
+from pnu_registry import LEVEL_DIGITS, LEVEL_NAMES, code_level, truncate_code
+
+# 경계 파일의 코드 속성 → 레벨
+BOUNDARY_CODE_FIELDS = (('CTPRVN_CD', 0), ('SIG_CD', 1), ('EMD_CD', 2))
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def containing_codes(code):
+    """코드 자신과 그 코드를 포함하는 상위 구역 코드들 (가까운 순서)"""
+    chain = [code]
+    for level in range(code_level(code) - 1, -1, -1):
+        chain.append(truncate_code(code, level))
+    sigungu = truncate_code(code, 1)
+    if code_level(code) >= 1 and sigungu % 1000000:
+        chain.insert(chain.index(sigungu) + 1, sigungu // 1000000 * 1000000)  # 일반구 → 시
+    return chain
+
+
+def feature_code(properties):
+    """피처 속성의 경계 코드와 레벨 (코드 속성이 없으면 (None, None))"""
+    for field, level in BOUNDARY_CODE_FIELDS:
+        code = properties.get(field)
+        if code:
+            return str(code), level
+    return None, None
+
+
+class Crosswalk:
+    """경계 피처 목록과 법정동코드의 대응
+
+        boundary_codes  경계 파일의 원래 코드 (피처 순서)
+        join_keys       피처의 현행 10자리 코드 (문자열)
+        status          exact(그대로 있음) / changed(변경전 코드) / unregistered(pnu.csv 에 없음)
+    """
+
+    def __init__(self, boundary_codes, level, registry):
+        self.level = level
+        self.boundary_codes = list(boundary_codes)
+        self.join_keys = []
+        self.status = []
+        unit = 10 ** (10 - LEVEL_DIGITS[level])
+
+        features = set()
+        for code in self.boundary_codes:
+            old = int(code) * unit
+            current = registry.successor(old)
+            self.status.append('exact' if current == old and current in registry
+                               else 'changed' if current in registry else 'unregistered')
+            self.join_keys.append(str(current).zfill(10))
+            features.add(current)
+
+        self._features = features
+        self._registry = registry
+        # 레지스트리의 모든 코드 → 그 코드를 포함하는 경계 피처 (자신 또는 가장 가까운 상위 구역)
+        self._lookup = {code: self._containing_feature(code) for code in registry.codes}
+
+    def _containing_feature(self, code):
+        for candidate in containing_codes(code):
+            if candidate in self._features:
+                return candidate
+        return None
+
+    def join_key(self, stdg_cd):
+        """데이터 코드가 속한 경계 피처의 join_key (없으면 None, 변경전 코드는 현행 코드로 바꿔 찾음)"""
+        code = self._registry.successor(int(stdg_cd))
+        feature = self._lookup[code] if code in self._lookup else self._containing_feature(code)
+        return str(feature).zfill(10) if feature is not None else None
+
+    def join_keys_for(self, codes):
+        """여러 데이터 코드의 join_key (같은 코드는 한 번만 계산)"""
+        memo = {}
+        result = []
+        for code in codes:
+            if code not in memo:
+                memo[code] = self.join_key(code)
+            result.append(memo[code])
+        return result
+
+    def summary(self):
+        counts = {}
+        for status in self.status:
+            counts[status] = counts.get(status, 0) + 1
+        return {'level': LEVEL_NAMES[self.level], 'features': len(self.boundary_codes), **counts}
+
+
+def annotate(geojson, registry):
+    """경계 GeoJSON 의 각 피처에 join_key 속성을 붙이고 (annotated, Crosswalk) 를 반환"""
+    codes, level = [], None
+    for feature in geojson['features']:
+        code, feature_level = feature_code(feature.get('properties') or {})
+        if code is None:
+            raise ValueError("경계 코드 속성(CTPRVN_CD/SIG_CD/EMD_CD)이 없는 피처가 있습니다")
+        level = feature_level if level is None else level
+        codes.append(code)
+
+    crosswalk = Crosswalk(codes, level or 0, registry)
+    features = [dict(feature, properties=dict(feature['properties'], join_key=key))
+                for feature, key in zip(geojson['features'], crosswalk.join_keys)]
+    return dict(geojson, features=features), crosswalk
+
+
+def load_boundary(path, registry):
+    """경계 파일을 읽어 join_key 를 붙인 결과 (annotated GeoJSON, Crosswalk), 파일이 바뀌지 않으면 캐시 재사용"""
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with open(path, 'r', encoding='utf-8') as f:
+        result = annotate(json.load(f), registry)
+    with _cache_lock:
+        _cache[path] = (mtime, result)
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+
+    from pnu_registry import PnuRegistry
+
+    # 사용법: python boundary_crosswalk.py <경계 GeoJSON>...  (변경/미등록 코드 확인)
+    registry = PnuRegistry.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), "pnu.csv"))
+    for path in sys.argv[1:]:
+        _, crosswalk = load_boundary(path, registry)
+        print(path, crosswalk.summary())
+        for code, key, status in zip(crosswalk.boundary_codes, crosswalk.join_keys, crosswalk.status):
+            if status != 'exact':
+                print(f"  {code} → {key} ({status})")
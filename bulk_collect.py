@@ -0,0 +1,156 @@
+"""접두 코드 + 페이지 단위 일괄 수집
+
+수집기는 10자리 법정동코드마다 API 를 한 번씩 부르고 응답의 첫 item 만 읽어, 엔드포인트 하나에 약 2만 번을 호출한다.
+API 가 지원하면 상위 구역 코드(접두 코드)와 페이지 파라미터(numOfRows/pageNo)로 하위 지역을 한꺼번에 받고,
+모든 페이지의 item 을 전부 읽는다.
+
+    1. 레지스트리(pnu.csv)의 코드를 prefix_level 의 접두 코드로 묶음 (기본 시군구 5자리, 약 250개)
+    2. 접두 코드마다 pageNo 1, 2, ... 를 totalCount 를 다 읽을 때까지 호출
+    3. 받은 item 의 stdg_Cd 를 현행 코드로 바꾸고 레지스트리에 있는 코드만 채택 (접두 코드 밖의 item 은 무시)
+    4. 레지스트리 대비 빠진 코드만 코드별로 호출
+
+처음 PROBE_PREFIXES 개의 접두 코드에서 하위 지역이 둘 이상 나오지 않으면 접두 조회를 지원하지 않는
+엔드포인트로 보고 바로 코드별 호출로 넘어간다 (낭비하는 호출은 접두 코드 몇 개 분량).
+"""
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+from pnu_registry import LEVEL_DIGITS, LEVEL_SIGUNGU, truncate_code
+
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_PREFIX_LEVEL = LEVEL_SIGUNGU
+MAX_PAGES = 100  # 접두 코드 하나의 페이지 상한 (페이지 파라미터를 무시하는 API 대비)
+PROBE_PREFIXES = 3
+CODE_FIELD = 'stdg_Cd'
+
+# 응답 한 페이지 (items 는 모든 item 의 {태그: 값}, total_count 는 응답에 없으면 None)
+Page = namedtuple('Page', 'result_code message items total_count')
+
+# 일괄 수집 결과
+#   items      현행 코드(int) → item (레지스트리 코드 순서)
+#   supported  접두 조회 지원 여부 (판단 전에 끝났으면 None)
+#   pages      접두 코드 페이지 요청 수, gap_requests 코드별 요청 수 (캐시 적중 포함)
+#   missing    끝까지 데이터가 없는 코드
+BulkResult = namedtuple('BulkResult', 'items supported prefixes pages gap_requests missing')
+
+
+def _text(root, tags):
+    for tag in tags:
+        node = root.find(f'.//{tag}')
+        if node is not None and node.text is not None:
+            return node.text.strip()
+    return None
+
+
+def parse_page(content):
+    """응답 XML → Page (XML 이 깨졌으면 ET.ParseError)"""
+    root = ET.fromstring(content)
+    items = [{child.tag: child.text for child in item} for item in root.iter('item')]
+    total = _text(root, ('totalCount', 'total_Count'))
+    return Page(_text(root, ('result_Code', 'resultCode')), _text(root, ('result_Msg', 'resultMsg')),
+                items, int(total) if total and total.isdigit() else None)
+
+
+def prefix_codes(registry, level=DEFAULT_PREFIX_LEVEL):
+    """레지스트리 코드의 접두 코드 목록 (예: 시군구 '41110')"""
+    digits = LEVEL_DIGITS[level]
+    return sorted({str(truncate_code(code, level)).zfill(10)[:digits] for code in registry.codes})
+
+
+def page_params(prefix, page_no, page_size=DEFAULT_PAGE_SIZE):
+    """접두 코드 페이지 요청의 파라미터 (인증키 제외)"""
+    return {'STDG_CD': prefix, 'numOfRows': page_size, 'pageNo': page_no}
+
+
+class BulkCollector:
+    """엔드포인트 하나의 접두 코드별 페이지 수집과 레지스트리 대비 빠진 코드의 개별 호출
+
+    fetch_page(params) 는 Page 나 None(요청 실패, 캐시 없음 등), fetch_code(stdg_cd) 는 item 이나 None 을 반환한다.
+    수집기가 호출 방식(API 호출 또는 캐시 조회)과 오류 출력을 정한다.
+    """
+
+    def __init__(self, registry, fetch_page, fetch_code, page_size=DEFAULT_PAGE_SIZE,
+                 prefix_level=DEFAULT_PREFIX_LEVEL):
+        self.registry = registry
+        self.fetch_page = fetch_page
+        self.fetch_code = fetch_code
+        self.page_size = page_size
+        self.prefix_level = prefix_level
+
+    def prefix_items(self, prefix):
+        """접두 코드의 모든 페이지 item 과 요청한 페이지 수"""
+        items, seen = [], set()
+        pages = 0
+        for page_no in range(1, MAX_PAGES + 1):
+            page = self.fetch_page(page_params(prefix, page_no, self.page_size))
+            pages += 1
+            if page is None or page.result_code != '200' or not page.items:
+                break
+            new = [item for item in page.items if item.get(CODE_FIELD) not in seen]
+            if not new:
+                break  # pageNo 를 무시하고 같은 페이지를 돌려주는 경우
+            seen.update(item.get(CODE_FIELD) for item in new)
+            items += new
+            if len(page.items) < self.page_size or \
+                    (page.total_count is not None and len(items) >= page.total_count):
+                break
+        return items, pages
+
+    def _accept(self, found, prefix, items):
+        """접두 코드 아래의 레지스트리 코드 item 만 채택, 채택한 코드 수 반환"""
+        accepted = set()
+        for item in items:
+            code = (item.get(CODE_FIELD) or '').strip()
+            if not code.isdigit():
+                continue
+            raw, code = code.zfill(10), self.registry.successor(int(code))
+            # 변경전 코드로 온 item 은 현행 코드 기준으로 접두 코드를 확인
+            if code in self.registry and (raw.startswith(prefix) or str(code).zfill(10).startswith(prefix)):
+                found.setdefault(code, item)
+                accepted.add(code)
+        return len(accepted)
+
+    def collect(self, stop=None, progress=None):
+        """레지스트리 전체 코드의 item 수집 (stop() 이 참이면 중단, progress(단계, 진행, 전체) 로 진행 상황)"""
+        stop = stop or (lambda: False)
+        found = {}
+        supported = None
+        prefixes = prefix_codes(self.registry, self.prefix_level)
+        pages = 0
+        tried = 0
+        for i, prefix in enumerate(prefixes):
+            if stop() or supported is False:
+                break
+            items, requested = self.prefix_items(prefix)
+            pages += requested
+            tried += 1
+            if self._accept(found, prefix, items) > 1:
+                supported = True
+            elif supported is None and tried >= PROBE_PREFIXES:
+                supported = False  # 접두 코드로 하위 지역을 돌려주지 않는 엔드포인트
+            if progress:
+                progress('prefix', i + 1, len(prefixes))
+
+        # 레지스트리 대비 빠진 코드만 코드별 호출
+        gaps = [code for code in self.registry.codes if code not in found]
+        missing = []
+        gap_requests = 0
+        for i, code in enumerate(gaps):
+            if stop():
+                missing += gaps[i:]
+                break
+            item = self.fetch_code(str(code).zfill(10))
+            gap_requests += 1
+            if item:
+                found[code] = item
+            else:
+                missing.append(code)
+            if progress:
+                progress('gap', i + 1, len(gaps))
+
+        items = {code: found[code] for code in self.registry.codes if code in found}
+        return BulkResult(items, supported, tried, pages, gap_requests, missing)
+
+    def coverage(self, result):
+        """레지스트리 대비 수집 비율"""
+        return len(result.items) / len(self.registry) if len(self.registry) else 0.0
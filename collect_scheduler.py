@@ -0,0 +1,177 @@
+"""호출 한도를 고려한 수집 계획
+
+수집기는 API 마다 전체 법정동코드를 파일 순서대로 호출하기 때문에 하루 호출 한도가 끝나면
+어떤 데이터셋은 끝까지, 어떤 데이터셋은 시작만 한 상태로 남는다.
+여기서는 (데이터셋, 지역) 호출을 하나의 작업으로 보고 우선순위를 매겨 하루 한도 안에서 나누어 배치한다.
+
+    우선순위 = (레벨 단계, -(데이터셋 가중치 × 경과 일수), 코드)
+        레벨 단계   시도 → 시군구 → 읍면동/리 (상위 레벨은 항상 먼저)
+        경과 일수   응답 캐시의 요청별 수집 시각, 없으면 스냅샷 매니페스트의 파일 수집 시각
+                    (한 번도 수집하지 않았으면 MAX_AGE_DAYS)
+
+응답 캐시 유효기간(TTL) 안에 수집한 요청은 API 를 호출하지 않으므로 계획에서 제외한다.
+하루 한도(daily_budget)만큼 잘라 날짜별로 배치하고, 데이터셋별 완료 예정 시각(ETA)을 미리 보여준다.
+"""
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from pnu_registry import LEVEL_NAMES
+
+DEFAULT_DAILY_BUDGET = 10000  # data.go.kr 개발계정 일일 트래픽
+SECONDS_PER_CALL = 1.05  # 스레드 하나의 호출 간격 (wait_before_request)
+MAX_AGE_DAYS = 365  # 경과 일수 상한 (한 번도 수집하지 않은 작업)
+
+# 레벨 단계 (시도, 시군구를 먼저 채우고 나머지는 경과 일수로 경쟁)
+LEVEL_TIERS = (0, 1, 2, 2)
+
+# 수집할 데이터셋
+#   key       수집기 출력 파일 접두사 (1-1 등)
+#   name      API 이름
+#   url       엔드포인트
+#   params    STDG_CD 외의 고정 파라미터 (작물 코드 등, 인증키 제외)
+#   filename  스냅샷 매니페스트의 데이터 파일명
+#   weight    데이터셋 가중치 (클수록 먼저)
+Dataset = namedtuple('Dataset', 'key name url params filename weight')
+
+# 작업 하나 (priority 로 정렬)
+Task = namedtuple('Task', 'priority dataset stdg_cd level age_days')
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(value, '%Y%m%dT%H%M%S').timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class QuotaLedger:
+    """날짜별 API 호출 수 기록 (같은 날 여러 번 실행해도 한도를 넘지 않게)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def used(self, day=None):
+        return self._read().get((day or datetime.now()).strftime('%Y-%m-%d'), 0)
+
+    def add(self, calls, day=None):
+        key = (day or datetime.now()).strftime('%Y-%m-%d')
+        with self._lock:
+            usage = self._read()
+            usage[key] = usage.get(key, 0) + calls
+            # 최근 30일만 보관
+            usage = dict(sorted(usage.items())[-30:])
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(usage, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+
+
+class CollectionPlan:
+    """날짜별로 나눈 작업 목록과 데이터셋별 ETA"""
+
+    def __init__(self, tasks, datasets, daily_budget, used_today, workers, start):
+        self.tasks = tasks
+        self.daily_budget = daily_budget
+        self.start = start
+        self.days = []
+        remaining = max(0, daily_budget - used_today)  # 오늘 남은 한도
+        index = 0
+        while index < len(tasks):
+            self.days.append(tasks[index:index + remaining])
+            index += remaining
+            remaining = daily_budget
+
+        # 데이터셋별 마지막 작업의 날짜와 그날 안에서의 순서로 ETA 계산
+        calls_per_second = workers / SECONDS_PER_CALL
+        self.eta = {dataset.key: {'name': dataset.name, 'calls': 0, 'sido_sigungu': 0, 'day': None, 'finish': None}
+                    for dataset in datasets}
+        midnight = datetime.combine(start.date(), datetime.min.time())
+        for day, day_tasks in enumerate(self.days):
+            day_start = start if day == 0 else midnight + timedelta(days=day)
+            for position, task in enumerate(day_tasks):
+                entry = self.eta[task.dataset.key]
+                entry['calls'] += 1
+                entry['sido_sigungu'] += task.level <= 1
+                entry['day'] = day
+                entry['finish'] = day_start + timedelta(seconds=(position + 1) / calls_per_second)
+
+    def today(self):
+        return self.days[0] if self.days else []
+
+    def report(self):
+        lines = [f"수집 계획: 작업 {len(self.tasks)}건, 하루 한도 {self.daily_budget}건, {len(self.days)}일"]
+        for key, entry in sorted(self.eta.items(), key=lambda item: (item[1]['finish'] is None, item[1]['finish'])):
+            if entry['calls'] == 0:
+                lines.append(f"  {key:>5} {entry['name']}: 최신 상태 (호출 없음)")
+            else:
+                lines.append(f"  {key:>5} {entry['name']}: {entry['calls']}건 (시도/시군구 {entry['sido_sigungu']}건), "
+                             f"{entry['day'] + 1}일차 완료 예정 {entry['finish']:%Y-%m-%d %H:%M}")
+        return "\n".join(lines)
+
+
+class CollectionScheduler:
+    """데이터셋 × 법정동코드 작업의 우선순위 계산과 날짜별 배치"""
+
+    def __init__(self, datasets, registry, cache, manifest=None, daily_budget=DEFAULT_DAILY_BUDGET,
+                 workers=1, refresh_age=None):
+        if daily_budget < 1:
+            raise ValueError(f"daily_budget must be at least 1: {daily_budget}")
+        self.datasets = datasets
+        self.registry = registry
+        self.cache = cache
+        self.manifest = manifest or {}
+        self.daily_budget = daily_budget
+        self.workers = workers
+        # 이 기간 안에 수집한 요청은 캐시에서 바로 나오므로 다시 호출하지 않음 (기본: 캐시 TTL)
+        self.refresh_age = cache.ttl if refresh_age is None else refresh_age
+
+    def _file_collected_at(self, dataset):
+        """매니페스트에 기록된 데이터 파일의 수집 시각 (없으면 None)"""
+        entry = self.manifest.get('files', {}).get(dataset.filename)
+        if entry is None:
+            return None
+        return _parse_time(entry.get('collected_at') or self.manifest.get('created_at'))
+
+    def tasks(self, now=None):
+        """다시 수집해야 하는 작업을 우선순위 순서로 반환"""
+        now = now or time.time()
+        fetch_times = self.cache.fetch_times() if self.cache.mode != 'off' else {}
+        codes = self.registry.code_strings()
+        levels = self.registry.levels
+
+        tasks = []
+        for dataset in self.datasets:
+            file_time = self._file_collected_at(dataset)
+            for stdg_cd, level in zip(codes, levels):
+                key, _ = self.cache.request_key(dataset.url, dict(dataset.params, STDG_CD=stdg_cd))
+                fetched_at = fetch_times.get(key, file_time)
+                if fetched_at is not None and now - fetched_at < self.refresh_age:
+                    continue
+                age_days = MAX_AGE_DAYS if fetched_at is None else min(MAX_AGE_DAYS, (now - fetched_at) / 86400)
+                priority = (LEVEL_TIERS[level], -dataset.weight * age_days, stdg_cd, dataset.key)
+                tasks.append(Task(priority, dataset, stdg_cd, level, age_days))
+        tasks.sort(key=lambda task: task.priority)
+        return tasks
+
+    def plan(self, used_today=0, start=None):
+        return CollectionPlan(self.tasks(), self.datasets, self.daily_budget, used_today, self.workers,
+                              start or datetime.now())
+
+    @staticmethod
+    def level_counts(tasks):
+        counts = {name: 0 for name in LEVEL_NAMES}
+        for task in tasks:
+            counts[LEVEL_NAMES[task.level]] += 1
+        return counts
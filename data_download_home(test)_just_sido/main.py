@@ -1,4 +1,5 @@
 import os
+import sys
 import csv
 import requests
 import xml.etree.ElementTree as ET
@@ -8,6 +9,10 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 from urllib.parse import quote
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pnu_registry import PnuRegistry  # 공용 법정동코드 레지스트리 (저장소 루트)
+from response_cache import ResponseCache  # API 원본 응답 캐시 (저장소 루트)
+
 
 class SoilAPICollector:
     def __init__(self):
@@ -51,28 +56,19 @@ class SoilAPICollector:
              "http://apis.data.go.kr/1390802/SoilEnviron/SoilCharacStat/V2/getSoilFieldGradSpecificInfo", "2-10"]
         ]
 
+        # 법정동코드 레지스트리 (read_pnu_codes 에서 로드)
+        self.registry = None
+
+        # API 원본 응답 캐시 (SOIL_CACHE_MODE=replay 또는 cache-only 로 API 호출 없이 다시 만들 수 있음)
+        self.http_cache = ResponseCache.from_env()
+
         # 스레드 안전을 위한 락
         self.print_lock = Lock()
 
     def read_pnu_codes(self, filename="sido_pnu.csv"):
         """sido_pnu.csv 파일에서 첫번째 열의 두번째 행부터 법정동코드를 읽어오는 함수"""
-        pnu_codes = []
         try:
-            # UTF-8로 먼저 시도
-            with open(filename, 'r', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                next(reader)  # 헤더 건너뛰기
-                for row in reader:
-                    if len(row) > 0 and row[0].strip():  # 첫 번째 열이 비어있지 않은 경우만
-                        pnu_codes.append(row[0].strip())  # 첫 번째 열의 법정동코드, 공백 제거
-        except UnicodeDecodeError:
-            # CP1252로 재시도
-            with open(filename, 'r', encoding='cp1252') as f:
-                reader = csv.reader(f)
-                next(reader)  # 헤더 건너뛰기
-                for row in reader:
-                    if len(row) > 0 and row[0].strip():
-                        pnu_codes.append(row[0].strip())  # 첫 번째 열의 법정동코드, 공백 제거
+            self.registry = PnuRegistry.load(filename)
         except FileNotFoundError:
             print(f"파일 {filename}을 찾을 수 없습니다.")
             return []
@@ -80,7 +76,11 @@ class SoilAPICollector:
             print(f"파일 읽기 오류: {e}")
             return []
 
-        return pnu_codes
+        return self.registry.code_strings()
+
+    def wait_before_request(self):
+        """API 호출 전 랜덤 대기 (1.0 ~ 1.1초, 매크로 방지. 캐시에서 가져올 때는 기다리지 않음)"""
+        time.sleep(random.uniform(1.0, 1.1))
 
     def get_api_data(self, url, stdg_cd):
         """개별 API를 호출하여 데이터를 가져오는 함수"""
@@ -90,11 +90,12 @@ class SoilAPICollector:
         }
 
         try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
+            content = self.http_cache.fetch(url, params, timeout=30, throttle=self.wait_before_request)
+            if content is None:
+                return None  # cache-only 모드에서 캐시에 없는 요청
 
             # XML 파싱
-            root = ET.fromstring(response.content)
+            root = ET.fromstring(content)
 
             # 결과 코드 확인
             result_code = root.find('.//result_Code')
@@ -182,10 +183,6 @@ class SoilAPICollector:
                 collected_data.append(data)
                 successful_count += 1
 
-            # 랜덤 대기 시간 (1.0 ~ 1.1초) - 매크로 방지
-            wait_time = random.uniform(1.0, 1.1)
-            time.sleep(wait_time)
-
         # 결과 저장
         self.save_to_csv(collected_data, file_prefix)
 
@@ -249,6 +246,9 @@ class SoilAPICollector:
         print(f"\n전체 통계: {total_successful}/{total_requests}건 성공 "
               f"(성공률: {total_successful / total_requests * 100:.1f}%)")
         print("모든 데이터 수집이 완료되었습니다!")
+        print(self.http_cache.summary())
+        if self.http_cache.mode == 'online':
+            self.http_cache.prune()  # 용량 초과분 정리
 
         # 생성된 파일 목록 출력
         print("\n=== 생성된 CSV 파일 목록 ===")
@@ -9,28 +9,22 @@ import threading
 from queue import Queue
 import concurrent.futures
 
+from pnu_registry import PnuRegistry
+from snapshot_store import SnapshotError, publish_collector_outputs
+from response_cache import ResponseCache
+
+# API 원본 응답 캐시 (SOIL_CACHE_MODE=replay 또는 cache-only 로 API 호출 없이 다시 만들 수 있음)
+HTTP_CACHE = ResponseCache.from_env()
+
 
 def read_pnu_codes(filename="pnu.csv"):
-    """PNU CSV 파일에서 행정코드를 읽어오는 함수"""
-    pnu_codes = []
-    try:
-        # UTF-8로 먼저 시도
-        with open(filename, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            next(reader)  # 헤더 건너뛰기
-            for row in reader:
-                if len(row) > 0:
-                    pnu_codes.append(row[0])  # 첫 번째 열의 행정코드
-    except UnicodeDecodeError:
-        # CP1252로 재시도
-        with open(filename, 'r', encoding='cp1252') as f:
-            reader = csv.reader(f)
-            next(reader)  # 헤더 건너뛰기
-            for row in reader:
-                if len(row) > 0:
-                    pnu_codes.append(row[0])  # 첫 번째 열의 행정코드
-
-    return pnu_codes
+    """PNU CSV 파일에서 행정코드를 읽어오는 함수 (공용 레지스트리 사용)"""
+    return PnuRegistry.load(filename).code_strings()
+
+
+def wait_before_request():
+    """API 호출 전 랜덤 대기 (1~1.1초, 캐시에서 가져올 때는 기다리지 않음)"""
+    time.sleep(1 + random.uniform(0, 0.1))
 
 
 def call_soil_api(service_key, stdg_cd, crop_cd):
@@ -44,9 +38,7 @@ def call_soil_api(service_key, stdg_cd, crop_cd):
     }
 
     try:
-        response = requests.get(base_url, params=params, timeout=30)
-        response.raise_for_status()
-        return response.text
+        return HTTP_CACHE.fetch(base_url, params, timeout=30, throttle=wait_before_request)
     except requests.exceptions.RequestException as e:
         print(f"API 호출 실패 - STDG_CD: {stdg_cd}, crop_CD: {crop_cd}, 에러: {e}")
         return None
@@ -112,10 +104,6 @@ def worker_thread(service_key, crop_code, pnu_queue, result_list, thread_id, tot
             break  # 큐가 비어있으면 종료
 
         try:
-            # 랜덤 대기 (1~1.1초)
-            sleep_time = 1 + random.uniform(0, 0.1)
-            time.sleep(sleep_time)
-
             # API 호출
             xml_response = call_soil_api(service_key, pnu_code, crop_code)
 
@@ -203,6 +191,19 @@ def main():
 
     print(f"\n=== 사과 데이터 수집 완료! ===")
     print(f"총 수집된 레코드: {len(result_list)}개")
+    print(HTTP_CACHE.summary())
+    if HTTP_CACHE.mode == 'online':
+        HTTP_CACHE.prune()  # 용량 초과분 정리
+
+    # 수집 결과를 검증해 스냅샷으로 발행 (apple.csv → SoilFitStat_apple.csv)
+    try:
+        publish_collector_outputs(
+            [os.path.splitext(OUTPUT_FILE)[0]],
+            run_info={'collector': 'apple', 'crop_code': CROP_CODE, 'records': len(result_list)},
+            registry=PnuRegistry.load("pnu.csv")
+        )
+    except SnapshotError as e:
+        print(f"스냅샷 발행 실패 (기존 스냅샷 유지): {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+"""행정구역 인접 그래프 (CSR)
+
+경계 GeoJSON 에서 꼭짓점을 하나라도 공유하는 피처끼리 이웃으로 본다 (퀸 인접).
+경계 파일들은 이웃한 지역이 같은 좌표의 꼭짓점을 쓰므로, 꼭짓점 좌표를 반올림한 정수 키로
+(키, 피처) 표를 만들어 같은 키를 가진 피처 쌍을 모으면 된다 (읍면동 5천여 개도 수십 ms).
+
+    indptr[i]:indptr[i+1]   i 번째 피처(codes[i])의 이웃 범위
+    indices                 이웃 피처 번호 (대칭)
+    linked                  섬처럼 공유 꼭짓점이 없어 가장 가까운 피처와 이어 준 피처
+
+만든 그래프는 adjacency/<레벨>.npz 에 저장하고 경계 파일이 바뀌면 다시 만든다.
+미리 만들어 두려면:  python adjacency.py [레벨...]
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from geometry import LEVEL_LAYERS, load_layer
+
+ADJACENCY_DIR = "adjacency"
+VERTEX_SCALE = 1e9  # 메르카토르 좌표 반올림 단위 (약 4cm)
+
+_graphs = {}
+_graphs_lock = threading.Lock()
+
+
+class AdjacencyGraph:
+    """한 레벨 경계 피처의 인접 그래프"""
+
+    def __init__(self, level, codes, indptr, indices, linked):
+        self.level = level
+        self.codes = list(codes)
+        self.indptr = indptr
+        self.indices = indices
+        self.linked = linked
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+        self.degree = np.diff(indptr)
+        # 각 이웃 항목의 출발 피처 (가중 합을 bincount 한 번으로 계산할 때 사용)
+        self.owner = np.repeat(np.arange(len(self.codes)), self.degree)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_layer(cls, layer):
+        count = len(layer)
+        feature = np.repeat(np.arange(count), np.diff(layer.edge_offsets))
+        vertices = np.round(layer.edges[:, :2] * VERTEX_SCALE).astype(np.int64)
+        keys = pd.DataFrame({'x': vertices[:, 0], 'y': vertices[:, 1], 'feature': feature}).drop_duplicates()
+
+        # 같은 꼭짓점을 쓰는 피처 쌍 (양방향)
+        shared = keys.merge(keys, on=['x', 'y'])
+        shared = shared[shared['feature_x'] != shared['feature_y']]
+        pairs = np.unique(shared[['feature_x', 'feature_y']].to_numpy(dtype=np.int64), axis=0)
+
+        # 이웃이 없는 피처(섬)는 bbox 중심이 가장 가까운 피처와 양방향으로 잇는다
+        linked = np.zeros(count, dtype=bool)
+        linked[np.setdiff1d(np.arange(count), pairs[:, 0])] = True
+        if count > 1 and linked.any():
+            centers = (layer.bboxes[:, :2] + layer.bboxes[:, 2:]) / 2
+            extra = []
+            for i in np.flatnonzero(linked):
+                distance = np.hypot(*(centers - centers[i]).T)
+                distance[i] = np.inf
+                nearest = int(np.argmin(distance))
+                extra += [(i, nearest), (nearest, i)]
+            pairs = np.unique(np.vstack([pairs, np.asarray(extra, dtype=np.int64)]), axis=0)
+
+        indptr = np.zeros(count + 1, dtype=np.int32)
+        np.cumsum(np.bincount(pairs[:, 0], minlength=count), out=indptr[1:])
+        return cls(layer.level, layer.codes, indptr, pairs[:, 1].astype(np.int32), linked)
+
+    def save(self, path, source_mtime):
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(tmp_path, codes=np.asarray(self.codes), indptr=self.indptr, indices=self.indices,
+                            linked=self.linked, source_mtime=np.float64(source_mtime))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, level):
+        """저장한 그래프와 만들 때의 경계 파일 수정 시각"""
+        with np.load(path, allow_pickle=False) as saved:
+            graph = cls(level, saved['codes'].tolist(), saved['indptr'], saved['indices'], saved['linked'])
+            return graph, float(saved['source_mtime'])
+
+    def neighbors(self, code):
+        """지역 코드의 이웃 코드 목록 (없는 코드면 None)"""
+        index = self.code_index.get(code)
+        if index is None:
+            return None
+        return [self.codes[j] for j in self.indices[self.indptr[index]:self.indptr[index + 1]]]
+
+    def neighbor_sum(self, values):
+        """피처마다 이웃 값의 합 (values 는 피처 순서 배열)"""
+        return np.bincount(self.owner, weights=values[self.indices], minlength=len(self.codes))
+
+
+def graph_path(level):
+    return os.path.join(ADJACENCY_DIR, f"{level}.npz")
+
+
+def build_graph(level):
+    """경계 파일로 그래프를 만들어 저장 (경계 파일이 없으면 None)"""
+    layer = load_layer(level)
+    if layer is None:
+        return None
+    graph = AdjacencyGraph.from_layer(layer)
+    os.makedirs(ADJACENCY_DIR, exist_ok=True)
+    graph.save(graph_path(level), os.path.getmtime(layer.path))
+    return graph
+
+
+def load_graph(level):
+    """레벨의 인접 그래프 (저장된 그래프가 없거나 경계 파일보다 오래되었으면 다시 만듦)"""
+    if level not in LEVEL_LAYERS:
+        return None
+    with _graphs_lock:
+        if level in _graphs:
+            return _graphs[level]
+        source = LEVEL_LAYERS[level][0]
+        if not os.path.exists(source):
+            return None
+        graph = None
+        path = graph_path(level)
+        if os.path.exists(path):
+            saved, source_mtime = AdjacencyGraph.load(path, level)
+            if source_mtime == os.path.getmtime(source):
+                graph = saved
+        _graphs[level] = graph or build_graph(level)
+        return _graphs[level]
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    for level in sys.argv[1:] or list(LEVEL_LAYERS):
+        started = time.perf_counter()
+        graph = build_graph(level)
+        if graph is None:
+            print(f"{level}: 경계 파일 없음")
+            continue
+        print(f"{level}: 피처 {len(graph)}개, 이웃 {len(graph.indices) // 2}쌍, "
+              f"섬 연결 {int(graph.linked.sum())}개, {time.perf_counter() - started:.2f}초 → {graph_path(level)}")
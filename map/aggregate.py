@@ -0,0 +1,152 @@
+"""사용자 영역(GeoJSON 폴리곤) 집계
+
+행정구역과 맞지 않는 영역(유역, 조합 관할 구역 등)에 대해
+읍면동 경계와의 겹침 비율(가중치)을 구하고, 읍면동 값에 가중치를 곱해 합산한다.
+
+겹침 면적은 폴리곤 bbox 를 격자로 나눠 폴리곤/읍면동 마스크가 겹치는 셀 수로 근사하고
+(경계 상자 인덱스로 후보 읍면동만 검사), 읍면동 면적은 경계 좌표로 정확히 계산한다.
+가중치는 경계 파일에만 의존하므로 폴리곤 해시를 키로 데이터 버전과 무관하게 캐시한다.
+"""
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from geometry import fill_mask, load_layer, polygon_edges
+from indicators import derive
+
+GRID_SIZE = 1024  # 폴리곤 bbox 긴 변의 격자 셀 수
+WEIGHT_CACHE_SIZE = 256
+EARTH_CIRCUMFERENCE = 40075016.686  # m (메르카토르 1 단위의 적도 길이)
+
+_weights = OrderedDict()
+_weights_lock = threading.Lock()
+
+
+def _geometry(geojson):
+    """Feature/FeatureCollection/Geometry 에서 하나의 MultiPolygon geometry 를 만드는 함수"""
+    if geojson.get('type') == 'FeatureCollection':
+        geometries = [feature.get('geometry') for feature in geojson.get('features', [])]
+    elif geojson.get('type') == 'Feature':
+        geometries = [geojson.get('geometry')]
+    else:
+        geometries = [geojson]
+
+    polygons = []
+    for geometry in geometries:
+        if not geometry:
+            continue
+        if geometry.get('type') == 'Polygon':
+            polygons.append(geometry['coordinates'])
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons.extend(geometry['coordinates'])
+    if not polygons:
+        raise ValueError("Polygon 또는 MultiPolygon geometry 가 필요합니다")
+    return {'type': 'MultiPolygon', 'coordinates': polygons}
+
+
+def polygon_hash(geojson):
+    """폴리곤 geometry 의 해시 (좌표를 정규화한 JSON 기준)"""
+    geometry = _geometry(geojson)
+    text = json.dumps(geometry['coordinates'], separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+def compute_weights(geojson, level='eupmyeondong'):
+    """폴리곤과 겹치는 피처별 가중치 (겹친 면적 / 피처 면적)"""
+    layer = load_layer(level)
+    if layer is None:
+        raise ValueError(f"경계 파일이 없습니다: {level}")
+
+    edges, area = polygon_edges(_geometry(geojson))
+    if len(edges) == 0 or area <= 0:
+        raise ValueError("면적이 없는 폴리곤입니다")
+
+    min_x, min_y = edges[:, [0, 2]].min(), edges[:, [1, 3]].min()
+    max_x, max_y = edges[:, [0, 2]].max(), edges[:, [1, 3]].max()
+    cell = max(max_x - min_x, max_y - min_y) / GRID_SIZE
+    width = max(int(math.ceil((max_x - min_x) / cell)), 1)
+    height = max(int(math.ceil((max_y - min_y) / cell)), 1)
+    polygon_mask = fill_mask(edges, min_x, min_y, cell, width, height)
+
+    indices, weights = [], []
+    for index in layer.candidates(min_x, min_y, max_x, max_y):
+        # 피처 bbox 와 겹치는 격자 창에서만 마스크를 만든다
+        b = layer.bboxes[index]
+        c0, r0 = max(int((b[0] - min_x) / cell), 0), max(int((b[1] - min_y) / cell), 0)
+        c1 = min(int(math.ceil((b[2] - min_x) / cell)), width)
+        r1 = min(int(math.ceil((b[3] - min_y) / cell)), height)
+        if c1 <= c0 or r1 <= r0:
+            continue
+        feature_mask = fill_mask(layer.feature_edges(index), min_x + c0 * cell, min_y + r0 * cell, cell,
+                                 c1 - c0, r1 - r0)
+        overlap = np.count_nonzero(feature_mask & polygon_mask[r0:r1, c0:c1]) * cell * cell
+        if overlap > 0 and layer.areas[index] > 0:
+            indices.append(int(index))
+            weights.append(min(overlap / layer.areas[index], 1.0))
+
+    # 메르카토르 면적 → ha (폴리곤 중심 위도의 축척 보정)
+    center_y = (min_y + max_y) / 2
+    latitude = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * center_y))))
+    scale = EARTH_CIRCUMFERENCE * math.cos(math.radians(latitude))
+    return {
+        'level': level,
+        'area_ha': area * scale * scale / 10000,
+        'codes': [layer.codes[i] for i in indices],
+        'names': [layer.names[i] for i in indices],
+        'weights': np.asarray(weights, dtype=np.float64),
+    }
+
+
+def polygon_weights(geojson, level='eupmyeondong'):
+    """폴리곤 해시별로 캐시된 가중치"""
+    key = (polygon_hash(geojson), level)
+    with _weights_lock:
+        if key in _weights:
+            _weights.move_to_end(key)
+            return key[0], _weights[key]
+
+    result = compute_weights(geojson, level)
+
+    with _weights_lock:
+        _weights[key] = result
+        _weights.move_to_end(key)
+        while len(_weights) > WEIGHT_CACHE_SIZE:
+            _weights.popitem(last=False)
+    return key[0], result
+
+
+def aggregate(dataset, weights, crop_code=None, columns=None):
+    """읍면동 값 × 가중치 합계 (컬럼별, 결측은 0 으로 처리)
+
+    파생 지표(평균, 비율 등)는 더하지 않고, 합산한 구간 면적으로 다시 계산한다.
+    """
+    columns = [col for col in (columns or dataset.value_columns) if col in dataset.value_columns]
+    rows = dataset.rows('eupmyeondong', crop_code)
+    rows = rows[dataset.levels[rows] == 2]
+    row_by_code = dict(zip(dataset.region_codes(rows, 'eupmyeondong'), rows))
+
+    matched = [(row_by_code[code], weight) for code, weight in zip(weights['codes'], weights['weights'])
+               if code in row_by_code]
+    base_columns = [col for col in dataset.value_columns if col not in dataset.derived_columns]
+    col_idx = [dataset.value_columns.index(col) for col in base_columns]
+    if matched:
+        match_rows = np.array([row for row, _ in matched])
+        match_weights = np.array([weight for _, weight in matched])
+        totals = match_weights @ np.nan_to_num(dataset.take(match_rows, col_idx))
+    else:
+        totals = np.zeros(len(col_idx))
+    totals = dict(zip(base_columns, totals))
+
+    if any(col in dataset.derived_columns for col in columns):
+        names, derived = derive(dataset.indicators, base_columns, np.array([list(totals.values())]))
+        totals.update(zip(names, derived[0]))
+
+    return {
+        'columns': columns,
+        'totals': {col: (None if np.isnan(totals[col]) else float(totals[col])) for col in columns},
+        'matched_regions': len(matched),
+    }
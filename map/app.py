@@ -1,135 +1,692 @@
-from fastapi import FastAPI, Query
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-import pandas as pd
+from fastapi import Body, FastAPI, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse, Response
 import uvicorn
-from typing import Optional
+import asyncio
+import gzip
+import inspect
+import json
+import operator
 import os
-from data.column_mapping import COLUMN_MAPPING
+import threading
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 
-app = FastAPI()
+from root_modules import ROOT_DIR  # 저장소 루트의 공용 모듈 (pnu_registry 등)
+from pnu_registry import PnuRegistry, LEVEL_NAME_DIGITS, LEVEL_NAMES, region_code
+from snapshot_store import SnapshotStore
+from static_assets import PrecompressedStaticFiles
+from suitability_cube import METRICS, SuitabilityCube
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+from dataset_store import DatasetStore
+from history import HistoryStore, series_key
+from geometry import LEVEL_LAYERS, load_layer
+from tiles import TileCache, feature_colors, level_for_zoom, render_tile, style_key
+from ranking import candidate_rows, metric_values, top_n
+from aggregate import aggregate, polygon_weights
+from adjacency import load_graph
+from spatial import STATS, feature_values, spatial_statistic
+from prerender import PREBUILT_DIR
+from query import QueryError, QueryNames, parse_query, run_query
+from data_access import ConcurrencyLimitMiddleware, cached, read_bytes, run_cpu, run_io
+from instrumentation import DEBUG_ENABLED, HISTOGRAMS, PROFILE_MODES, PROFILER, TimingMiddleware, phase
+
+# 행정구역 코드 레지스트리 (pnu.csv 한 번만 로드)
+REGISTRY = PnuRegistry.load(os.path.join(ROOT_DIR, "pnu.csv"))
+
+# 데이터셋 저장소 (시작 시 로드, 이후 데이터 변경 시 백그라운드에서 교체)
+# 수집기가 발행한 스냅샷(snapshots/CURRENT)이 있으면 그것을, 없으면 data 디렉토리를 읽는다.
+SNAPSHOTS = SnapshotStore()
+STORE = DatasetStore("data", snapshots=SNAPSHOTS)
+STORE.load()
+
+# 배치 요청 안의 하위 요청들이 같은 데이터 버전을 보도록 고정 (없으면 STORE.current)
+REQUEST_VERSION = ContextVar('request_version', default=None)
+
+
+def current_version():
+    return REQUEST_VERSION.get() or STORE.current
+
+
+# 수집 이력 저장소 (스냅샷이 바뀔 때마다 감시 스레드에서 추가, 조회는 mmap)
+HISTORY = HistoryStore(os.path.join(SNAPSHOTS.root, "history"))
+STORE.listeners.append(lambda version: HISTORY.sync(SNAPSHOTS))
+
+# 래스터 타일 캐시 (이전 데이터 버전의 타일은 버전이 바뀔 때 정리)
+TILES = TileCache("tile_cache")
+STORE.listeners.append(lambda version: TILES.prune(version.version))
+
+
+def warm_summaries(version):
+    """데이터 버전의 요약 통계를 미리 계산 (바뀌지 않은 파일은 이미 계산돼 있어 바로 끝남)"""
+    for dataset in version.datasets.values():
+        dataset.summary.precompute()
+
+
+STORE.listeners.append(lambda version: threading.Thread(target=warm_summaries, args=(version,), daemon=True).start())
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if SNAPSHOTS.current_id():
+        threading.Thread(target=HISTORY.sync, args=(SNAPSHOTS,), daemon=True).start()
+    threading.Thread(target=warm_summaries, args=(STORE.current,), daemon=True).start()
+    STORE.start_watching()
+    yield
+    STORE.stop_watching()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# 동시 요청 수 제한 (초과 시 503 + Retry-After)
+app.add_middleware(ConcurrencyLimitMiddleware)
+# 단계별 시간 측정 (Server-Timing 헤더, /api/metrics), 503 으로 거절된 요청도 측정하도록 가장 바깥에 둔다
+app.add_middleware(TimingMiddleware)
+
+# 정적 파일 (static/assets 의 해시 이름 경계 파일은 .gz/.br 협상 + immutable 캐시, python ../static_assets.py static)
+app.mount("/static", PrecompressedStaticFiles(directory="static"), name="static")
+# 정적 빌드 결과 (python prerender.py, 워커는 매니페스트 버전이 현재 데이터 버전과 같을 때만 사용)
+os.makedirs(PREBUILT_DIR, exist_ok=True)
+app.mount("/prebuilt", PrecompressedStaticFiles(directory=PREBUILT_DIR), name="prebuilt")
 
 
 @app.get("/", response_class=HTMLResponse)
 async def home():
-    with open("templates/index.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
+    html_content = (await run_io(read_bytes, "templates/index.html")).decode("utf-8")
     return HTMLResponse(content=html_content, status_code=200)
 
 
 @app.get("/api/csv-list")
 async def get_csv_list():
-    csv_files = [
-        {"filename": "SoilFitStat_apple.csv", "display_name": "작물별 토양적성 통계정보", "type": "crop"},
-        {"filename": "SoilExamStat_pH.csv", "display_name": "농경지화학성 pH 통계정보", "type": "soil"},
-        {"filename": "SoilExamStat_Om.csv", "display_name": "농경지화학성 유기물 통계정보", "type": "soil"},
-        {"filename": "SoilExamStat_Ap.csv", "display_name": "농경지화학성 유효인산 통계정보", "type": "soil"},
-        {"filename": "SoilExamStat_Ka.csv", "display_name": "농경지화학성 칼륨 통계정보", "type": "soil"},
-        {"filename": "SoilExamStat_Ca.csv", "display_name": "농경지화학성 칼슘 통계정보", "type": "soil"},
-        {"filename": "SoilExamStat_Mg.csv", "display_name": "농경지화학성 마그네슘 통계정보", "type": "soil"},
-        {"filename": "SoilExamStat_Sa.csv", "display_name": "농경지화학성 유효규산 통계정보", "type": "soil"},
-        {"filename": "SoilCharacStat_DistrbTopograpy.csv", "display_name": "토양도 기반 분포지형 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_AmnForm.csv", "display_name": "토양도 기반 퇴적양식 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_Tree.csv", "display_name": "토양도 기반 토양목 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_Sbr.csv", "display_name": "토양도 기반 토양아목 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_DrngGrad.csv", "display_name": "토양도 기반 배수등급 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_WashGrad.csv", "display_name": "토양도 기반 침식등급 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_TopslGrv.csv", "display_name": "토양도 기반 표토자갈함량 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_MainLand.csv", "display_name": "토양도 기반 주토지이용 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_FieldGrad.csv", "display_name": "토양도 기반 밭 적성등급 통계 정보", "type": "soil"},
-        {"filename": "SoilCharacStat_PaddyObstrcFctr.csv", "display_name": "토양도 기반 논 저해요인 통계 정보", "type": "soil"}
-    ]
+    csv_files = [{
+        "filename": entry['filename'],
+        "display_name": entry['display_name'],
+        "type": entry['type']
+    } for entry in current_version().catalog.values()]
     return JSONResponse(content=csv_files)
 
 
+@app.get("/api/catalog")
+async def get_catalog(filename: str = None):
+    """데이터 카탈로그 반환 (filename 지정 시 해당 파일만)"""
+    catalog = current_version().catalog
+    if filename is None:
+        return JSONResponse(content=list(catalog.values()))
+    if filename not in catalog:
+        return JSONResponse(content={"error": "File not found"}, status_code=404)
+    return JSONResponse(content=catalog[filename])
+
+
 @app.get("/api/crops")
 async def get_crops(filename: str):
-    try:
-        df = pd.read_csv(f"data/{filename}")
-        crops = df[['soil_Crop_Cd', 'soil_Crop_Nm']].drop_duplicates().sort_values('soil_Crop_Nm')
-        return JSONResponse(content=crops.to_dict('records'))
-    except Exception as e:
-        return JSONResponse(content=[], status_code=500)
+    entry = current_version().catalog.get(filename)
+    if entry is None:
+        return JSONResponse(content=[], status_code=404)
+    return JSONResponse(content=entry['crops'])
 
 
 @app.get("/api/soil-columns")
 async def get_soil_columns(filename: str):
-    """토양 성분 CSV의 컬럼 목록을 반환"""
+    """토양 성분 CSV의 컬럼 목록을 반환 (카탈로그 사용)"""
+    entry = current_version().catalog.get(filename)
+    if entry is None:
+        return JSONResponse(content=[], status_code=404)
+
+    column_info = [{
+        'column': col['column'],
+        'display_name': col['display_name']
+    } for col in entry['columns']]
+    return JSONResponse(content=column_info)
+
+
+@app.get("/api/data")
+async def get_map_data(filename: str, crop_code: str = None, level: str = "sido", format: str = "records",
+                       columns: str = None):
+    """지도 데이터
+
+    format=sparse 이면 0 과 결측을 뺀 희소 형식, format=columnar 이면 컬럼별 배열 (columns 로 필요한 컬럼만 선택)
+    """
+    version = current_version()  # 요청이 끝날 때까지 같은 데이터 버전 사용
+    dataset = version.get(filename)
+    if dataset is None:
+        return JSONResponse(content=[], status_code=404)
+    if level not in dataset.partitions:
+        return JSONResponse(content=[])
+    if format not in ("records", "sparse", "columnar"):
+        return JSONResponse(content={"error": f"Unknown format: {format}"}, status_code=400)
+    selected = tuple(columns.split(',')) if columns and format == "columnar" else None
+
+    def build():
+        with phase('records'):
+            if format == "columnar":
+                records = dataset.columnar(level, crop_code, selected)
+            elif format == "sparse":
+                records = dataset.sparse_records(level, crop_code)
+            else:
+                records = dataset.records(level, crop_code)
+        with phase('encode'):
+            return JSONResponse(content=records).body
+
     try:
-        df = pd.read_csv(f"data/{filename}")
-        # 첫 번째 행(stdg_Cd)과 두 번째 행(bjd_Nm)을 제외한 컬럼들
-        columns = df.columns[2:].tolist()
-
-        # column_mapping을 사용해서 한글명으로 변환
-        column_info = []
-        for col in columns:
-            korean_name = COLUMN_MAPPING.get(col, col)
-            column_info.append({
-                'column': col,
-                'display_name': korean_name
-            })
-
-        return JSONResponse(content=column_info)
+        # 레벨 분할된 데이터에서 응답을 만들고, 같은 버전 안에서는 인코딩 결과를 재사용
+        body = await cached(version, ('data', filename, crop_code, level, format, selected), build)
+        return Response(content=body, media_type="application/json",
+                        headers={"X-Data-Version": version.version})
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     except Exception as e:
+        print(f"Error: {e}")
         return JSONResponse(content=[], status_code=500)
 
 
-@app.get("/api/data")
-async def get_map_data(filename: str, crop_code: str = None, level: str = "sido"):
+@app.get("/api/class-breaks")
+async def get_class_breaks(filename: str, column: str, crop_code: str = None, level: str = "sido"):
+    """레벨별 색상 구간 경계 반환 (데이터 버전마다 미리 계산)"""
+    version = current_version()
+    dataset = version.get(filename)
+    breaks = dataset.class_breaks.get((crop_code or None, level)) if dataset else None
+    if breaks is None or column not in breaks:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    return JSONResponse(content={"version": version.version, "breaks": breaks[column]})
+
+
+@app.get("/api/version")
+async def get_data_version():
+    """현재 데이터 버전"""
+    version = current_version()
+    return JSONResponse(content={"version": version.version, "loaded_at": version.loaded_at,
+                                 "files": sorted(version.datasets)})
+
+
+@app.get("/api/regions")
+async def get_regions(parent_cd: str = None, level: str = None):
+    """행정구역 목록 반환 (parent_cd 의 하위 구역 또는 level 전체)"""
+    if parent_cd:
+        index = REGISTRY.index_of(REGISTRY.successor(parent_cd))
+        if index < 0:
+            return JSONResponse(content={"error": "Region not found"}, status_code=404)
+        indices = REGISTRY.children(index)
+    elif level in LEVEL_NAMES:
+        indices = REGISTRY.indices_at_level(LEVEL_NAMES.index(level))
+    else:
+        return JSONResponse(content=[])
+
+    regions = [{
+        'stdg_Cd': str(REGISTRY.codes[i]),
+        'region_cd': region_code(REGISTRY.codes[i], REGISTRY.levels[i]),
+        'bjd_Nm': REGISTRY.names[i],
+        'level': LEVEL_NAMES[REGISTRY.levels[i]]
+    } for i in indices]
+    return JSONResponse(content=regions)
+
+
+@app.get("/api/ranking")
+async def get_ranking(filename: str, column: str, level: str = "eupmyeondong", crop_code: str = None,
+                      parent_cd: str = None, n: int = Query(10, ge=1, le=1000), order: str = "desc"):
+    """지역 순위 Top-N (column 은 컬럼명, share:<컬럼명>, score 중 하나)"""
+    version = current_version()
+    dataset = version.get(filename)
+    if dataset is None or level not in LEVEL_NAMES or order not in ("asc", "desc"):
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    if parent_cd and not parent_cd.isdigit():
+        return JSONResponse(content={"error": "Invalid parent_cd"}, status_code=400)
+
+    values = await cached(version, ('metric', filename, column), lambda: metric_values(dataset, column))
+    if values is None:
+        return JSONResponse(content={"error": f"Unknown column: {column}"}, status_code=404)
+
+    def build():
+        rows = version.cached(('ranking-rows', filename, crop_code, level, parent_cd),
+                              lambda: candidate_rows(dataset, level, crop_code, parent_cd))
+        picked, picked_values = top_n(values, rows, n, order)
+        return JSONResponse(content={
+            "column": column,
+            "level": level,
+            "total": int(len(rows)),
+            "data": [
+                {"rank": rank, "region_cd": code[:LEVEL_NAME_DIGITS[level]],
+                 "bjd_Nm": dataset.frame['bjd_Nm'].iat[row], "value": float(value)}
+                for rank, (row, code, value) in enumerate(
+                    zip(picked, dataset.code_strings.iloc[picked], picked_values), start=1)
+            ]
+        }).body
+
+    body = await cached(version, ('ranking', filename, column, crop_code, level, parent_cd, n, order), build)
+    return Response(content=body, media_type="application/json", headers={"X-Data-Version": version.version})
+
+
+@app.get("/api/summary")
+async def get_summary(filename: str, level: str = "sigungu", parent_cd: str = None, crop_code: str = None,
+                      columns: str = None):
+    """레벨별 요약 통계 (parent_cd 하위 지역들 또는 전국의 합계/평균/최소/최대/분위수/히스토그램)"""
+    version = current_version()
+    dataset = version.get(filename)
+    if dataset is None or level not in LEVEL_NAMES:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    if parent_cd and not parent_cd.isdigit():
+        return JSONResponse(content={"error": "Invalid parent_cd"}, status_code=400)
+    if crop_code and crop_code not in dataset.crop_rows:
+        return JSONResponse(content={"error": f"Unknown crop_code: {crop_code}"}, status_code=404)
+    selected = tuple(columns.split(',')) if columns else None
+
+    def build():
+        summary = dataset.summary.query(level, parent_cd, crop_code, selected)
+        if summary is None:
+            return None
+        return JSONResponse(content=dict(summary, filename=filename, crop_code=crop_code)).body
+
     try:
-        df = pd.read_csv(f"data/{filename}")
+        body = await cached(version, ('summary', filename, level, parent_cd, crop_code, selected), build)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    if body is None:
+        return JSONResponse(content={"error": "Region not found"}, status_code=404)
+    return Response(content=body, media_type="application/json", headers={"X-Data-Version": version.version})
 
-        # 작물별 데이터와 토양 성분 데이터 구분
-        if crop_code:
-            # 작물별 데이터 (기존 로직)
-            df_filtered = df[df['soil_Crop_Cd'] == crop_code]
-        else:
-            # 토양 성분 데이터 (새로운 로직)
-            df_filtered = df.copy()
-
-        if level == "sido":
-            # 시도 레벨 데이터만 (3~10자리가 모두 0)
-            sido_mask = df_filtered['stdg_Cd'].astype(str).str[2:10] == '00000000'
-            result_data = df_filtered[sido_mask].copy()
-            result_data['region_cd'] = result_data['stdg_Cd'].astype(str).str[:2]
-
-        elif level == "sigungu":
-            # 시군구 레벨 데이터만 (6~10자리가 모두 0)
-            sigungu_mask = df_filtered['stdg_Cd'].astype(str).str[5:10] == '00000'
-            result_data = df_filtered[sigungu_mask].copy()
-            result_data['region_cd'] = result_data['stdg_Cd'].astype(str).str[:5]
-
-        elif level == "eupmyeondong":
-            # 읍면동 레벨 데이터만 (9~10자리가 모두 0)
-            emd_mask = df_filtered['stdg_Cd'].astype(str).str[8:10] == '00'
-            result_data = df_filtered[emd_mask].copy()
-            result_data['region_cd'] = result_data['stdg_Cd'].astype(str).str[:8]
-
-        elif level == "li":
-            # 리 레벨 데이터 (10자리 전체)
-            result_data = df_filtered.copy()
-            result_data['region_cd'] = result_data['stdg_Cd'].astype(str)
 
-        else:
-            return JSONResponse(content=[])
+@app.get("/api/spatial")
+async def get_spatial(filename: str, column: str, stat: str = "lag", level: str = "sigungu", crop_code: str = None,
+                      permutations: int = Query(99, ge=0, le=999)):
+    """인접 지역 기반 공간 통계 (stat: lag, smooth, moran, getis / column 은 컬럼명, share:<컬럼명>, score)"""
+    version = current_version()
+    dataset = version.get(filename)
+    if dataset is None or stat not in STATS:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    graph = await run_cpu(load_graph, level)
+    if graph is None:
+        return JSONResponse(content={"error": f"No boundary graph for level: {level}"}, status_code=404)
+
+    values = await cached(version, ('metric', filename, column), lambda: metric_values(dataset, column))
+    if values is None:
+        return JSONResponse(content={"error": f"Unknown column: {column}"}, status_code=404)
+
+    def build():
+        result = spatial_statistic(graph, feature_values(graph, dataset, values, level, crop_code), stat,
+                                   permutations)
+        return JSONResponse(content=dict(result, column=column, stat=stat, level=level)).body
+
+    body = await cached(version, ('spatial', filename, column, stat, level, crop_code, permutations), build)
+    return Response(content=body, media_type="application/json", headers={"X-Data-Version": version.version})
+
+
+@app.get("/api/query")
+async def query_regions(expr: str, level: str = "eupmyeondong", crop_code: str = None, parent_cd: str = None,
+                        limit: int = Query(1000, ge=1, le=100000)):
+    """여러 데이터셋의 컬럼/파생 비율에 대한 조건식으로 지역 검색
+
+    예) share(acid_Fruit1_Area) + share(acid_Fruit2_Area) > 0.3 and share(poor_Drain_Area) > 0.5
+    """
+    version = current_version()
+    if level not in LEVEL_NAMES:
+        return JSONResponse(content={"error": f"Unknown level: {level}"}, status_code=404)
+    if parent_cd and not parent_cd.isdigit():
+        return JSONResponse(content={"error": "Invalid parent_cd"}, status_code=400)
+
+    names = await cached(version, ('query-names',), lambda: QueryNames(version))
+    try:
+        query = parse_query(expr, names, version)
+    except QueryError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+
+    def build():
+        return JSONResponse(content=run_query(version, query, level, crop_code, parent_cd, limit)).body
+
+    try:
+        # 정규화한 식으로 캐시 (공백, 별칭 생략 여부가 달라도 같은 항목)
+        body = await cached(version, ('query', query.normalized, level, crop_code, parent_cd, limit), build)
+    except QueryError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    return Response(content=body, media_type="application/json", headers={"X-Data-Version": version.version})
 
-        # 작물별 데이터와 토양 성분 데이터에 따라 컬럼 선택
-        if crop_code:
-            # 작물별 데이터 컬럼
-            columns = ['region_cd', 'bjd_Nm', 'soil_Crop_Nm', 'high_Suit_Area', 'suit_Area', 'poss_Area',
-                       'low_Suit_Area', 'etc_Area']
+
+@app.get("/api/adjacency")
+async def get_adjacency(level: str = "sigungu", region_cd: str = None):
+    """경계 인접 그래프 (region_cd 를 주면 그 지역의 이웃만)"""
+    graph = await run_cpu(load_graph, level)
+    if graph is None:
+        return JSONResponse(content={"error": f"No boundary graph for level: {level}"}, status_code=404)
+    if region_cd is not None:
+        neighbors = graph.neighbors(region_cd)
+        if neighbors is None:
+            return JSONResponse(content={"error": "Region not found"}, status_code=404)
+        return JSONResponse(content={"region_cd": region_cd, "neighbors": neighbors})
+    return JSONResponse(content={
+        "level": level,
+        "codes": graph.codes,
+        "indptr": graph.indptr.tolist(),
+        "indices": graph.indices.tolist(),
+        "linked": [code for code, linked in zip(graph.codes, graph.linked) if linked]
+    })
+
+
+async def suitability_cube(version):
+    """데이터 버전의 모든 작물 적성 파일을 합친 큐브 (버전별로 한 번 생성)"""
+    def build():
+        frames = [dataset.to_frame() for dataset in version.datasets.values() if dataset.type == 'crop']
+        return SuitabilityCube.from_frames(frames) if frames else None
+    return await cached(version, ('suitability-cube',), build)
+
+
+@app.get("/api/suitability/region")
+async def get_region_crops(code: str, metric: str = "share", n: int = Query(None, ge=1)):
+    """지역의 추천 작물 순위 (metric: share, score 또는 적성등급 컬럼)"""
+    cube = await suitability_cube(current_version())
+    if cube is None or metric not in METRICS:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    crops = cube.crops_for_region(REGISTRY.successor(code) if len(code) == 10 else code, metric, n)
+    if crops is None:
+        return JSONResponse(content={"error": "Region not found"}, status_code=404)
+    return JSONResponse(content={"code": code, "metric": metric, "crops": crops})
+
+
+@app.get("/api/suitability/crop")
+async def get_crop_regions(crop_code: str, metric: str = "share", level: str = "sigungu",
+                           parent_cd: str = None, n: int = Query(10, ge=1, le=1000)):
+    """작물의 최적 지역 순위"""
+    cube = await suitability_cube(current_version())
+    if cube is None or metric not in METRICS or level not in LEVEL_NAMES:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    if parent_cd and not parent_cd.isdigit():
+        return JSONResponse(content={"error": "Invalid parent_cd"}, status_code=400)
+    regions = cube.regions_for_crop(crop_code, metric, LEVEL_NAMES.index(level), n, parent_cd)
+    if regions is None:
+        return JSONResponse(content={"error": "Crop not found"}, status_code=404)
+    for region in regions:
+        region['region_cd'] = region['stdg_Cd'][:LEVEL_NAME_DIGITS[level]]
+    return JSONResponse(content={"crop_code": crop_code, "metric": metric, "level": level, "regions": regions})
+
+
+@app.post("/api/aggregate")
+async def aggregate_polygon(payload: dict = Body(...)):
+    """사용자 영역(GeoJSON 폴리곤) 집계
+
+    요청: {"geometry": GeoJSON, "filename": "...", "crop_code": "...", "columns": [...]}
+    filename 이 없으면 겹치는 읍면동과 가중치만 반환한다.
+    """
+    if not isinstance(payload.get('geometry'), dict):
+        return JSONResponse(content={"error": "geometry is required"}, status_code=400)
+    try:
+        key, weights = await run_cpu(polygon_weights, payload['geometry'])
+    except (ValueError, KeyError, TypeError, IndexError) as e:
+        return JSONResponse(content={"error": f"Invalid geometry: {e}"}, status_code=400)
+
+    result = {
+        "polygon_hash": key,
+        "area_ha": weights['area_ha'],
+        "regions": [{"region_cd": code, "name": name, "weight": float(weight)}
+                    for code, name, weight in zip(weights['codes'], weights['names'], weights['weights'])]
+    }
+
+    filename = payload.get('filename')
+    if filename:
+        version = current_version()
+        dataset = version.get(filename)
+        if dataset is None:
+            return JSONResponse(content={"error": "File not found"}, status_code=404)
+        crop_code = payload.get('crop_code')
+        columns = payload.get('columns')
+        result.update(await cached(
+            version, ('aggregate', key, filename, crop_code, tuple(columns or ())),
+            lambda: aggregate(dataset, weights, crop_code, columns)))
+        result["filename"] = filename
+
+    return JSONResponse(content=result)
+
+
+@app.get("/tiles/{z}/{x}/{y}.png")
+async def get_tile(z: int, x: int, y: int, filename: str, column: str, crop_code: str = None,
+                   level: str = None):
+    """데이터셋 색상으로 채운 래스터 타일 (읍면동처럼 피처가 많은 레벨용)"""
+    version = current_version()
+    dataset = version.get(filename)
+    level = level or level_for_zoom(z)
+    with phase('layer'):
+        layer = await run_cpu(load_layer, level)
+    if dataset is None or layer is None or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    # 잘못된 키로 회색 타일을 만들어 캐시하지 않도록 렌더링 전에 확인
+    if column not in dataset.value_columns:
+        return JSONResponse(content={"error": f"Unknown column: {column}"}, status_code=404)
+    if crop_code and crop_code not in dataset.crop_rows:
+        return JSONResponse(content={"error": f"Unknown crop_code: {crop_code}"}, status_code=404)
+
+    style = style_key(filename, crop_code, level, column)
+    with phase('tile-read'):
+        tile = await run_io(TILES.get, version.version, style, z, x, y)
+    if tile is None:
+        colors = await cached(version, ('tile-colors', style),
+                              lambda: feature_colors(layer, dataset, level, crop_code, column))
+        with phase('render'):
+            tile = await run_cpu(render_tile, layer, colors, z, x, y)
+        await run_io(TILES.put, version.version, style, z, x, y, tile)
+
+    return Response(content=tile, media_type="image/png",
+                    headers={"X-Data-Version": version.version, "Cache-Control": "public, max-age=3600"})
+
+
+@app.get("/api/lookup")
+async def lookup_region(lat: float, lng: float, filename: str, crop_code: str = None, level: str = "eupmyeondong"):
+    """좌표의 행정구역과 데이터 (타일 레이어 클릭 시 팝업용)"""
+    version = current_version()
+    dataset = version.get(filename)
+    layer = await run_cpu(load_layer, level)
+    if dataset is None or layer is None:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+
+    index = await run_cpu(layer.locate, lng, lat)
+    if index < 0:
+        return JSONResponse(content={"error": "Region not found"}, status_code=404)
+
+    records = await cached(version, ('records-by-region', filename, crop_code, level),
+                           lambda: {r['region_cd']: r for r in dataset.records(level, crop_code)})
+    region_cd = layer.codes[index]
+    return JSONResponse(content={
+        "region_cd": region_cd,
+        "properties": layer.properties[index],
+        "data": records.get(region_cd)
+    })
+
+
+@app.get("/api/history/series")
+async def get_history_series():
+    """이력이 있는 시리즈와 수집 시점 목록"""
+    return JSONResponse(content=await run_io(HISTORY.list_series))
+
+
+@app.get("/api/history/trend")
+async def get_history_trend(filename: str, code: str, crop_code: str = None, columns: str = None):
+    """한 지역의 수집 시점별 값 (columns 는 쉼표로 구분)"""
+    trend = await run_io(HISTORY.trend, series_key(filename, crop_code), code,
+                         columns.split(',') if columns else None)
+    if trend is None:
+        return JSONResponse(content={"error": "History not found"}, status_code=404)
+    return JSONResponse(content=trend)
+
+
+@app.get("/api/history/change")
+async def get_history_change(filename: str, column: str, date_from: str, date_to: str,
+                             crop_code: str = None, level: str = "sido"):
+    """레벨 전체의 두 시점 사이 변화"""
+    if level not in LEVEL_NAMES:
+        return JSONResponse(content=[])
+    change = await run_io(HISTORY.change, series_key(filename, crop_code), LEVEL_NAMES.index(level), column,
+                          date_from, date_to)
+    if change is None:
+        return JSONResponse(content={"error": "History not found"}, status_code=404)
+
+    def value(v):
+        return None if v != v else float(v)  # NaN → null
+
+    records = [{
+        'region_cd': region_code(code, LEVEL_NAMES.index(level)),
+        'bjd_Nm': REGISTRY.name_of(code),
+        'from': value(before),
+        'to': value(after),
+        'change': value(diff)
+    } for code, before, after, diff in zip(change['codes'].tolist(), change['before'],
+                                            change['after'], change['change'])]
+    return JSONResponse(content={'from': change['from'], 'to': change['to'], 'data': records})
+
+
+@app.get("/api/boundary")
+async def get_boundary(level: str = "sido"):
+    """레벨의 경계 GeoJSON (static/data 파일, /api/batch 에서 데이터와 함께 받을 때 사용)"""
+    if level not in LEVEL_LAYERS or not os.path.exists(LEVEL_LAYERS[level][0]):
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    return Response(content=await run_io(read_bytes, LEVEL_LAYERS[level][0]), media_type="application/json")
+
+
+# /api/batch 에서 실행할 수 있는 하위 요청 (JSON 을 반환하는 GET 엔드포인트)
+BATCH_ROUTES = {
+    "/api/csv-list": get_csv_list,
+    "/api/catalog": get_catalog,
+    "/api/crops": get_crops,
+    "/api/soil-columns": get_soil_columns,
+    "/api/data": get_map_data,
+    "/api/class-breaks": get_class_breaks,
+    "/api/version": get_data_version,
+    "/api/regions": get_regions,
+    "/api/ranking": get_ranking,
+    "/api/summary": get_summary,
+    "/api/spatial": get_spatial,
+    "/api/query": query_regions,
+    "/api/adjacency": get_adjacency,
+    "/api/suitability/region": get_region_crops,
+    "/api/suitability/crop": get_crop_regions,
+    "/api/lookup": lookup_region,
+    "/api/boundary": get_boundary,
+    "/api/history/series": get_history_series,
+    "/api/history/trend": get_history_trend,
+    "/api/history/change": get_history_change,
+}
+BATCH_MAX_QUERIES = 20
+
+
+# Query(...) 의 범위 제약 (metadata 의 annotated_types.Ge 등)
+QUERY_BOUNDS = {'ge': ('>=', operator.ge), 'gt': ('>', operator.gt),
+                'le': ('<=', operator.le), 'lt': ('<', operator.lt)}
+
+
+def _check_bounds(name, value, query):
+    """Query(ge=..., le=...) 범위를 벗어난 값이면 ValueError (엔드포인트 직접 호출과 같은 검증)"""
+    for constraint in getattr(query, 'metadata', []):
+        for attr, (symbol, check) in QUERY_BOUNDS.items():
+            bound = getattr(constraint, attr, None)
+            if bound is not None and not check(value, bound):
+                raise ValueError(f"{name} must be {symbol} {bound}")
+
+
+def _batch_arguments(handler, params):
+    """쿼리 파라미터(문자열)를 핸들러 인자로 변환 (기본값이 Query(...) 이면 그 기본값과 범위 제약 사용)"""
+    if not isinstance(params, dict):
+        raise ValueError("params must be an object")
+    arguments = {}
+    for name, parameter in inspect.signature(handler).parameters.items():
+        query = parameter.default
+        default = query.default if hasattr(query, 'default') else query  # Query(...)
+        if name in params and params[name] is not None:
+            value = params[name]
+            if parameter.annotation in (int, float) and not isinstance(value, parameter.annotation):
+                value = parameter.annotation(value)
+            _check_bounds(name, value, query)
+            arguments[name] = value
+        elif default is inspect.Parameter.empty or default is ...:
+            raise ValueError(f"missing parameter: {name}")
         else:
-            # 토양 성분 데이터 컬럼 (stdg_Cd, bjd_Nm 제외한 모든 컬럼)
-            data_columns = [col for col in result_data.columns if col not in ['stdg_Cd', 'bjd_Nm']]
-            columns = ['region_cd', 'bjd_Nm'] + [col for col in data_columns if col != 'region_cd']
+            arguments[name] = default
+    return arguments
+
 
-        result = result_data[columns].fillna(0).to_dict('records')
-        return JSONResponse(content=result)
+async def _run_batch_query(query):
+    """하위 요청 하나의 (상태 코드, 본문) (실패해도 예외를 올리지 않아 다른 하위 요청은 그대로 응답)"""
+    if not isinstance(query, dict):
+        return 400, json.dumps({"error": "query must be an object"}).encode('utf-8')
+    handler = BATCH_ROUTES.get(query.get('path'))
+    if handler is None:
+        return 404, json.dumps({"error": f"Unknown path: {query.get('path')}"}).encode('utf-8')
+    try:
+        arguments = _batch_arguments(handler, query.get('params') or {})
+    except (ValueError, TypeError) as e:
+        return 400, json.dumps({"error": str(e)}).encode('utf-8')
+
+    # 하위 요청은 gather 로 동시에 실행 (무거운 작업은 각 핸들러가 CPU/I/O 풀로 넘김)
+    try:
+        response = await handler(**arguments)
     except Exception as e:
         print(f"Error: {e}")
-        return JSONResponse(content=[], status_code=500)
+        return 500, json.dumps({"error": "Internal error"}).encode('utf-8')
+    return response.status_code, response.body
+
+
+@app.post("/api/batch")
+async def batch(request: Request, payload: dict = Body(...)):
+    """여러 조회를 한 번에 실행해 하나의 (gzip 압축) 응답으로 반환
+
+    요청: {"queries": [{"id": "data", "path": "/api/data", "params": {"filename": "...", "level": "sido"}}, ...]}
+    응답: {"version": "...", "results": {"data": {"status": 200, "body": ...}, ...}}
+    모든 하위 요청은 같은 데이터 버전을 사용하므로 버전 캐시(필터링된 레벨 데이터 등)를 함께 재사용한다.
+    """
+    queries = payload.get('queries')
+    if not isinstance(queries, list) or not queries or len(queries) > BATCH_MAX_QUERIES:
+        return JSONResponse(content={"error": f"queries must be a list of 1-{BATCH_MAX_QUERIES} items"},
+                            status_code=400)
+
+    version = STORE.current
+    token = REQUEST_VERSION.set(version)
+    try:
+        results = await asyncio.gather(*[_run_batch_query(query) for query in queries])
+    finally:
+        REQUEST_VERSION.reset(token)
+
+    # 하위 응답 본문(이미 인코딩된 JSON)을 다시 파싱하지 않고 이어 붙인다
+    parts = []
+    for index, (query, (status, body)) in enumerate(zip(queries, results)):
+        query_id = str(query.get('id', index) if isinstance(query, dict) else index)
+        parts.append(json.dumps(query_id, ensure_ascii=False).encode('utf-8')
+                     + b':{"status":' + str(status).encode('ascii') + b',"body":' + body + b'}')
+    content = (b'{"version":' + json.dumps(version.version).encode('utf-8')
+               + b',"results":{' + b','.join(parts) + b'}}')
+
+    headers = {"X-Data-Version": version.version, "Vary": "Accept-Encoding"}
+    if 'gzip' in request.headers.get('accept-encoding', '') and len(content) > 1024:
+        content = gzip.compress(content, 6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """엔드포인트별 지연 시간 히스토그램 (최근 구간)과 단계별 평균 시간"""
+    return JSONResponse(content=dict(HISTOGRAMS.snapshot(), data_version=STORE.current.version))
+
+
+@app.get("/api/debug/profile")
+async def get_profiles():
+    """예약된 프로파일링과 결과 (SOIL_MAP_DEBUG=1 일 때만)"""
+    if not DEBUG_ENABLED:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    return JSONResponse(content={"armed": PROFILER.armed(), "results": list(PROFILER.results)})
+
+
+@app.post("/api/debug/profile")
+async def arm_profile(payload: dict = Body(...)):
+    """다음 요청들에 프로파일링 예약 {"path": "/api/data", "mode": "cprofile|sample|tracemalloc", "count": 1}
+    ("mode": "off" 이면 예약 취소)"""
+    if not DEBUG_ENABLED:
+        return JSONResponse(content={"error": "Not found"}, status_code=404)
+    path = payload.get('path')
+    mode = payload.get('mode', 'cprofile')
+    count = payload.get('count', 1)
+    if not isinstance(path, str) or not path.startswith('/'):
+        return JSONResponse(content={"error": "path is required"}, status_code=400)
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+        return JSONResponse(content={"error": "count must be a positive integer"}, status_code=400)
+    if mode == 'off':
+        PROFILER.disarm(path)
+    elif mode in PROFILE_MODES:
+        PROFILER.arm(path, mode, count)
+    else:
+        return JSONResponse(content={"error": f"Unknown mode: {mode}"}, status_code=400)
+    return JSONResponse(content={"armed": PROFILER.armed()})
 
 
 # CSV 다운로드 API
@@ -0,0 +1,146 @@
+"""데이터 카탈로그
+
+data 디렉토리의 CSV 파일마다 데이터 종류, 컬럼, dtype, 한글 컬럼명,
+레벨별 행 수와 최소/최대/합계를 한 번만 계산해 메모리에 보관한다.
+결과는 data/catalog.json 에 저장되며, 파일 크기/수정시각이 같으면 다시 읽지 않는다.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import root_modules  # noqa: F401  (pnu_registry 경로)
+from data.column_mapping import COLUMN_MAPPING
+from indicators import INDICATOR_NAMES
+from pnu_registry import code_levels
+
+CATALOG_FILE = "catalog.json"
+
+# 식별용 컬럼 (값 컬럼에서 제외)
+KEY_COLUMNS = ['stdg_Cd', 'bjd_Nm', 'soil_Crop_Cd', 'soil_Crop_Nm']
+
+# 수집 API 의 결측 표기
+NA_VALUES = ['-']
+
+LEVELS = ['sido', 'sigungu', 'eupmyeondong', 'li']
+
+# 파일명(확장자 제외, 소문자) → 화면 표시명. 순서가 목록 표시 순서가 된다.
+DATASET_NAMES = {
+    "soilfitstat_apple": "작물별 토양적성 통계정보",
+    "soilexamstat_ph": "농경지화학성 pH 통계정보",
+    "soilexamstat_om": "농경지화학성 유기물 통계정보",
+    "soilexamstat_ap": "농경지화학성 유효인산 통계정보",
+    "soilexamstat_ka": "농경지화학성 칼륨 통계정보",
+    "soilexamstat_ca": "농경지화학성 칼슘 통계정보",
+    "soilexamstat_mg": "농경지화학성 마그네슘 통계정보",
+    "soilexamstat_sa": "농경지화학성 유효규산 통계정보",
+    "soilcharacstat_distrbtopograpy": "토양도 기반 분포지형 통계 정보",
+    "soilcharacstat_amnform": "토양도 기반 퇴적양식 통계 정보",
+    "soilcharacstat_tree": "토양도 기반 토양목 통계 정보",
+    "soilcharacstat_sbr": "토양도 기반 토양아목 통계 정보",
+    "soilcharacstat_drnggrad": "토양도 기반 배수등급 통계 정보",
+    "soilcharacstat_washgrad": "토양도 기반 침식등급 통계 정보",
+    "soilcharacstat_topslgrv": "토양도 기반 표토자갈함량 통계 정보",
+    "soilcharacstat_mainland": "토양도 기반 주토지이용 통계 정보",
+    "soilcharacstat_fieldgrad": "토양도 기반 밭 적성등급 통계 정보",
+    "soilcharacstat_paddyobstrcfctr": "토양도 기반 논 저해요인 통계 정보",
+}
+_DATASET_ORDER = {key: i for i, key in enumerate(DATASET_NAMES)}
+
+
+def read_dataset_csv(path):
+    """수집 결과 CSV 를 읽는 함수 ('-' 는 결측으로 처리)"""
+    return pd.read_csv(path, na_values=NA_VALUES)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _stat(values):
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return {'min': None, 'max': None, 'sum': 0}
+    return {'min': float(values.min()), 'max': float(values.max()), 'sum': float(values.sum())}
+
+
+def describe_frame(filename, df):
+    """하나의 데이터 파일에 대한 카탈로그 항목을 만드는 함수"""
+    stem = os.path.splitext(filename)[0]
+    dataset_type = 'crop' if 'soil_Crop_Cd' in df.columns else 'soil'
+    value_columns = [col for col in df.columns if col not in KEY_COLUMNS]
+
+    levels = code_levels(df['stdg_Cd'].to_numpy())
+    values = {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+              for col in value_columns}
+
+    level_stats = {}
+    for level, name in enumerate(LEVELS):
+        mask = levels == level
+        level_stats[name] = {
+            'rows': int(mask.sum()),
+            'stats': {col: _stat(arr[mask]) for col, arr in values.items()}
+        }
+
+    entry = {
+        'filename': filename,
+        'display_name': DATASET_NAMES.get(stem.lower(), stem),
+        'type': dataset_type,
+        'rows': int(len(df)),
+        'columns': [{
+            'column': col,
+            'display_name': COLUMN_MAPPING.get(col) or INDICATOR_NAMES.get(col, col),
+            'dtype': str(df[col].dtype)
+        } for col in value_columns],
+        'levels': level_stats,
+        'crops': []
+    }
+
+    if dataset_type == 'crop':
+        crops = df[['soil_Crop_Cd', 'soil_Crop_Nm']].drop_duplicates().sort_values('soil_Crop_Nm')
+        entry['crops'] = crops.to_dict('records')
+
+    return entry
+
+
+def _sort_key(entry):
+    stem = os.path.splitext(entry['filename'])[0].lower()
+    return _DATASET_ORDER.get(stem, len(_DATASET_ORDER)), entry['filename']
+
+
+def read_catalog(data_dir):
+    """data/catalog.json 을 읽는 함수 (없거나 깨졌으면 빈 카탈로그)"""
+    catalog_path = os.path.join(data_dir, CATALOG_FILE)
+    if not os.path.exists(catalog_path):
+        return {}
+    try:
+        with open(catalog_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"카탈로그 읽기 오류: {e}")
+        return {}
+
+
+def sort_catalog(entries):
+    """카탈로그 항목을 표시 순서로 정렬해 파일명 → 항목 딕셔너리로 반환"""
+    return {entry['filename']: entry for entry in sorted(entries, key=_sort_key)}
+
+
+def save_catalog(catalog, data_dir):
+    catalog_path = os.path.join(data_dir, CATALOG_FILE)
+    tmp_path = catalog_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False)
+    os.replace(tmp_path, catalog_path)
+
+
+if __name__ == "__main__":
+    # 수집 결과를 data 에 넣은 뒤 실행하면 카탈로그를 새로 만든다
+    # (서버와 같이 데이터셋을 올려서 만들어야 파생 지표 컬럼이 들어감)
+    from dataset_store import DatasetStore
+
+    result = DatasetStore("data").load().catalog
+    for name, item in result.items():
+        print(f"{name}: {item['type']}, {item['rows']}행, {len(item['columns'])}개 컬럼")
@@ -0,0 +1,96 @@
+"""비동기 엔드포인트용 데이터 접근 계층
+
+async 엔드포인트에서 pandas/numpy 계산이나 파일 읽기를 이벤트 루프에서 직접 하면
+요청 하나가 느릴 때 다른 모든 요청이 함께 멈춘다. 그래서
+    - CPU 작업(레코드 변환, 타일 렌더링, 집계)과 블로킹 I/O(파일, mmap 이력)를
+      크기가 정해진 별도 스레드 풀에서 실행하고
+    - 같은 캐시 키를 동시에 요청하면 한 번만 계산하며 (DataVersion.cached 의 single-flight)
+    - 동시에 처리하는 요청 수를 제한해 넘치면 503 + Retry-After 로 돌려보낸다.
+"""
+import asyncio
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.responses import JSONResponse
+
+from instrumentation import instrumented, note
+
+CPU_WORKERS = min(8, os.cpu_count() or 2)
+IO_WORKERS = 16
+
+MAX_CONCURRENT_REQUESTS = 64  # 동시에 처리하는 API 요청 수
+QUEUE_TIMEOUT = 0.5  # 자리가 날 때까지 기다리는 시간 (초), 넘으면 503
+RETRY_AFTER = 2  # 503 응답의 Retry-After (초)
+
+CPU_POOL = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+IO_POOL = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+
+def _submit(pool, func, queue_phase, args):
+    # 요청 컨텍스트(계측, 데이터 버전)를 작업 스레드로 복사
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(pool, context.run, instrumented(func, queue_phase), *args)
+
+
+async def run_cpu(func, *args):
+    """CPU 작업을 CPU 풀에서 실행"""
+    return await _submit(CPU_POOL, func, 'cpu-queue', args)
+
+
+async def run_io(func, *args):
+    """블로킹 I/O 를 I/O 풀에서 실행"""
+    return await _submit(IO_POOL, func, 'io-queue', args)
+
+
+async def cached(version, key, builder):
+    """버전 캐시 조회 (있으면 바로 반환, 없으면 CPU 풀에서 한 번만 만듦)"""
+    found, value = version.peek(key)
+    note('cache', 'hit' if found else 'miss')
+    if found:
+        return value
+    return await run_cpu(version.cached, key, builder)
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class ConcurrencyLimitMiddleware:
+    """동시 요청 수 제한 (ASGI 미들웨어)
+
+    prefixes 로 시작하는 경로만 제한한다 (정적 파일은 제외).
+    자리가 없으면 QUEUE_TIMEOUT 동안 기다리고, 그래도 없으면 503 과 Retry-After 를 돌려준다.
+    """
+
+    def __init__(self, app, max_concurrent=MAX_CONCURRENT_REQUESTS, queue_timeout=QUEUE_TIMEOUT,
+                 retry_after=RETRY_AFTER, prefixes=("/api/", "/tiles/")):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.prefixes = prefixes
+        self._semaphore = None
+        self.rejected = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not scope['path'].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)  # 이벤트 루프 안에서 생성
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            response = JSONResponse(content={"error": "Server busy"}, status_code=503,
+                                    headers={"Retry-After": str(self.retry_after)})
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._semaphore.release()
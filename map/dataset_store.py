@@ -0,0 +1,437 @@
+"""버전 관리되는 데이터셋 저장소
+
+data 디렉토리의 CSV 를 모두 메모리에 올린 하나의 '데이터 버전'을 만들어 두고,
+감시 스레드가 파일 변경을 감지하면 백그라운드에서 새 버전(레벨 분할, 색상 구간,
+카탈로그 포함)을 만든 뒤 참조 하나만 바꿔 교체한다 (더블 버퍼링).
+요청은 시작할 때 STORE.current 를 한 번 잡아서 끝까지 그 버전만 사용하므로,
+교체 중에도 진행 중인 요청은 이전 버전으로 끝나고 부분적으로 쓰인 파일을 읽지 않는다.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import root_modules  # noqa: F401  (pnu_registry 경로)
+from catalog import (KEY_COLUMNS, LEVELS, code_levels, describe_frame, file_signature,
+                     read_catalog, read_dataset_csv, save_catalog, sort_catalog)
+from indicators import binned_groups, derive
+from sparse import SparseColumns
+from pnu_registry import LEVEL_NAME_DIGITS
+from summary import DatasetSummary
+
+# 작물별 데이터에서 /api/data 로 내보내는 컬럼
+CROP_COLUMNS = ['region_cd', 'bjd_Nm', 'soil_Crop_Nm', 'high_Suit_Area', 'suit_Area', 'poss_Area',
+                'low_Suit_Area', 'etc_Area']
+
+# 파생 지표 컬럼의 색상 구간 분위수 (큰 값부터, 면적처럼 최댓값 비율로 나누면 pH 등은 한 구간에 몰림)
+DERIVED_QUANTILES = [0.8, 0.6, 0.4, 0.2]
+
+# 색상 구간 비율 (map.js 의 calculateColorScale 과 동일)
+SCALE_RATIOS = {
+    'sido': [0.8, 0.6, 0.4, 0.2],
+    'sigungu': [0.1, 0.075, 0.05, 0.025],
+    'eupmyeondong': [0.01, 0.006, 0.003, 0.001],
+    'li': [0.001, 0.0006, 0.0003, 0.0002]
+}
+
+WATCH_INTERVAL = 2.0  # 데이터 디렉토리 확인 주기 (초)
+CACHE_SIZE = 64  # 버전별 응답 캐시 항목 수
+
+
+class Dataset:
+    """CSV 파일 하나를 메모리에 올린 데이터셋 (만든 뒤에는 변경하지 않음)
+
+    값 컬럼은 0 이 아닌 값만 희소 행렬(SparseColumns)로 보관하고, frame 에는 키 컬럼(코드, 이름)만 남긴다.
+    구간 면적 컬럼이 있는 화학성 파일은 파생 지표(indicators)를 로드할 때 계산해 값 컬럼 뒤에 붙인다.
+    파생 지표는 거의 모든 행에서 0 이 아닌 소수라 희소 행렬 대신 밀집 float32 배열(derived)에 따로 둔다.
+    """
+
+    def __init__(self, filename, frame, signature):
+        self.filename = filename
+        self.signature = signature
+        self.type = 'crop' if 'soil_Crop_Cd' in frame.columns else 'soil'
+        self.columns = list(frame.columns)  # 원래 컬럼 순서
+        self.value_columns = [col for col in frame.columns if col not in KEY_COLUMNS]
+        self.frame = frame[[col for col in frame.columns if col in KEY_COLUMNS]]
+
+        self.codes = frame['stdg_Cd'].to_numpy(dtype=np.int64)
+        self.levels = code_levels(self.codes)
+        self.code_strings = frame['stdg_Cd'].astype(str)
+        # 문자열 키 컬럼(지역명, 작물명)의 사전 인코딩: 컬럼 → (행별 사전 번호, 사전)
+        self.dictionaries = {}
+        for col in ('bjd_Nm', 'soil_Crop_Nm'):
+            if col in frame.columns:
+                self.dictionaries[col] = pd.factorize(frame[col])
+        values = frame[self.value_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+        # 정수 컬럼은 응답에서도 정수로 내보냄 (to_frame 에서 dtype 복원)
+        self.integer_columns = [col for col in self.value_columns if pd.api.types.is_integer_dtype(frame[col])]
+
+        # 파생 지표 (가상 컬럼): 원래 값 컬럼과 같은 방식으로 모든 엔드포인트에서 쓸 수 있음
+        self.indicators = binned_groups(self.value_columns)
+        derived_names, derived_values = derive(self.indicators, self.value_columns, values)
+        self.derived_columns = set(derived_names)
+        self.sparse = SparseColumns.from_dense(values)
+        self.derived = derived_values.astype(np.float32)  # 행 × 파생 컬럼 (value_columns 의 sparse 뒤 번호)
+        if derived_names:
+            self.columns += derived_names
+            self.value_columns += derived_names
+            values = np.hstack([values, derived_values])
+        # 숫자 값이 하나라도 있는 컬럼 번호
+        self.numeric_columns = np.flatnonzero(~np.isnan(values).all(axis=0))
+
+        # 레벨 분할: 기존 /api/data 와 같은 범위 (시군구는 시도 포함, 리는 전체)
+        self.partitions = {
+            'sido': np.flatnonzero(self.levels == 0),
+            'sigungu': np.flatnonzero(self.levels <= 1),
+            'eupmyeondong': np.flatnonzero(self.levels <= 2),
+            'li': np.arange(len(self.codes))
+        }
+
+        # 작물 코드별 행 인덱스
+        self.crop_rows = {}
+        if self.type == 'crop':
+            crop_codes = frame['soil_Crop_Cd'].to_numpy()
+            for crop_code in pd.unique(crop_codes):
+                self.crop_rows[crop_code] = np.flatnonzero(crop_codes == crop_code)
+
+        self.class_breaks = {
+            (crop_code, level): self._compute_breaks(values, self.rows(level, crop_code), level)
+            for crop_code in (list(self.crop_rows) or [None])
+            for level in LEVELS
+        }
+
+        # 레벨/상위 지역별 요약 통계 (처음 요청하거나 버전 적용 후 백그라운드에서 계산, 파일이 같으면 재사용)
+        self.summary = DatasetSummary(self)
+
+    def take(self, rows=None, columns=None):
+        """값 컬럼의 밀집 배열 (rows/columns 는 행/컬럼 번호, None 이면 전체)"""
+        if not self.derived_columns:
+            return self.sparse.take(rows, columns)
+
+        base_count = self.sparse.shape[1]
+        columns = np.arange(len(self.value_columns)) if columns is None else np.asarray(columns, dtype=np.int64)
+        derived = self.derived if rows is None else self.derived[rows]
+        is_base = columns < base_count
+        dense = np.empty((len(derived), len(columns)))
+        dense[:, is_base] = self.sparse.take(rows, columns[is_base])
+        dense[:, ~is_base] = derived[:, columns[~is_base] - base_count]
+        return dense
+
+    def column(self, column, rows=None):
+        """값 컬럼 하나 (컬럼명 또는 번호)"""
+        if isinstance(column, str):
+            column = self.value_columns.index(column)
+        return self.take(rows, [column])[:, 0]
+
+    def to_frame(self, rows=None):
+        """원래 CSV 와 같은 컬럼 순서/타입의 DataFrame (rows 가 None 이면 전체)"""
+        keys = self.frame if rows is None else self.frame.iloc[rows]
+        values = pd.DataFrame(self.take(rows), columns=self.value_columns, index=keys.index)
+        for col in self.integer_columns:
+            values[col] = values[col].astype(np.int64)
+        return pd.concat([keys, values], axis=1)[self.columns]
+
+    def rows(self, level, crop_code=None):
+        """레벨(과 작물)에 해당하는 행 인덱스"""
+        rows = self.partitions[level]
+        if crop_code:
+            rows = np.intersect1d(rows, self.crop_rows.get(crop_code, rows[:0]), assume_unique=True)
+        return rows
+
+    def _compute_breaks(self, values, rows, level):
+        """컬럼별 색상 구간 경계 (큰 값부터, 마지막 두 구간은 1 과 0)"""
+        breaks = {}
+        positive = np.where(values[rows] > 0, values[rows], 0)
+        max_values = positive.max(axis=0, initial=0)
+        for c, (col, max_value) in enumerate(zip(self.value_columns, max_values)):
+            if col in self.derived_columns:
+                # 파생 지표는 분위수 구간, 마지막 두 구간은 최솟값과 0
+                valid = values[rows, c][~np.isnan(values[rows, c])]
+                breaks[col] = ([float(q) for q in np.quantile(valid, DERIVED_QUANTILES)] + [float(valid.min()), 0]
+                               if valid.size else [0])
+            elif max_value <= 0:
+                breaks[col] = [0]
+            else:
+                breaks[col] = [float(max_value) * ratio for ratio in SCALE_RATIOS[level]] + [1, 0]
+        return breaks
+
+    def region_codes(self, rows, level):
+        return self.code_strings.iloc[rows].str[:LEVEL_NAME_DIGITS[level]].to_numpy()
+
+    def _output_columns(self, crop_code, columns):
+        if crop_code:
+            return CROP_COLUMNS
+        data_columns = [col for col in columns if col not in ['stdg_Cd', 'bjd_Nm']]
+        return ['region_cd', 'bjd_Nm'] + [col for col in data_columns if col != 'region_cd']
+
+    def records(self, level, crop_code=None):
+        """/api/data 응답용 레코드 목록"""
+        if crop_code and self.type != 'crop':
+            raise KeyError('soil_Crop_Cd')
+
+        rows = self.rows(level, crop_code)
+        result_data = self.to_frame(rows)
+        result_data['region_cd'] = self.region_codes(rows, level)
+        columns = self._output_columns(crop_code, result_data.columns)
+        result_data = result_data[columns]
+        # 원래 컬럼의 결측은 0, 파생 지표의 결측(면적 합계 0)은 null
+        derived = [col for col in columns if col in self.derived_columns]
+        filled = result_data.drop(columns=derived).fillna(0)
+        for col in derived:
+            filled[col] = result_data[col].astype(object).where(result_data[col].notna(), None)
+        return filled[columns].to_dict('records')
+
+    def sparse_records(self, level, crop_code=None):
+        """/api/data?format=sparse 응답 (0 과 결측은 생략, 파생 지표의 결측은 null 로 내보냄)
+
+        {"format": "sparse", "columns": [값 컬럼...],
+         "records": [{"region_cd": ..., "bjd_Nm": ..., "nz": [[컬럼 번호, 값], ...]}, ...]}
+        """
+        if crop_code and self.type != 'crop':
+            raise KeyError('soil_Crop_Cd')
+
+        rows = self.rows(level, crop_code)
+        output = self._output_columns(crop_code, self.columns + ['region_cd'])
+        value_columns = [col for col in output if col in self.value_columns]
+        key_columns = [col for col in output if col not in self.value_columns]
+
+        # 전체 값 컬럼 번호 → 응답 columns 번호 (응답에 없는 컬럼은 -1)
+        position = np.full(len(self.value_columns), -1)
+        for i, col in enumerate(value_columns):
+            position[self.value_columns.index(col)] = i
+        integer = np.array([col in self.integer_columns for col in self.value_columns])
+        derived_position = position[self.sparse.shape[1]:]
+
+        keys = self.frame.iloc[rows].copy()
+        keys['region_cd'] = self.region_codes(rows, level)
+        records = keys[key_columns].fillna(0).to_dict('records')
+        for record, row in zip(records, rows):
+            indices, data = self.sparse.row_items(row)
+            record['nz'] = [[int(position[c]), int(v) if integer[c] else float(v)]
+                            for c, v in zip(indices, data) if position[c] >= 0 and v == v]
+            record['nz'] += [[int(p), float(v) if v == v else None]
+                             for p, v in zip(derived_position, self.derived[row].tolist()) if p >= 0 and v != 0]
+        return {'format': 'sparse', 'columns': value_columns, 'records': records}
+
+    def columnar(self, level, crop_code=None, columns=None):
+        """/api/data?format=columnar 응답 (컬럼별 배열, 문자열 컬럼은 사전 번호)
+
+        {"format": "columnar", "length": 행 수,
+         "columns": {"region_cd": [...], "bjd_Nm": [사전 번호...], "acid_Rfld1_Area": [...], ...},
+         "dictionaries": {"bjd_Nm": [지역명...]}}
+
+        columns 를 주면 region_cd 와 그 컬럼들만 내보낸다 (응답 순서는 records 와 같음).
+        records 처럼 원래 컬럼의 결측은 0, 파생 지표의 결측은 null 이다.
+        """
+        if crop_code and self.type != 'crop':
+            raise KeyError('soil_Crop_Cd')
+
+        rows = self.rows(level, crop_code)
+        output = self._output_columns(crop_code, self.columns + ['region_cd'])
+        if columns:
+            unknown = [col for col in columns if col not in output]
+            if unknown:
+                raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+            output = ['region_cd'] + [col for col in output if col in columns and col != 'region_cd']
+
+        result = {}
+        dictionaries = {}
+        value_columns = [col for col in output if col in self.value_columns]
+        values = self.take(rows, [self.value_columns.index(col) for col in value_columns])
+        values = dict(zip(value_columns, values.T))
+        for col in output:
+            if col == 'region_cd':
+                result[col] = self.region_codes(rows, level).tolist()
+            elif col in self.dictionaries:
+                # 응답에 나오는 항목만 남긴 사전 (결측은 records 처럼 0)
+                codes, uniques = self.dictionaries[col]
+                used, inverse = np.unique(codes[rows], return_inverse=True)
+                dictionaries[col] = [uniques[code] if code >= 0 else 0 for code in used.tolist()]
+                result[col] = inverse.tolist()
+            elif col in self.derived_columns:
+                result[col] = [v if v == v else None for v in values[col].tolist()]
+            elif col in self.integer_columns:
+                result[col] = np.nan_to_num(values[col]).astype(np.int64).tolist()
+            else:
+                result[col] = np.nan_to_num(values[col]).tolist()
+        return {'format': 'columnar', 'length': len(rows), 'columns': result, 'dictionaries': dictionaries}
+
+
+class DataVersion:
+    """한 시점의 전체 데이터셋과 카탈로그, 그리고 이 버전 전용 캐시"""
+
+    def __init__(self, datasets, catalog):
+        self.datasets = datasets
+        self.catalog = catalog
+        self.loaded_at = time.time()
+
+        digest = hashlib.sha1()
+        for filename in sorted(datasets):
+            signature = json.dumps(datasets[filename].signature, sort_keys=True)
+            digest.update(f"{filename}:{signature}".encode('utf-8'))
+        self.version = digest.hexdigest()[:12]
+
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._building = {}  # 만드는 중인 키 → 완료 이벤트 (single-flight)
+
+    def get(self, filename):
+        return self.datasets.get(filename)
+
+    def peek(self, key):
+        """캐시에 있으면 (True, 값), 없으면 (False, None)"""
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return True, self._cache[key]
+        return False, None
+
+    def cached(self, key, builder):
+        """버전별 LRU 캐시 (값이 없으면 builder() 로 만든다)
+
+        같은 키를 여러 스레드가 동시에 요청하면 한 스레드만 만들고 나머지는 그 결과를 기다린다.
+        """
+        while True:
+            with self._cache_lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    return self._cache[key]
+                event = self._building.get(key)
+                if event is None:
+                    event = self._building[key] = threading.Event()
+                    break
+            event.wait()  # 다른 스레드가 만드는 중 (실패하면 다시 시도)
+
+        try:
+            value = builder()
+            with self._cache_lock:
+                self._cache[key] = value
+                self._cache.move_to_end(key)
+                while len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            return value
+        finally:
+            with self._cache_lock:
+                del self._building[key]
+            event.set()
+
+
+class DatasetStore:
+    """현재 데이터 버전을 들고 있다가 파일이 바뀌면 새 버전으로 교체하는 저장소"""
+
+    def __init__(self, data_dir, snapshots=None):
+        self.data_dir = data_dir
+        self.snapshots = snapshots  # SnapshotStore (CURRENT 가 있으면 data 디렉토리 대신 사용)
+        self.current = None
+        self._build_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+        self._pending = None
+        self._applied = None  # 마지막으로 반영한 파일 시그니처
+        self.listeners = []  # 새 버전 적용 후 (감시 스레드에서) 호출할 함수들
+
+    def _snapshot_manifest(self):
+        if self.snapshots is None:
+            return None
+        return self.snapshots.manifest()
+
+    def scan(self):
+        """데이터 파일 시그니처 (스냅샷이면 내용 해시, 디렉토리면 크기/수정시각)"""
+        manifest = self._snapshot_manifest()
+        if manifest is not None:
+            return {name: {'size': entry['size'], 'sha256': entry['sha256']}
+                    for name, entry in sorted(manifest['files'].items())}
+
+        signatures = {}
+        for filename in sorted(os.listdir(self.data_dir)):
+            if filename.lower().endswith('.csv'):
+                try:
+                    signatures[filename] = file_signature(os.path.join(self.data_dir, filename))
+                except FileNotFoundError:
+                    continue
+        return signatures
+
+    def _source(self, filename):
+        if self._snapshot_manifest() is not None:
+            return io.BytesIO(self.snapshots.read(filename))
+        return os.path.join(self.data_dir, filename)
+
+    def load(self):
+        """새 데이터 버전을 만들어 교체하는 함수 (바뀌지 않은 파일은 이전 버전 것을 재사용)"""
+        with self._build_lock:
+            previous = self.current
+            catalog_entries = previous.catalog if previous else read_catalog(self.data_dir)
+            datasets, entries = {}, []
+            signatures = self.scan()
+
+            for filename, signature in signatures.items():
+                old = previous.get(filename) if previous else None
+                if old is not None and old.signature == signature:
+                    dataset = old
+                else:
+                    try:
+                        frame = read_dataset_csv(self._source(filename))
+                        dataset = Dataset(filename, frame, signature)
+                    except Exception as e:
+                        print(f"데이터 로드 오류 - {filename}: {e}")
+                        if old is None:
+                            continue
+                        dataset = old  # 읽기 실패 시 이전 내용을 유지
+
+                entry = catalog_entries.get(filename)
+                if entry is None or entry.get('signature') != dataset.signature or \
+                        [col['column'] for col in entry['columns']] != dataset.value_columns:
+                    entry = describe_frame(filename, dataset.to_frame())
+                    entry['signature'] = dataset.signature
+                datasets[filename] = dataset
+                entries.append(entry)
+
+            version = DataVersion(datasets, sort_catalog(entries))
+            if previous is None or version.version != previous.version:
+                try:
+                    save_catalog(version.catalog, self.data_dir)
+                except OSError as e:
+                    print(f"카탈로그 저장 오류: {e}")
+                self.current = version  # 참조 교체 한 번으로 원자적 전환
+                print(f"데이터 버전 {version.version} 적용 ({len(datasets)}개 파일)")
+                for listener in self.listeners:
+                    try:
+                        listener(version)
+                    except Exception as e:
+                        print(f"데이터 버전 후처리 오류: {e}")
+            # 실제로 올린 데이터의 시그니처 (읽기에 실패한 파일은 달라서 감시 스레드가 다음 확인 때 다시 읽음)
+            self._applied = {filename: dataset.signature for filename, dataset in datasets.items()}
+            return self.current
+
+    def _watch(self):
+        """파일 변경 감시: 같은 시그니처가 두 번 연속 관찰되면(쓰기 완료) 새 버전을 만든다"""
+        while not self._stop.wait(WATCH_INTERVAL):
+            try:
+                signatures = self.scan()
+                if signatures == self._applied:
+                    self._pending = None
+                elif signatures == self._pending:
+                    self._pending = None
+                    self.load()
+                else:
+                    self._pending = signatures
+            except Exception as e:
+                print(f"데이터 감시 오류: {e}")
+
+    def start_watching(self):
+        if self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, name="dataset-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=WATCH_INTERVAL * 2)
+            self._watcher = None
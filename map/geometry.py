@@ -0,0 +1,166 @@
+"""행정구역 경계(GeoJSON) 기하 정보
+
+static/data 의 경계 파일을 레벨별로 한 번만 읽어 numpy 배열로 보관한다.
+    - 피처별 코드/이름/경계 상자(bbox)
+    - 피처별 변(edge) 목록 (CSR: edge_offsets, 웹 메르카토르 0~1 좌표)과 면적
+타일 래스터화, 좌표 → 지역 조회, 사용자 영역 집계 등에서 함께 사용한다.
+"""
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+# 레벨 → (경계 파일, 코드 속성, 이름 속성)  (map.js 의 ZOOM_LEVELS 와 동일)
+LEVEL_LAYERS = {
+    'sido': ("static/data/sido_wgs84.json", 'CTPRVN_CD', 'CTP_KOR_NM'),
+    'sigungu': ("static/data/si_gun_gu_wgs84.json", 'SIG_CD', 'SIG_KOR_NM'),
+    'eupmyeondong': ("static/data/eup_myeon_dong_wgs84.json", 'EMD_CD', 'EMD_KOR_NM'),
+}
+
+_layers = {}
+_layers_lock = threading.Lock()
+
+
+def mercator(lon, lat):
+    """경위도 → 웹 메르카토르 (0~1, 왼쪽 위가 원점)"""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.05112878, 85.05112878)
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / math.pi) / 2.0
+    return x, y
+
+
+def _polygons(geometry):
+    if geometry is None:
+        return []
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return []
+
+
+def polygon_edges(geometry):
+    """Polygon/MultiPolygon → (변 배열 E × 4, 면적) (메르카토르 좌표, 구멍은 면적에서 뺌)"""
+    edges, area = [], 0.0
+    for polygon in _polygons(geometry):
+        for ring_index, ring in enumerate(polygon):
+            if len(ring) < 3:
+                continue
+            ring = np.asarray(ring, dtype=np.float64)[:, :2]
+            x, y = mercator(ring[:, 0], ring[:, 1])
+            points = np.column_stack([x, y])
+            # 마지막 점과 첫 점을 잇는 변까지 포함 (닫히지 않은 링 대비)
+            ring_edges = np.hstack([points, np.roll(points, -1, axis=0)])
+            ring_area = abs(np.sum(ring_edges[:, 0] * ring_edges[:, 3] - ring_edges[:, 2] * ring_edges[:, 1])) / 2
+            area += ring_area if ring_index == 0 else -ring_area
+            edges.append(ring_edges)
+    return (np.vstack(edges) if edges else np.empty((0, 4))), area
+
+
+def fill_mask(edges, origin_x, origin_y, cell, width, height):
+    """변 목록으로 둘러싸인 영역의 격자 마스크 (height × width, 셀 중심 기준 짝홀 규칙)
+
+    스캔라인마다 변과의 교차 위치에 토글을 찍고 누적합의 홀짝으로 내부를 판정한다.
+    """
+    mask = np.zeros((height, width), dtype=bool)
+    if len(edges) == 0:
+        return mask
+    px0, py0 = (edges[:, 0] - origin_x) / cell, (edges[:, 1] - origin_y) / cell
+    px1, py1 = (edges[:, 2] - origin_x) / cell, (edges[:, 3] - origin_y) / cell
+
+    # 각 변이 지나가는 셀 행(중심 r + 0.5) 범위
+    top, bottom = np.minimum(py0, py1), np.maximum(py0, py1)
+    r_start = np.clip(np.ceil(top - 0.5), 0, height).astype(np.int64)
+    r_end = np.clip(np.ceil(bottom - 0.5), 0, height).astype(np.int64)
+    counts = np.maximum(r_end - r_start, 0)
+    if counts.sum() == 0:
+        return mask
+
+    edge_ids = np.repeat(np.arange(len(edges)), counts)
+    rows = r_start[edge_ids] + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    yc = rows + 0.5
+    x_cross = px0[edge_ids] + (yc - py0[edge_ids]) * (px1[edge_ids] - px0[edge_ids]) / (py1[edge_ids] - py0[edge_ids])
+    cols = np.clip(np.ceil(x_cross - 0.5), 0, width).astype(np.int64)
+
+    toggles = np.zeros((height, width + 1), dtype=np.int32)
+    np.add.at(toggles, (rows, cols), 1)
+    return (np.cumsum(toggles, axis=1)[:, :width] % 2).astype(bool)
+
+
+class BoundaryLayer:
+    """한 레벨의 경계 피처 모음"""
+
+    def __init__(self, level, path, id_field, name_field):
+        with open(path, 'r', encoding='utf-8') as f:
+            geojson = json.load(f)
+
+        self.level = level
+        self.path = path
+        self.id_field = id_field
+        self.codes, self.names, self.properties = [], [], []
+        edges, offsets, bboxes, lonlat_bboxes, areas = [], [0], [], [], []
+
+        for feature in geojson['features']:
+            feature_edges, area = polygon_edges(feature.get('geometry'))
+            if len(feature_edges) == 0:
+                continue
+            lonlat = np.vstack([np.asarray(ring, dtype=np.float64)[:, :2]
+                                for polygon in _polygons(feature['geometry']) for ring in polygon if len(ring) >= 3])
+
+            properties = feature.get('properties') or {}
+            self.codes.append(str(properties.get(id_field, '')))
+            self.names.append(properties.get(name_field))
+            self.properties.append(properties)
+            edges.append(feature_edges)
+            areas.append(area)
+            offsets.append(offsets[-1] + len(feature_edges))
+            bboxes.append([feature_edges[:, [0, 2]].min(), feature_edges[:, [1, 3]].min(),
+                           feature_edges[:, [0, 2]].max(), feature_edges[:, [1, 3]].max()])
+            lonlat_bboxes.append([lonlat[:, 0].min(), lonlat[:, 1].min(), lonlat[:, 0].max(), lonlat[:, 1].max()])
+
+        self.edges = np.vstack(edges) if edges else np.empty((0, 4))
+        self.edge_offsets = np.asarray(offsets, dtype=np.int64)
+        self.bboxes = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)  # 메르카토르
+        self.lonlat_bboxes = np.asarray(lonlat_bboxes, dtype=np.float64).reshape(-1, 4)
+        self.areas = np.asarray(areas, dtype=np.float64)  # 메르카토르 면적
+        self.code_index = {code: i for i, code in enumerate(self.codes)}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def feature_edges(self, index):
+        return self.edges[self.edge_offsets[index]:self.edge_offsets[index + 1]]
+
+    def candidates(self, min_x, min_y, max_x, max_y):
+        """메르카토르 bbox 와 겹치는 피처 인덱스"""
+        b = self.bboxes
+        return np.flatnonzero((b[:, 0] <= max_x) & (b[:, 2] >= min_x) & (b[:, 1] <= max_y) & (b[:, 3] >= min_y))
+
+    def locate(self, lon, lat):
+        """좌표를 포함하는 피처 인덱스 (없으면 -1)"""
+        x, y = mercator(lon, lat)
+        x, y = float(x), float(y)
+        for index in self.candidates(x, y, x, y):
+            e = self.feature_edges(index)
+            crosses = (e[:, 1] > y) != (e[:, 3] > y)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                x_cross = e[:, 0] + (y - e[:, 1]) * (e[:, 2] - e[:, 0]) / (e[:, 3] - e[:, 1])
+            if np.count_nonzero(crosses & (x_cross > x)) % 2 == 1:
+                return int(index)
+        return -1
+
+
+def load_layer(level):
+    """레벨의 경계 레이어 (처음 한 번만 읽음)"""
+    if level not in LEVEL_LAYERS:
+        return None
+    with _layers_lock:
+        if level not in _layers:
+            path, id_field, name_field = LEVEL_LAYERS[level]
+            if not os.path.exists(path):
+                return None
+            _layers[level] = BoundaryLayer(level, path, id_field, name_field)
+        return _layers[level]
@@ -0,0 +1,318 @@
+"""수집 이력(시계열) 저장소
+
+스냅샷이 발행될 때마다 각 데이터셋 값을 (stdg_Cd, 데이터셋, collected_at) 기준으로 쌓는다.
+첫 수집은 전체 값(base)을, 이후 수집은 직전 수집과 달라진 칸만 (위치, 차이) 로 저장한다.
+
+    snapshots/history/<시리즈>/
+        meta.json        컬럼, 수집 시각, 스냅샷 id 목록
+        codes.npy        행 코드 (정렬, int64)
+        base.npy         첫 수집 값 (행 × 컬럼, int32, 결측 -1)
+        d<k>_idx.npy     k 번째 수집의 변경 위치 (행 * 컬럼수 + 컬럼, 정렬)
+        d<k>_val.npy     k 번째 수집의 변경량
+
+배열은 mmap 으로 열기 때문에 조회 시 필요한 부분만 읽히고,
+지도 서버가 메모리에 올려 둔 현재 데이터(DataVersion)와는 별개로 유지된다.
+"""
+import io
+import json
+import os
+import re
+import shutil
+import threading
+
+import numpy as np
+import pandas as pd
+
+from catalog import KEY_COLUMNS, code_levels, read_dataset_csv
+
+MISSING = -1  # 결측('-') 표시값 (면적은 음수가 없음)
+
+
+def normalize_time(value):
+    """'2025-09-15', '20250915T120000' 등을 비교 가능한 14자리 문자열로 변환"""
+    digits = re.sub(r'\D', '', str(value or ''))
+    return (digits + '0' * 14)[:14]
+
+
+def series_key(filename, crop_code=None):
+    stem = os.path.splitext(filename)[0]
+    return f"{stem}__{crop_code}" if crop_code else stem
+
+
+def _exact_columns(values):
+    """값이 모두 0 이상의 정수(또는 결측)인 컬럼 마스크 (int32 로 손실 없이 저장할 수 있는 컬럼)"""
+    with np.errstate(invalid='ignore'):
+        exact = np.isnan(values) | ((values >= 0) & (values <= np.iinfo(np.int32).max) & (values == np.floor(values)))
+    return exact.all(axis=0)
+
+
+def _encode(values):
+    """float 값(NaN 결측)을 저장용 int32 로 변환 (0 이상의 정수가 아닌 값이 있으면 ValueError)"""
+    if not _exact_columns(values).all():
+        raise ValueError("이력에는 0 이상의 정수 값만 저장할 수 있습니다")
+    return np.where(np.isnan(values), MISSING, values).astype(np.int32)
+
+
+def _decode(values):
+    values = values.astype(np.float64)
+    values[values < 0] = np.nan
+    return values
+
+
+class Series:
+    """하나의 시리즈(데이터셋, 작물)에 대한 이력"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.columns = self.meta['columns']
+        self.times = self.meta['times']
+        self.codes = np.load(os.path.join(path, "codes.npy"), mmap_mode='r')
+        self.base = np.load(os.path.join(path, "base.npy"), mmap_mode='r')
+        self.deltas = [
+            (np.load(os.path.join(path, f"d{k}_idx.npy"), mmap_mode='r'),
+             np.load(os.path.join(path, f"d{k}_val.npy"), mmap_mode='r'))
+            for k in range(1, len(self.times))
+        ]
+
+    def time_index(self, value):
+        """value 시각 이전(포함)의 마지막 수집 인덱스 (없으면 -1)"""
+        target = normalize_time(value)
+        times = [normalize_time(t) for t in self.times]
+        return int(np.searchsorted(times, target, side='right')) - 1
+
+    def row_history(self, row):
+        """한 행의 전체 수집 이력 (수집 × 컬럼, 저장값 그대로)"""
+        width = len(self.columns)
+        result = np.empty((len(self.times), width), dtype=np.int64)
+        current = np.asarray(self.base[row], dtype=np.int64).copy()
+        result[0] = current
+        lo_key, hi_key = row * width, (row + 1) * width
+        for k, (idx, val) in enumerate(self.deltas, start=1):
+            lo, hi = np.searchsorted(idx, [lo_key, hi_key])
+            current[np.asarray(idx[lo:hi]) - lo_key] += val[lo:hi]
+            result[k] = current
+        return result
+
+    def matrix_at(self, t):
+        """t 번째 수집 시점의 전체 값 (행 × 컬럼, 저장값 그대로)"""
+        matrix = np.asarray(self.base, dtype=np.int64).copy()
+        flat = matrix.reshape(-1)
+        for idx, val in self.deltas[:t]:
+            flat[np.asarray(idx)] += val
+        return matrix
+
+
+class HistoryStore:
+    """시계열 이력 저장소"""
+
+    def __init__(self, root):
+        self.root = root
+        self._series = {}
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # sync 는 시작 스레드와 버전 교체 리스너에서 동시에 불릴 수 있음
+
+    # --- 기록 ---
+
+    def series_path(self, key):
+        return os.path.join(self.root, key)
+
+    def synced_snapshots(self):
+        ids = set()
+        if os.path.isdir(self.root):
+            for key in os.listdir(self.root):
+                meta_path = os.path.join(self.root, key, "meta.json")
+                if os.path.exists(meta_path):
+                    with open(meta_path, 'r', encoding='utf-8') as f:
+                        ids.update(json.load(f)['snapshots'])
+        return ids
+
+    def append(self, key, collected_at, snapshot_id, codes, columns, values):
+        """한 번의 수집 결과를 시리즈에 추가하는 함수 (values: 행 × 컬럼 float, NaN 결측)"""
+        path = self.series_path(key)
+        order = np.argsort(codes)
+        codes = np.asarray(codes, dtype=np.int64)[order]
+        encoded = _encode(np.asarray(values, dtype=np.float64)[order])
+
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            self._write(path, {'columns': list(columns), 'times': [collected_at], 'snapshots': [snapshot_id]},
+                        codes, [encoded])
+            return
+
+        series = Series(path)
+        if snapshot_id in series.meta['snapshots']:
+            return
+
+        if (list(columns) == series.columns and len(codes) == len(series.codes)
+                and np.array_equal(codes, series.codes)):
+            # 같은 레이아웃: 직전 수집과의 차이만 저장
+            previous = series.matrix_at(len(series.times) - 1)
+            delta = encoded.astype(np.int64).reshape(-1) - previous.reshape(-1)
+            idx = np.flatnonzero(delta)
+            k = len(series.times)
+            np.save(os.path.join(path, f"d{k}_idx.npy"), idx.astype(np.int64))
+            np.save(os.path.join(path, f"d{k}_val.npy"), delta[idx].astype(np.int32))
+            meta = dict(series.meta)
+            meta['times'] = series.times + [collected_at]
+            meta['snapshots'] = series.meta['snapshots'] + [snapshot_id]
+            self._write_meta(path, meta)
+        else:
+            # 코드나 컬럼이 바뀌면 합집합 레이아웃으로 전체를 다시 인코딩한다 (드묾)
+            all_columns = list(series.columns) + [c for c in columns if c not in series.columns]
+            all_codes = np.union1d(np.asarray(series.codes), codes)
+            matrices = [self._relayout(series.matrix_at(t), series.codes, series.columns, all_codes, all_columns)
+                        for t in range(len(series.times))]
+            matrices.append(self._relayout(encoded, codes, list(columns), all_codes, all_columns))
+            meta = {'columns': all_columns, 'times': series.times + [collected_at],
+                    'snapshots': series.meta['snapshots'] + [snapshot_id]}
+            self._write(path, meta, all_codes, matrices)
+
+        with self._lock:
+            self._series.pop(key, None)
+
+    @staticmethod
+    def _relayout(matrix, codes, columns, all_codes, all_columns):
+        result = np.full((len(all_codes), len(all_columns)), MISSING, dtype=np.int64)
+        rows = np.searchsorted(all_codes, np.asarray(codes))
+        cols = [all_columns.index(c) for c in columns]
+        result[np.ix_(rows, cols)] = matrix
+        return result
+
+    def _write(self, path, meta, codes, matrices):
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "codes.npy"), np.asarray(codes, dtype=np.int64))
+        np.save(os.path.join(tmp_path, "base.npy"), np.asarray(matrices[0], dtype=np.int32))
+        for k in range(1, len(matrices)):
+            delta = (np.asarray(matrices[k], dtype=np.int64) - np.asarray(matrices[k - 1], dtype=np.int64)).reshape(-1)
+            idx = np.flatnonzero(delta)
+            np.save(os.path.join(tmp_path, f"d{k}_idx.npy"), idx.astype(np.int64))
+            np.save(os.path.join(tmp_path, f"d{k}_val.npy"), delta[idx].astype(np.int32))
+        self._write_meta(tmp_path, meta)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _write_meta(path, meta):
+        tmp_meta = os.path.join(path, "meta.json.tmp")
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_meta, os.path.join(path, "meta.json"))
+
+    def ingest_snapshot(self, snapshots, snapshot_id, previous_id=None):
+        """스냅샷 하나의 파일을 이력에 추가하는 함수
+
+        각 파일은 매니페스트 항목의 수집 시각(collected_at)으로 기록하고,
+        직전 스냅샷(previous_id, 없으면 목록에서 바로 앞 스냅샷)과 sha256 이 같은 파일은 건너뛴다.
+        """
+        manifest = snapshots.manifest(snapshot_id)
+        if previous_id is None:
+            ids = snapshots.list_snapshots()
+            position = ids.index(snapshot_id) if snapshot_id in ids else 0
+            previous_id = ids[position - 1] if position > 0 else None
+        previous = snapshots.manifest(previous_id)['files'] if previous_id else {}
+
+        for filename, entry in manifest['files'].items():
+            if filename in previous and previous[filename].get('sha256') == entry.get('sha256'):
+                continue  # 이전 스냅샷에서 물려받은 (다시 수집하지 않은) 파일
+            collected_at = entry.get('collected_at') or manifest['created_at']
+            frame = read_dataset_csv(io.BytesIO(snapshots.read(filename, snapshot_id)))
+            value_columns = [col for col in frame.columns if col not in KEY_COLUMNS]
+            values = frame[value_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+            codes = frame['stdg_Cd'].to_numpy(dtype=np.int64)
+
+            # 정수로 저장할 수 없는 컬럼(소수, 음수)은 반올림하지 않고 이력에서 제외
+            exact = _exact_columns(values)
+            if not exact.all():
+                print(f"이력 제외 컬럼 - {filename}: {', '.join(np.array(value_columns)[~exact])}")
+                value_columns = [col for col, keep in zip(value_columns, exact) if keep]
+                values = values[:, exact]
+
+            if 'soil_Crop_Cd' in frame.columns:
+                crop_codes = frame['soil_Crop_Cd'].to_numpy()
+                for crop_code in pd.unique(crop_codes):
+                    mask = crop_codes == crop_code
+                    self.append(series_key(filename, crop_code), collected_at, snapshot_id,
+                                codes[mask], value_columns, values[mask])
+            else:
+                self.append(series_key(filename), collected_at, snapshot_id,
+                            codes, value_columns, values)
+
+    def sync(self, snapshots):
+        """아직 이력에 없는 스냅샷을 오래된 순서로 추가하는 함수 (동시에 하나만 실행)"""
+        with self._sync_lock:
+            os.makedirs(self.root, exist_ok=True)
+            done = self.synced_snapshots()
+            added = []
+            previous_id = None
+            for snapshot_id in snapshots.list_snapshots():
+                if snapshot_id not in done:
+                    self.ingest_snapshot(snapshots, snapshot_id, previous_id)
+                    added.append(snapshot_id)
+                previous_id = snapshot_id
+        if added:
+            print(f"이력 저장소에 {len(added)}개 스냅샷 추가")
+        return added
+
+    # --- 조회 ---
+
+    def series(self, key):
+        with self._lock:
+            if key not in self._series:
+                path = self.series_path(key)
+                if not os.path.exists(os.path.join(path, "meta.json")):
+                    return None
+                self._series[key] = Series(path)
+            return self._series[key]
+
+    def list_series(self):
+        if not os.path.isdir(self.root):
+            return []
+        result = []
+        for key in sorted(os.listdir(self.root)):
+            series = self.series(key)
+            if series is not None:
+                result.append({'series': key, 'times': series.times, 'columns': series.columns,
+                               'rows': int(len(series.codes))})
+        return result
+
+    def trend(self, key, code, columns=None):
+        """한 지역의 수집 시점별 값"""
+        series = self.series(key)
+        if series is None:
+            return None
+        row = int(np.searchsorted(series.codes, int(code)))
+        if row >= len(series.codes) or series.codes[row] != int(code):
+            return None
+
+        values = _decode(series.row_history(row))
+        col_idx = [series.columns.index(c) for c in (columns or series.columns) if c in series.columns]
+        return {
+            'times': series.times,
+            'columns': [series.columns[i] for i in col_idx],
+            'values': [[None if np.isnan(v) else float(v) for v in row_values[col_idx]] for row_values in values]
+        }
+
+    def change(self, key, level, column, date_from, date_to):
+        """레벨 전체의 두 시점 사이 변화 (region 코드, 이전 값, 이후 값, 변화량 배열)"""
+        series = self.series(key)
+        if series is None or column not in series.columns:
+            return None
+        t_from, t_to = series.time_index(date_from), series.time_index(date_to)
+        if t_from < 0 or t_to < 0:
+            return None
+
+        col = series.columns.index(column)
+        rows = np.flatnonzero(code_levels(series.codes) == level)
+        before = _decode(series.matrix_at(t_from)[rows, col])
+        after = _decode(series.matrix_at(t_to)[rows, col])
+        return {
+            'from': series.times[t_from],
+            'to': series.times[t_to],
+            'codes': np.asarray(series.codes)[rows],
+            'before': before,
+            'after': after,
+            'change': after - before
+        }
@@ -0,0 +1,172 @@
+"""구간 면적 분포에서 만드는 토양 파생 지표
+
+화학성 파일은 농도 구간별 면적만 있다 (acid_Pfld1_Area ~ acid_Pfld6_Area 등).
+COLUMN_MAPPING 의 한글 컬럼명('pH 밭4.6~5.0이하_면적')에서 구간 경계를 읽어,
+지역 × 토지이용(논 Rfld / 밭 Pfld / 시설 Fachs / 과수 Fruit)마다 다음 값을 계산한다.
+
+    <성분>_<토지이용>_mean             추정 평균 (구간 중앙값의 면적 가중 평균)
+    <성분>_<토지이용>_median           추정 중앙값 (누적 면적이 절반이 되는 구간 안에서 선형 보간)
+    <성분>_<토지이용>_optimum_share    적정 범위 면적 비율
+    <성분>_<토지이용>_deficient_share  적정 범위 미만 면적 비율
+    <성분>_<토지이용>_excess_share     적정 범위 초과 면적 비율
+
+구간 경계는 이웃 구간과 이어지도록 잡는다 ('4.6~5.0이하' 는 이전 구간 상한 4.5 부터 5.0 까지).
+양 끝의 열린 구간('4.5이하', '6.6이상')은 이웃 구간과 같은 폭으로 보고, 구간 안의 면적은 고르게 분포한다고 가정한다.
+적정 범위는 OPTIMUM_RANGES (농촌진흥청 토양검정 적정 범위 기준) 이고, 범위가 없는 성분은 평균/중앙값만 만든다.
+모든 지역을 행렬 곱 한 번으로 계산하며, 면적 합계가 0 인 지역은 NaN 이다.
+"""
+import re
+
+import numpy as np
+
+from data.column_mapping import COLUMN_MAPPING
+
+BIN_COLUMN = re.compile(r'^(?P<nutrient>[a-z]+)_(?P<land>Rfld|Pfld|Fachs|Fruit)(?P<bin>\d+)_Area$')
+BIN_LABEL = re.compile(r'^(?P<name>.+?) ?(?P<land>논|밭|시설|과수)(?P<low>\d+(?:\.\d+)?)(?:~(?P<high>\d+(?:\.\d+)?))?'
+                       r'(?P<side>이하|이상)_면적$')
+
+# 성분 → 토지이용 → (적정 하한, 적정 상한)  단위는 컬럼명과 같음 (pH, g/kg, mg/kg, cmol+/kg)
+OPTIMUM_RANGES = {
+    'acid': {'Rfld': (5.5, 6.5), 'Pfld': (6.0, 7.0), 'Fachs': (6.0, 7.0), 'Fruit': (6.0, 6.5)},
+    'om': {'Rfld': (20, 30), 'Pfld': (20, 30), 'Fachs': (20, 30), 'Fruit': (25, 35)},
+    'vldpha': {'Rfld': (80, 120), 'Pfld': (300, 550), 'Fachs': (350, 500), 'Fruit': (200, 300)},
+    'posifertk': {'Rfld': (0.20, 0.30), 'Pfld': (0.50, 0.80), 'Fachs': (0.70, 0.80), 'Fruit': (0.30, 0.60)},
+    'posifertca': {'Rfld': (5.0, 6.0), 'Pfld': (5.0, 6.0), 'Fachs': (5.0, 6.0), 'Fruit': (5.0, 6.0)},
+    'posifertmg': {'Rfld': (1.5, 2.0), 'Pfld': (1.5, 2.0), 'Fachs': (1.5, 2.0), 'Fruit': (1.5, 2.0)},
+    'vldsia': {'Rfld': (157, 180)},
+}
+
+# 파생 컬럼 접미사 → 표시명
+MEASURES = {
+    'mean': '추정 평균',
+    'median': '추정 중앙값',
+    'optimum_share': '적정 비율',
+    'deficient_share': '부족 비율',
+    'excess_share': '과잉 비율',
+}
+
+
+class BinnedGroup:
+    """성분 × 토지이용 하나의 구간 컬럼과 경계"""
+
+    def __init__(self, nutrient, land, columns, edges, label):
+        self.nutrient = nutrient
+        self.land = land
+        self.columns = columns  # 구간 순서의 원래 컬럼명
+        self.edges = np.asarray(edges, dtype=np.float64)  # 구간 수 + 1 개
+        self.label = label  # 'pH 밭'
+        self.optimum = OPTIMUM_RANGES.get(nutrient, {}).get(land)
+
+    @property
+    def measures(self):
+        return list(MEASURES) if self.optimum else ['mean', 'median']
+
+    @property
+    def names(self):
+        return [f"{self.nutrient}_{self.land}_{measure}" for measure in self.measures]
+
+    def display_names(self):
+        names = {}
+        for measure, name in zip(self.measures, self.names):
+            text = f"{self.label} {MEASURES[measure]}"
+            if measure == 'optimum_share':
+                text += f" ({self.optimum[0]:g}~{self.optimum[1]:g})"
+            names[name] = text
+        return names
+
+    def range_weights(self):
+        """구간별 (부족, 적정, 과잉) 면적 비율 행렬 (구간 수 × 3)"""
+        low, high = self.optimum
+        lower, upper = self.edges[:-1], self.edges[1:]
+        width = upper - lower
+        deficient = np.clip((low - lower) / width, 0, 1)
+        excess = np.clip((upper - high) / width, 0, 1)
+        return np.column_stack([deficient, 1 - deficient - excess, excess])
+
+    def compute(self, areas):
+        """구간 면적 (행 × 구간 수) → 파생값 (행 × len(names))"""
+        areas = np.nan_to_num(areas)
+        total = areas.sum(axis=1)
+        valid = total > 0
+        safe_total = np.where(valid, total, 1.0)
+
+        lower, upper = self.edges[:-1], self.edges[1:]
+        mean = areas @ ((lower + upper) / 2) / safe_total
+
+        # 누적 면적이 절반을 처음 넘는 구간에서 선형 보간
+        cumulative = np.cumsum(areas, axis=1)
+        half = total / 2
+        index = np.minimum((cumulative < half[:, None]).sum(axis=1), areas.shape[1] - 1)
+        bin_area = np.take_along_axis(areas, index[:, None], axis=1)[:, 0]
+        before = np.take_along_axis(cumulative, index[:, None], axis=1)[:, 0] - bin_area
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(bin_area > 0, (half - before) / bin_area, 0.5)
+        median = lower[index] + np.clip(fraction, 0, 1) * (upper[index] - lower[index])
+
+        result = [mean, median]
+        if self.optimum:
+            shares = areas @ self.range_weights() / safe_total[:, None]
+            result += [shares[:, 1], shares[:, 0], shares[:, 2]]
+        result = np.column_stack(result)
+        result[~valid] = np.nan
+        return result
+
+
+def _edges(labels):
+    """구간 한글 컬럼명 목록 → 이어진 구간 경계 (해석할 수 없으면 None)"""
+    parsed = [BIN_LABEL.match(label or '') for label in labels]
+    if len(parsed) < 3 or not all(parsed):
+        return None
+    if parsed[0]['side'] != '이하' or parsed[-1]['side'] != '이상':
+        return None
+    if any(match['side'] != '이하' for match in parsed[1:-1]):
+        return None
+
+    # 안쪽 경계는 각 구간의 상한 (하한 표기는 이전 상한 + 최소 단위라 쓰지 않음)
+    inner = [float(match['high'] or match['low']) for match in parsed[:-1]]
+    if any(b <= a for a, b in zip(inner, inner[1:])):
+        return None
+    first = inner[0] - (inner[1] - inner[0])
+    last = inner[-1] + (inner[-1] - inner[-2])
+    return [round(edge, 6) for edge in [max(first, 0.0)] + inner + [last]]
+
+
+def binned_groups(columns, mapping=COLUMN_MAPPING):
+    """컬럼 목록에서 구간 면적 컬럼 그룹을 찾아 경계를 해석한 목록"""
+    found = {}
+    for col in columns:
+        match = BIN_COLUMN.match(col)
+        if match:
+            found.setdefault((match['nutrient'], match['land']), []).append((int(match['bin']), col))
+
+    groups = []
+    for (nutrient, land), bins in found.items():
+        bins.sort()
+        if [number for number, _ in bins] != list(range(1, len(bins) + 1)):
+            continue
+        group_columns = [col for _, col in bins]
+        labels = [mapping.get(col) for col in group_columns]
+        edges = _edges(labels)
+        if edges is None:
+            continue
+        first = BIN_LABEL.match(labels[0])
+        groups.append(BinnedGroup(nutrient, land, group_columns, edges, f"{first['name']} {first['land']}"))
+    return groups
+
+
+def derive(groups, columns, values):
+    """값 배열 (행 × columns) 에서 그룹들의 파생 컬럼 이름과 배열 (행 × 파생 컬럼 수)"""
+    names, blocks = [], []
+    for group in groups:
+        index = [columns.index(col) for col in group.columns]
+        names += group.names
+        blocks.append(group.compute(values[:, index]))
+    if not blocks:
+        return [], np.empty((len(values), 0))
+    return names, np.hstack(blocks)
+
+
+# 모든 파생 컬럼의 표시명 (카탈로그)
+INDICATOR_NAMES = {}
+for _group in binned_groups(COLUMN_MAPPING):
+    INDICATOR_NAMES.update(_group.display_names())
@@ -0,0 +1,375 @@
+"""요청 계측 (Server-Timing, 지연 시간 히스토그램, 런타임 프로파일링)
+
+요청마다 이름 붙은 단계(phase)의 소요 시간을 모아 Server-Timing 헤더로 내보내고,
+엔드포인트(라우트 경로)별 지연 시간을 최근 몇 분 동안의 히스토그램으로 쌓아 /api/metrics 로 보여준다.
+
+    with phase('records'):        # 단계 시간 측정 (스레드 풀 안에서도 같은 요청에 기록됨)
+        ...
+    Server-Timing: records;dur=12.4, encode;dur=3.1, cache;desc="miss", total;dur=17.0
+
+느린 엔드포인트를 조사할 때는 실행 중에 프로파일링을 켤 수 있다 (SOIL_MAP_DEBUG=1 일 때만).
+경로를 지정해 두면 그 경로로 들어오는 다음 요청 n 개에 대해
+    cprofile     cProfile (run_cpu/run_io 로 넘긴 작업, 이벤트 루프는 대기 시간만 잡혀서 제외)
+    sample       스택 샘플러 (요청이 처리되는 동안 모든 스레드의 스택을 주기적으로 수집)
+    tracemalloc  요청 전후 메모리 할당 스냅샷 비교
+결과를 남긴다.
+"""
+import bisect
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+DEBUG_ENABLED = os.environ.get('SOIL_MAP_DEBUG') == '1'
+
+# 히스토그램 구간 경계 (ms, 1-2-5 간격), 마지막 구간은 그 이상
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 20000, 50000]
+WINDOW_SECONDS = 60  # 히스토그램 한 칸의 시간 (초)
+WINDOW_COUNT = 15  # 유지하는 칸 수 (최근 15분)
+
+PROFILE_MODES = ('cprofile', 'sample', 'tracemalloc')
+SAMPLE_INTERVAL = 0.005  # 스택 샘플링 주기 (초)
+PROFILE_RESULTS = 20  # 보관하는 프로파일 결과 수
+REPORT_LINES = 30
+
+# 샘플링에서 제외하는 대기 중인 스택의 맨 위 프레임 (유휴 스레드, 이벤트 루프 대기)
+IDLE_FRAMES = {'threading.py:wait', 'selectors.py:select', 'thread.py:_worker'}
+
+
+class RequestTimings:
+    """요청 하나의 단계별 소요 시간 (여러 스레드에서 기록)"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}  # 이름 → 누적 초 (같은 이름은 합산)
+        self.notes = {}  # 이름 → 설명 (캐시 적중 여부 등)
+        self.profile = None  # 이 요청에 걸린 ProfileSession
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def note(self, name, description):
+        with self._lock:
+            self.notes[name] = description
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def header(self):
+        with self._lock:
+            parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+            parts += [f'{name};desc="{description}"' for name, description in self.notes.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+CURRENT = ContextVar('request_timings', default=None)
+
+
+@contextmanager
+def phase(name):
+    """현재 요청의 단계 시간 측정 (요청 밖에서는 아무것도 하지 않음)"""
+    timings = CURRENT.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def note(name, description):
+    timings = CURRENT.get()
+    if timings is not None:
+        timings.note(name, description)
+
+
+def instrumented(func, queue_phase):
+    """스레드 풀로 넘기는 함수 감싸기 (대기 시간 기록, cprofile 세션이면 그 스레드도 프로파일링)"""
+    timings = CURRENT.get()
+    if timings is None:
+        return func
+    submitted = time.perf_counter()
+
+    def run(*args):
+        timings.add(queue_phase, time.perf_counter() - submitted)
+        session = timings.profile
+        if session is not None and session.mode == 'cprofile':
+            return session.run_profiled(func, *args)
+        return func(*args)
+    return run
+
+
+# --- 지연 시간 히스토그램 ---
+
+class LatencyHistograms:
+    """엔드포인트별 지연 시간 히스토그램 (WINDOW_SECONDS 단위 칸을 WINDOW_COUNT 개 유지)"""
+
+    def __init__(self, window=WINDOW_SECONDS, windows=WINDOW_COUNT):
+        self.window = window
+        self.windows = windows
+        self._series = {}  # 엔드포인트 → deque[(칸 시작 시각, 칸)]
+        self._lock = threading.Lock()
+
+    def _new_slot(self):
+        return {'buckets': [0] * (len(LATENCY_BUCKETS) + 1), 'count': 0, 'errors': 0,
+                'sum': 0.0, 'max': 0.0, 'phases': {}}
+
+    def record(self, endpoint, seconds, status, phases):
+        ms = seconds * 1000
+        slot_start = int(time.time() // self.window * self.window)
+        with self._lock:
+            series = self._series.setdefault(endpoint, deque(maxlen=self.windows))
+            if not series or series[-1][0] != slot_start:
+                series.append((slot_start, self._new_slot()))
+            slot = series[-1][1]
+            slot['buckets'][bisect.bisect_left(LATENCY_BUCKETS, ms)] += 1
+            slot['count'] += 1
+            slot['errors'] += status >= 500
+            slot['sum'] += ms
+            slot['max'] = max(slot['max'], ms)
+            for name, phase_seconds in phases.items():
+                slot['phases'][name] = slot['phases'].get(name, 0.0) + phase_seconds * 1000
+
+    def snapshot(self):
+        """최근 구간 전체를 합친 엔드포인트별 통계"""
+        oldest = time.time() - self.window * self.windows
+        result = {}
+        with self._lock:
+            items = [(endpoint, [slot for start, slot in series if start >= oldest])
+                     for endpoint, series in self._series.items()]
+        for endpoint, slots in items:
+            if not slots:
+                continue
+            buckets = [sum(values) for values in zip(*(slot['buckets'] for slot in slots))]
+            count = sum(slot['count'] for slot in slots)
+            phases = {}
+            for slot in slots:
+                for name, ms in slot['phases'].items():
+                    phases[name] = phases.get(name, 0.0) + ms
+            result[endpoint] = {
+                'count': count,
+                'errors': sum(slot['errors'] for slot in slots),
+                'mean_ms': round(sum(slot['sum'] for slot in slots) / count, 2),
+                'max_ms': round(max(slot['max'] for slot in slots), 2),
+                'p50_ms': _bucket_quantile(buckets, count, 0.5),
+                'p90_ms': _bucket_quantile(buckets, count, 0.9),
+                'p99_ms': _bucket_quantile(buckets, count, 0.99),
+                'buckets': {str(le): n for le, n in zip(LATENCY_BUCKETS + ['+Inf'], buckets)},
+                'phase_mean_ms': {name: round(ms / count, 2) for name, ms in phases.items()},
+            }
+        return {'window_seconds': self.window * self.windows, 'endpoints': result}
+
+
+def _bucket_quantile(buckets, count, q):
+    """분위수가 속한 구간의 상한 (ms, 마지막 구간이면 None)"""
+    target = q * count
+    seen = 0
+    for le, n in zip(LATENCY_BUCKETS, buckets):
+        seen += n
+        if seen >= target:
+            return le
+    return None
+
+
+# --- 프로파일링 ---
+
+class StackSampler:
+    """모든 스레드의 스택을 주기적으로 모으는 샘플러 (접힌 스택 문자열 → 횟수)"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack[0] in IDLE_FRAMES:
+                    continue
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def report(self):
+        top = sorted(self.counts.items(), key=lambda item: -item[1])[:REPORT_LINES]
+        return {'samples': self.samples, 'interval_ms': self.interval * 1000,
+                'stacks': [{'stack': stack, 'count': count} for stack, count in top]}
+
+
+class ProfileSession:
+    """요청 하나에 대한 프로파일링"""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._snapshot = None
+        self._started_tracing = False
+
+    def start(self):
+        if self.mode == 'sample':
+            self._sampler = StackSampler()
+            self._sampler.start()
+        elif self.mode == 'tracemalloc':
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                self._started_tracing = True
+            self._snapshot = tracemalloc.take_snapshot()
+
+    def run_profiled(self, func, *args):
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            with self._lock:
+                self._profiles.append(profile)
+
+    def finish(self):
+        """프로파일링을 끝내고 보고서(dict)를 돌려주는 함수"""
+        if self.mode == 'cprofile':
+            with self._lock:
+                profiles = list(self._profiles)
+            if not profiles:
+                return {'calls': 0, 'text': ''}  # 캐시 적중 등으로 스레드 풀 작업이 없었음
+            out = io.StringIO()
+            stats = pstats.Stats(*profiles, stream=out)
+            stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+            return {'calls': len(profiles), 'text': out.getvalue()}
+        if self.mode == 'sample':
+            self._sampler.stop()
+            return self._sampler.report()
+
+        after = tracemalloc.take_snapshot()
+        if self._started_tracing:
+            tracemalloc.stop()
+        top = after.compare_to(self._snapshot, 'lineno')[:REPORT_LINES]
+        return {'allocations': [{'location': str(stat.traceback[0]), 'size_diff': stat.size_diff,
+                                 'count_diff': stat.count_diff} for stat in top]}
+
+
+class Profiler:
+    """경로별 프로파일링 예약과 결과 보관"""
+
+    def __init__(self):
+        self._armed = {}  # 경로(접두사) → [모드, 남은 요청 수]
+        self.results = deque(maxlen=PROFILE_RESULTS)
+        self._lock = threading.Lock()
+        self._active = False  # cProfile/tracemalloc 은 프로세스 전체에 하나만
+
+    def arm(self, path, mode, count=1):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"알 수 없는 프로파일 모드: {mode} ({', '.join(PROFILE_MODES)})")
+        with self._lock:
+            self._armed[path] = [mode, count]
+
+    def disarm(self, path=None):
+        with self._lock:
+            if path is None:
+                self._armed.clear()
+            else:
+                self._armed.pop(path, None)
+
+    def armed(self):
+        with self._lock:
+            return {path: {'mode': mode, 'remaining': count} for path, (mode, count) in self._armed.items()}
+
+    def session_for(self, path):
+        """path 에 예약된 프로파일링이 있으면 세션을 만들어 돌려주는 함수 (동시에 하나만)"""
+        with self._lock:
+            if self._active or not self._armed:
+                return None
+            for prefix, entry in self._armed.items():
+                if path.startswith(prefix):
+                    entry[1] -= 1
+                    if entry[1] <= 0:
+                        del self._armed[prefix]
+                    self._active = True
+                    return ProfileSession(entry[0])
+        return None
+
+    def finish(self, session, path, query, seconds):
+        try:
+            report = session.finish()
+        finally:
+            with self._lock:
+                self._active = False
+        self.results.append(dict(path=path, query=query, mode=session.mode, at=time.time(),
+                                 duration_ms=round(seconds * 1000, 2), report=report))
+
+
+HISTOGRAMS = LatencyHistograms()
+PROFILER = Profiler()
+
+
+class TimingMiddleware:
+    """요청 단계 시간 측정 + Server-Timing 헤더 + 엔드포인트별 히스토그램 (ASGI 미들웨어)"""
+
+    def __init__(self, app, histograms=HISTOGRAMS, profiler=PROFILER):
+        self.app = app
+        self.histograms = histograms
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = CURRENT.set(timings)
+        status = 500
+        session = self.profiler.session_for(scope['path']) if DEBUG_ENABLED else None
+        if session is not None:
+            session.start()
+            timings.profile = session
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', timings.header().encode('latin-1')))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            CURRENT.reset(token)
+            seconds = timings.elapsed()
+            route = scope.get('route')
+            endpoint = getattr(route, 'path', None) or 'unmatched'
+            self.histograms.record(endpoint, seconds, status, timings.phases)
+            if session is not None:
+                self.profiler.finish(session, scope['path'], scope.get('query_string', b'').decode('latin-1'),
+                                     seconds)
@@ -0,0 +1,137 @@
+"""지도 응답 정적 빌드 (사전 렌더링)
+
+data 는 수집 실행이 스냅샷을 발행할 때만 바뀌므로, /api/data 의 모든 (파일, 작물, 레벨, 형식) 조합과
+메타데이터 응답, 레벨별 경계 GeoJSON 을 미리 만들어 정적 파일로 내보낸다.
+응답은 /api/batch 와 같은 핸들러로 만들므로 API 응답과 바이트 단위로 같다.
+
+    prebuilt/
+        manifest.json                                  데이터 버전, 경로 → 파일 대응
+        api_data-SoilExamStat_pH.csv-li-columnar.<해시>.json
+        api_data-SoilExamStat_pH.csv-li-columnar.<해시>.json.gz   (gzip -9)
+        api_data-SoilExamStat_pH.csv-li-columnar.<해시>.json.br   (brotli 모듈이 있을 때만)
+
+파일 이름에 내용 해시가 들어가므로 바뀌지 않은 응답은 다시 쓰지 않고, 새 매니페스트에 없는 파일은 지운다.
+매니페스트의 routes 키는 route_key(경로, 파라미터) 로, 지도 워커(map_worker.js 의 routeKey)와 같은 규칙이다.
+앱은 이 디렉토리를 /prebuilt 로 서빙하고, 워커는 매니페스트의 버전이 현재 데이터 버전과 같을 때만 사용한다.
+nginx 등의 정적 서버로 서빙할 때는 gzip_static / brotli_static 으로 압축 파일을 바로 내보낼 수 있다.
+
+사용법:  python prerender.py [출력 디렉토리] [--formats records,columnar]
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+
+import root_modules  # noqa: F401  (static_assets 경로)
+from catalog import LEVELS
+from geometry import LEVEL_LAYERS
+from static_assets import ENCODINGS, write_atomic, write_encoded
+
+PREBUILT_DIR = "prebuilt"
+MANIFEST_NAME = "manifest.json"
+DATA_FORMATS = ('records', 'columnar')
+ARTIFACT_PATTERN = re.compile(r'\.[0-9a-f]{12}\.json(\.gz|\.br)?$')  # 정리 대상 (빌드가 만든 파일만)
+
+
+def route_key(path, params):
+    """매니페스트 키 (값이 없는 파라미터는 빼고 이름 순서로, URL 인코딩 없이)"""
+    query = '&'.join(f"{key}={value}" for key, value in sorted(params.items()) if value is not None)
+    return f"{path}?{query}" if query else path
+
+
+def artifact_name(path, params, body):
+    stem = '-'.join([path.strip('/').replace('/', '_')] +
+                    [str(value) for _, value in sorted(params.items()) if value is not None])
+    stem = re.sub(r'[^0-9A-Za-z._-]', '_', stem)
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}.json"
+
+
+def enumerate_routes(version, formats=DATA_FORMATS):
+    """사전 렌더링할 (경로, 파라미터) 목록"""
+    routes = [("/api/csv-list", {}), ("/api/catalog", {}), ("/api/version", {})]
+    routes += [("/api/boundary", {'level': level}) for level in LEVEL_LAYERS]
+
+    for filename, entry in version.catalog.items():
+        dataset = version.get(filename)
+        if dataset is None:
+            continue
+        routes += [("/api/catalog", {'filename': filename}),
+                   ("/api/crops", {'filename': filename}),
+                   ("/api/soil-columns", {'filename': filename})]
+        for crop_code in [crop['soil_Crop_Cd'] for crop in entry['crops']] or [None]:
+            for level in LEVELS:
+                for data_format in formats:
+                    routes.append(("/api/data", {'filename': filename, 'crop_code': crop_code, 'level': level,
+                                                 'format': data_format}))
+                for column in dataset.class_breaks.get((crop_code, level), {}):
+                    routes.append(("/api/class-breaks", {'filename': filename, 'crop_code': crop_code,
+                                                         'level': level, 'column': column}))
+    return routes
+
+
+async def _render(version, routes, out_dir):
+    # 앱 모듈은 데이터를 읽으므로 빌드할 때만 가져옴
+    from app import REQUEST_VERSION, _run_batch_query
+    from data_access import run_cpu
+
+    REQUEST_VERSION.set(version)
+    manifest, skipped = {}, []
+    for path, params in routes:
+        status, body = await _run_batch_query({'path': path, 'params': {k: v for k, v in params.items()
+                                                                        if v is not None}})
+        if status != 200:
+            skipped.append({'route': route_key(path, params), 'status': status})
+            continue
+        name = artifact_name(path, params, body)
+        # 이름에 내용 해시가 있으므로 이미 있는 파일은 다시 압축하지 않음
+        sizes = await run_cpu(write_encoded, os.path.join(out_dir, name), body)
+        manifest[route_key(path, params)] = dict(sizes, file=name)
+    return manifest, skipped
+
+
+def build(version, out_dir=PREBUILT_DIR, formats=DATA_FORMATS):
+    """데이터 버전의 정적 빌드를 만들고 매니페스트 반환"""
+    os.makedirs(out_dir, exist_ok=True)
+    started = time.time()
+    routes = enumerate_routes(version, formats)
+    files, skipped = asyncio.run(_render(version, routes, out_dir))
+
+    manifest = {
+        'version': version.version,
+        'built_at': time.strftime('%Y%m%dT%H%M%S'),
+        'seconds': round(time.time() - started, 1),
+        'encodings': [encoding for encoding, _ in ENCODINGS],
+        'routes': files,
+        'skipped': skipped,
+    }
+    write_atomic(os.path.join(out_dir, MANIFEST_NAME),
+                 json.dumps(manifest, ensure_ascii=False, indent=1).encode('utf-8'))
+
+    # 새 매니페스트에 없는 이전 빌드 파일 정리
+    keep = {MANIFEST_NAME}
+    for entry in files.values():
+        keep.update([entry['file'], entry['file'] + '.gz', entry['file'] + '.br'])
+    for name in os.listdir(out_dir):
+        if ARTIFACT_PATTERN.search(name) and name not in keep:
+            os.remove(os.path.join(out_dir, name))
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="지도 응답 정적 빌드")
+    parser.add_argument("out_dir", nargs="?", default=PREBUILT_DIR)
+    parser.add_argument("--formats", default=','.join(DATA_FORMATS), help="/api/data 형식 (records,columnar,sparse)")
+    args = parser.parse_args()
+
+    from app import STORE
+
+    result = build(STORE.current, args.out_dir, tuple(args.formats.split(',')))
+    raw = sum(entry['size'] for entry in result['routes'].values())
+    packed = sum(entry['gzip'] for entry in result['routes'].values())
+    print(f"데이터 버전 {result['version']}: 응답 {len(result['routes'])}개 "
+          f"({raw / 1e6:.1f}MB, gzip {packed / 1e6:.1f}MB), 건너뜀 {len(result['skipped'])}개, "
+          f"{result['seconds']}초 → {args.out_dir}")
@@ -0,0 +1,302 @@
+"""여러 데이터셋에 걸친 지역 조건 검색
+
+작은 식 언어로 조건을 받아 레벨의 지역 인덱스 위에서 numpy 배열 연산으로 한 번에 평가한다.
+
+    share(acid_Fruit1_Area) + share(acid_Fruit2_Area) > 0.3 and share(poor_Drain_Area) > 0.5
+
+    컬럼        acid_Fruit1_Area            (모든 데이터셋에서 이름이 하나뿐일 때)
+                DrngGrad.etc_Area           (데이터셋 별칭으로 지정, 별칭은 파일명의 '_' 뒤 부분)
+                SoilCharacStat_DrngGrad.etc_Area
+    파생값      share(컬럼)                 같은 그룹 합계 대비 비율 (ranking.metric_values 의 share:)
+                apple.score                 작물 적성 점수
+    연산        + - * /, 비교 (< <= > >= == !=, 연쇄 비교 가능), and / or / not, 괄호, 숫자
+
+식은 파이썬 ast 로 파싱한 뒤 허용한 노드만 남기고, 이름을 '별칭.컬럼' 으로 바꾼 정규화 식(ast.unparse)을
+캐시 키로 쓴다. 값이 없는 지역(데이터셋에 행이 없거나 결측)은 NaN 이라 비교 결과가 거짓이 된다.
+"""
+import ast
+import operator
+import os
+
+import numpy as np
+
+import root_modules  # noqa: F401  (pnu_registry 경로)
+from pnu_registry import LEVEL_NAME_DIGITS
+from ranking import candidate_rows, metric_values
+
+MAX_EXPRESSION_LENGTH = 500
+MAX_NODES = 200
+
+COMPARE_OPERATORS = {ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+                     ast.Eq: operator.eq, ast.NotEq: operator.ne}
+BINARY_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+
+class QueryError(ValueError):
+    pass
+
+
+def dataset_alias(filename):
+    """파일명 → 별칭 (SoilExamStat_pH.csv → pH)"""
+    stem = os.path.splitext(filename)[0]
+    return stem.split('_', 1)[1] if '_' in stem else stem
+
+
+class QueryNames:
+    """데이터 버전의 이름 해석표 (별칭/파일명 → 데이터셋, 컬럼 → 데이터셋 목록)"""
+
+    def __init__(self, version):
+        self.datasets = {}
+        aliases = {}
+        for filename in version.datasets:
+            aliases.setdefault(dataset_alias(filename), []).append(filename)
+        for alias, filenames in aliases.items():
+            for filename in filenames:
+                # 별칭이 겹치면 파일명(확장자 제외)으로만 지정
+                if len(filenames) == 1:
+                    self.datasets[alias] = filename
+                self.datasets[os.path.splitext(filename)[0]] = filename
+        self.canonical = {filename: (alias if len(filenames) == 1 else os.path.splitext(filename)[0])
+                          for alias, filenames in aliases.items() for filename in filenames}
+
+        self.columns = {}
+        for filename, dataset in version.datasets.items():
+            for column in dataset.value_columns:
+                self.columns.setdefault(column, []).append(filename)
+
+
+class Reference:
+    """식에서 쓰는 값 하나 (데이터셋, 순위 기준 형식의 metric, 응답 이름)"""
+
+    def __init__(self, filename, metric, name):
+        self.filename = filename
+        self.metric = metric
+        self.name = name
+
+
+class Query:
+    """파싱하고 이름을 해석한 식"""
+
+    def __init__(self, expression, names, version):
+        if len(expression) > MAX_EXPRESSION_LENGTH:
+            raise QueryError(f"식이 너무 깁니다 (최대 {MAX_EXPRESSION_LENGTH}자)")
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as e:
+            raise QueryError(f"식을 해석할 수 없습니다: {e.msg} (위치 {e.offset})")
+        if sum(1 for _ in ast.walk(tree)) > MAX_NODES:
+            raise QueryError("식이 너무 복잡합니다")
+
+        self.names = names
+        self.version = version
+        self.references = {}  # 응답 이름 → Reference
+        self.evaluate = self._compile(tree.body)
+        # 이름을 해석한 식 (캐시 키, 응답에 표시)
+        self.normalized = ast.unparse(_Normalizer(self).visit(tree))
+
+    def _reference(self, node, share=False, register=True):
+        """컬럼 참조 노드 → Reference (register 이면 평가할 값 목록에 추가)"""
+        if isinstance(node, ast.Name):
+            filenames = self.names.columns.get(node.id)
+            if not filenames:
+                raise QueryError(f"알 수 없는 컬럼: {node.id}")
+            if len(filenames) > 1:
+                options = ', '.join(f"{self.names.canonical[f]}.{node.id}" for f in filenames)
+                raise QueryError(f"{node.id} 컬럼이 여러 데이터셋에 있습니다: {options}")
+            filename, column = filenames[0], node.id
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            filename = self.names.datasets.get(node.value.id)
+            if filename is None:
+                raise QueryError(f"알 수 없는 데이터셋: {node.value.id}")
+            column = node.attr
+            dataset = self.version.get(filename)
+            if column not in dataset.value_columns and not (column == 'score' and dataset.type == 'crop'):
+                raise QueryError(f"{node.value.id} 에 없는 컬럼: {column}")
+        else:
+            raise QueryError("컬럼 이름이 필요합니다")
+
+        if share and column == 'score':
+            raise QueryError("score 에는 share 를 쓸 수 없습니다")
+        if share and column in self.version.get(filename).derived_columns:
+            raise QueryError(f"파생 지표 {column} 에는 share 를 쓸 수 없습니다")
+        name = f"{self.names.canonical[filename]}.{column}"
+        if share:
+            name = f"share({name})"
+        reference = Reference(filename, f"share:{column}" if share else column, name)
+        if register:
+            self.references[name] = reference
+        return reference
+
+    def _compile(self, node):
+        """AST 노드 → (컬럼 값 dict → 배열) 함수"""
+        if isinstance(node, ast.BoolOp):
+            parts = [self._compile(value) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return lambda env: combine.reduce([_truth(part(env)) for part in parts])
+
+        if isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.Not):
+                operand = self._compile(node.operand)
+                return lambda env: ~_truth(operand(env))
+            operand = self._numeric(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda env: -operand(env)
+            if isinstance(node.op, ast.UAdd):
+                return operand
+
+        if isinstance(node, ast.Compare):
+            operands = [self._compile(node.left)] + [self._compile(value) for value in node.comparators]
+            ops = [COMPARE_OPERATORS.get(type(op)) for op in node.ops]
+            if None in ops:
+                raise QueryError("지원하지 않는 비교 연산입니다")
+
+            def compare(env):
+                values = [operand(env) for operand in operands]
+                with np.errstate(invalid='ignore'):
+                    return np.logical_and.reduce([op(a, b) for op, a, b in zip(ops, values, values[1:])])
+            return compare
+
+        if isinstance(node, ast.BinOp) and type(node.op) in BINARY_OPERATORS:
+            left, right = self._numeric(node.left), self._numeric(node.right)
+            op = BINARY_OPERATORS[type(node.op)]
+
+            def binary(env):
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    return op(left(env), right(env))
+            return binary
+
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+            value = float(node.value)
+            return lambda env: value
+
+        if isinstance(node, ast.Call):
+            if not (isinstance(node.func, ast.Name) and node.func.id == 'share') or len(node.args) != 1 \
+                    or node.keywords:
+                raise QueryError("함수는 share(컬럼) 만 쓸 수 있습니다")
+            name = self._reference(node.args[0], share=True).name
+            return lambda env: env[name]
+
+        if isinstance(node, (ast.Name, ast.Attribute)):
+            name = self._reference(node).name
+            return lambda env: env[name]
+
+        raise QueryError(f"지원하지 않는 식입니다: {ast.unparse(node)}")
+
+    def _numeric(self, node):
+        """산술 연산(+ - * /, 부호)의 피연산자 (조건식이면 QueryError)"""
+        if _is_condition(node):
+            raise QueryError(f"조건식에는 산술 연산을 쓸 수 없습니다: {ast.unparse(node)}")
+        return self._compile(node)
+
+
+def parse_query(expression, names, version):
+    return Query(expression, names, version)
+
+
+class _Normalizer(ast.NodeTransformer):
+    """컬럼 이름을 '별칭.컬럼' 으로 바꿈"""
+
+    def __init__(self, query):
+        self.query = query
+
+    def _qualified(self, node):
+        name = self.query._reference(node, register=False).name
+        alias, column = name.split('.', 1)
+        return ast.Attribute(value=ast.Name(id=alias, ctx=ast.Load()), attr=column, ctx=ast.Load())
+
+    def visit_Call(self, node):
+        return ast.Call(func=node.func, args=[self._qualified(node.args[0])], keywords=[])
+
+    def visit_Name(self, node):
+        return self._qualified(node)
+
+    def visit_Attribute(self, node):
+        return self._qualified(node)
+
+
+def _is_condition(node):
+    """참/거짓 배열을 만드는 노드 (비교, and / or / not)"""
+    return isinstance(node, (ast.Compare, ast.BoolOp)) or \
+        (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not))
+
+
+def _truth(values):
+    """숫자를 조건으로 쓸 때 (0 이 아니고 값이 있으면 참)"""
+    values = np.asarray(values)
+    if values.dtype == bool:
+        return values
+    with np.errstate(invalid='ignore'):
+        return (values != 0) & ~np.isnan(values)
+
+
+def region_index(version, filenames, level, crop_code=None, parent_cd=None):
+    """참조한 데이터셋들의 레벨 행을 합친 지역 인덱스 (10자리 코드 오름차순)와 데이터셋별 행"""
+    rows = {}
+    for filename in filenames:
+        dataset = version.get(filename)
+        rows[filename] = candidate_rows(dataset, level, crop_code if dataset.type == 'crop' else None, parent_cd)
+    codes = np.unique(np.concatenate([version.get(f).codes[r] for f, r in rows.items()])) if rows \
+        else np.empty(0, dtype=np.int64)
+    return codes, rows
+
+
+def aligned_values(codes, dataset, rows, values):
+    """지역 인덱스 순서의 값 배열 (행이 없는 지역은 NaN)"""
+    result = np.full(len(codes), np.nan)
+    result[np.searchsorted(codes, dataset.codes[rows])] = values[rows]
+    return result
+
+
+def check_crop_rows(version, filenames, crop_code):
+    """작물 파일은 지역마다 행이 하나가 되도록 작물 코드가 필요함"""
+    for filename in filenames:
+        dataset = version.get(filename)
+        if dataset.type != 'crop':
+            continue
+        if crop_code is None and len(dataset.crop_rows) > 1:
+            raise QueryError(f"{filename} 에는 작물이 여러 개라 crop_code 가 필요합니다")
+        if crop_code is not None and crop_code not in dataset.crop_rows:
+            raise QueryError(f"{filename} 에 없는 작물 코드: {crop_code}")
+
+
+def run_query(version, query, level, crop_code=None, parent_cd=None, limit=1000):
+    """식에 맞는 지역과 참조한 값
+
+    {"expression": 정규화 식, "level": ..., "regions": 평가한 지역 수, "matched": 맞는 지역 수,
+     "columns": [참조 이름...], "data": [{"region_cd", "bjd_Nm", "values": {참조 이름: 값}}, ...]}
+    """
+    if not query.references:
+        raise QueryError("식에 컬럼이 하나 이상 있어야 합니다")
+    filenames = sorted({reference.filename for reference in query.references.values()})
+    check_crop_rows(version, filenames, crop_code)
+
+    codes, rows = version.cached(('query-index', tuple(filenames), level, crop_code, parent_cd),
+                                 lambda: region_index(version, filenames, level, crop_code, parent_cd))
+    env = {}
+    for name, reference in query.references.items():
+        dataset = version.get(reference.filename)
+        values = version.cached(('metric', reference.filename, reference.metric),
+                                lambda: metric_values(dataset, reference.metric))
+        env[name] = aligned_values(codes, dataset, rows[reference.filename], values)
+
+    matched = np.flatnonzero(np.broadcast_to(_truth(query.evaluate(env)), codes.shape))
+
+    # 지역 이름은 참조한 데이터셋 중 그 지역 행이 있는 첫 데이터셋에서
+    names = np.full(len(codes), None, dtype=object)
+    for filename in filenames:
+        dataset = version.get(filename)
+        positions = np.searchsorted(codes, dataset.codes[rows[filename]])
+        missing = names[positions] == None  # noqa: E711
+        names[positions[missing]] = dataset.frame['bjd_Nm'].to_numpy()[rows[filename][missing]]
+
+    digits = LEVEL_NAME_DIGITS[level]
+    data = []
+    for index in matched[:limit]:
+        data.append({
+            'region_cd': str(codes[index]).zfill(10)[:digits],
+            'bjd_Nm': names[index],
+            'values': {name: (None if np.isnan(values[index]) else float(values[index]))
+                       for name, values in env.items()}
+        })
+    return {'expression': query.normalized, 'level': level, 'regions': int(len(codes)),
+            'matched': int(len(matched)), 'columns': list(env), 'data': data}
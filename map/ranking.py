@@ -0,0 +1,81 @@
+"""지역 순위 (Top-N)
+
+데이터 버전의 값 배열에서 레벨/상위 지역으로 거른 뒤 np.partition 으로 N 번째 값을 찾아
+그보다 앞선 행(같은 값 포함)만 골라 정렬한다 (전체 정렬 없이 O(행 수 + N log N)).
+
+순위 기준은 원래 컬럼 외에 다음 파생값도 쓸 수 있다.
+    share:<컬럼>   같은 그룹(숫자만 다른 컬럼들, 작물 파일은 전체 면적) 합계 대비 비율
+    score          작물 적성 점수 (최적지 4, 적지 3, 가능지 2, 저위생산지 1, 기타 0 의 면적 가중 평균)
+"""
+import re
+
+import numpy as np
+
+import root_modules  # noqa: F401  (suitability_cube 경로)
+from catalog import LEVELS
+from suitability_cube import CLASS_WEIGHTS, SUITABILITY_CLASSES
+
+
+def column_group(dataset, column):
+    """share 계산에 쓰는 컬럼 그룹 (예: acid_Fruit1_Area → acid_Fruit1~6_Area, 파생 지표 컬럼은 제외)"""
+    if dataset.type == 'crop':
+        return list(SUITABILITY_CLASSES)
+    columns = [col for col in dataset.value_columns if col not in dataset.derived_columns]
+    pattern = re.sub(r'\d+', '', column)
+    group = [col for col in columns if re.sub(r'\d+', '', col) == pattern]
+    return group if len(group) > 1 else columns
+
+
+def metric_values(dataset, metric):
+    """순위 기준 값 (전체 행 길이, 결측/계산 불가는 NaN). 알 수 없는 기준이면 None"""
+    columns = dataset.value_columns
+
+    if metric in columns:
+        return dataset.column(metric)
+
+    if metric.startswith('share:') and metric[len('share:'):] in columns:
+        column = metric[len('share:'):]
+        group = [columns.index(col) for col in column_group(dataset, column)]
+        total = np.nansum(dataset.take(None, group), axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, dataset.column(column) / total, np.nan)
+
+    if metric == 'score' and dataset.type == 'crop' and all(col in columns for col in SUITABILITY_CLASSES):
+        idx = [columns.index(col) for col in SUITABILITY_CLASSES]
+        areas = np.nan_to_num(dataset.take(None, idx))
+        total = areas.sum(axis=1)
+        weighted = areas @ CLASS_WEIGHTS
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(total > 0, weighted / total, np.nan)
+
+    return None
+
+
+def candidate_rows(dataset, level, crop_code=None, parent_cd=None):
+    """정확히 해당 레벨인 행 (상위 지역 코드 접두어로 거름)"""
+    rows = np.flatnonzero(dataset.levels == LEVELS.index(level))
+    if crop_code:
+        rows = np.intersect1d(rows, dataset.crop_rows.get(crop_code, rows[:0]), assume_unique=True)
+    if parent_cd:
+        digits = len(parent_cd)
+        rows = rows[dataset.codes[rows] // 10 ** (10 - digits) == int(parent_cd)]
+    return rows
+
+
+def top_n(values, rows, n, order='desc'):
+    """rows 중 값이 큰(작은) 순서로 n 개의 (행 인덱스, 값)"""
+    subset = values[rows]
+    valid = ~np.isnan(subset)
+    rows, subset = rows[valid], subset[valid]
+    keys = -subset if order == 'desc' else subset
+
+    n = min(n, len(rows))
+    if n <= 0:
+        return rows[:0], subset[:0]
+    if n < len(rows):
+        # n 번째 값과 같은 행은 모두 후보로 남김 (경계에서 같은 값이 n 에 따라 다른 행으로 바뀌지 않게)
+        picked = np.flatnonzero(keys <= np.partition(keys, n - 1)[n - 1])
+    else:
+        picked = np.arange(len(rows))
+    picked = picked[np.lexsort((rows[picked], keys[picked]))][:n]  # 같은 값은 행 순서대로
+    return rows[picked], subset[picked]
@@ -0,0 +1,11 @@
+"""저장소 루트의 공용 모듈 경로
+
+pnu_registry, snapshot_store, static_assets 등 수집기와 함께 쓰는 모듈은 저장소 루트에 있다.
+루트 모듈을 쓰는 지도 앱 모듈은 이 모듈을 먼저 가져와 경로를 추가한다 (app 을 거치지 않는 단독 실행/import 포함).
+"""
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
@@ -0,0 +1,76 @@
+"""0 이 많은 면적 컬럼용 희소 행렬 (행 단위 CSR)
+
+면적 컬럼은 지역 대부분에서 0 이라 (토양아목은 17개 중 2~3개만 값이 있음)
+0 이 아닌 값과 결측(NaN)만 저장한다.
+
+    indptr[i]:indptr[i+1]   i 번째 행의 항목 범위
+    indices                 항목의 컬럼 번호 (컬럼이 256 개 미만이면 uint8)
+    data                    항목 값 (정수 면적처럼 float32 로 손실 없이 표현되면 float32)
+
+필요한 행/컬럼만 take() 로 밀집 배열로 꺼내 쓴다.
+"""
+import numpy as np
+
+
+class SparseColumns:
+    """0 이 아닌 값과 결측만 저장한 행 단위 CSR 행렬"""
+
+    def __init__(self, shape, indptr, indices, data):
+        self.shape = shape
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+
+    @classmethod
+    def from_dense(cls, values):
+        stored = values != 0  # NaN 도 저장 (0 과 결측을 구분)
+        rows, cols = np.nonzero(stored)
+        indptr = np.zeros(values.shape[0] + 1, dtype=np.int64)
+        np.cumsum(stored.sum(axis=1), out=indptr[1:])
+
+        data = values[rows, cols]
+        compact = data.astype(np.float32)
+        if np.array_equal(compact, data, equal_nan=True):
+            data = compact
+        index_type = np.uint8 if values.shape[1] < 256 else np.uint16
+        return cls(values.shape, indptr, cols.astype(index_type), data)
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.data.nbytes
+
+    def _entries(self, rows):
+        """rows 의 항목 위치와 각 항목이 속한 rows 안의 순서"""
+        starts = self.indptr[rows]
+        counts = self.indptr[rows + 1] - starts
+        owner = np.repeat(np.arange(len(rows)), counts)
+        # 행마다 starts[i], starts[i]+1, ... 를 이어붙인 위치
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + offsets, owner
+
+    def take(self, rows=None, columns=None):
+        """선택한 행/컬럼의 밀집 배열 (float64, rows/columns 가 None 이면 전체)"""
+        rows = np.arange(self.shape[0]) if rows is None else np.asarray(rows, dtype=np.int64)
+        if columns is None:
+            dense = np.zeros((len(rows), self.shape[1]))
+            entries, owner = self._entries(rows)
+            dense[owner, self.indices[entries]] = self.data[entries]
+            return dense
+
+        columns = np.asarray(columns, dtype=np.int64)
+        position = np.full(self.shape[1], -1, dtype=np.int64)
+        position[columns] = np.arange(len(columns))
+        dense = np.zeros((len(rows), len(columns)))
+        entries, owner = self._entries(rows)
+        target = position[self.indices[entries]]
+        keep = target >= 0
+        dense[owner[keep], target[keep]] = self.data[entries[keep]]
+        return dense
+
+    def column(self, column, rows=None):
+        return self.take(rows, [column])[:, 0]
+
+    def row_items(self, row):
+        """행의 (컬럼 번호 배열, 값 배열)"""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.data[start:end]
@@ -0,0 +1,180 @@
+"""인접 그래프 기반 공간 통계
+
+레벨 전체의 값 배열(경계 피처 순서)에 인접 그래프(adjacency.AdjacencyGraph)를 곱하는 방식으로
+모든 지역을 한 번에 계산한다. 값이 없는 지역은 계산에서 빼고, 이웃 가중치도 값이 있는 이웃끼리만 나눈다.
+
+    lag      공간 시차 (값이 있는 이웃의 평균)
+    smooth   자신과 이웃의 평균 (값이 없는 지역은 이웃 평균으로 채움)
+    moran    국지 Moran's I = z_i × (이웃 z 평균), 조건부 순열 검정으로 유의확률,
+             유의한 지역은 HH(높은 값 군집) / LL / HL / LH 로 분류
+    getis    Getis-Ord Gi* (자신 포함 이웃 합의 z 점수, 정규근사 유의확률),
+             유의한 지역은 hot / cold
+"""
+import math
+
+import numpy as np
+
+from ranking import candidate_rows
+
+STATS = ('lag', 'smooth', 'moran', 'getis')
+SIGNIFICANCE = 0.05
+PERMUTATION_CHUNK = 99  # 순열을 나누어 뽑는 단위 (메모리 제한)
+RANDOM_SEED = 12345  # 같은 데이터 버전이면 같은 결과 (응답 캐시)
+
+
+def feature_values(graph, dataset, values, level, crop_code=None):
+    """데이터셋 값(전체 행 길이)을 그래프 피처 순서로 옮긴 배열 (데이터가 없는 피처는 NaN)"""
+    result = np.full(len(graph), np.nan)
+    rows = candidate_rows(dataset, level, crop_code)
+    for code, value in zip(dataset.region_codes(rows, level), values[rows]):
+        index = graph.code_index.get(code)
+        if index is not None:
+            result[index] = value
+    return result
+
+
+class SpatialContext:
+    """값이 있는 피처끼리의 이웃 관계 (통계마다 공통)"""
+
+    def __init__(self, graph, values):
+        self.graph = graph
+        self.values = values
+        self.valid = ~np.isnan(values)
+        self.filled = np.where(self.valid, values, 0.0)
+        self.count = int(self.valid.sum())
+
+        # 양 끝 모두 값이 있는 이웃 항목만 사용
+        keep = self.valid[graph.owner] & self.valid[graph.indices]
+        self.owner = graph.owner[keep]
+        self.indices = graph.indices[keep]
+        self.neighbors = np.bincount(self.owner, minlength=len(graph)).astype(np.float64)
+        # 값이 있는 이웃 수 (자신의 값 유무와 관계없이, lag/smooth 용)
+        self.any_neighbors = graph.neighbor_sum(self.valid.astype(np.float64))
+
+    def neighbor_sum(self, values):
+        return np.bincount(self.owner, weights=values[self.indices], minlength=len(self.graph))
+
+    def lag(self):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(self.any_neighbors > 0, self.graph.neighbor_sum(self.filled) / self.any_neighbors, np.nan)
+
+    def smooth(self):
+        total = self.filled + self.graph.neighbor_sum(self.filled)
+        count = self.valid + self.any_neighbors
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(count > 0, total / count, np.nan)
+
+    def _standardized(self):
+        mean = self.filled.sum() / self.count
+        deviation = np.where(self.valid, self.values - mean, 0.0)
+        scale = math.sqrt((deviation ** 2).sum() / self.count)
+        return deviation / scale if scale > 0 else None
+
+    def moran(self, permutations=99):
+        """국지 Moran's I, 유의확률, 군집 유형과 전역 Moran's I"""
+        n = len(self.graph)
+        local = np.full(n, np.nan)
+        p_values = np.full(n, np.nan)
+        clusters = [None] * n
+        z = self._standardized() if self.count > 2 else None
+        if z is None:
+            return local, p_values, clusters, None
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            lag = self.neighbor_sum(z) / self.neighbors
+        tested = self.valid & (self.neighbors > 0)
+        local[tested] = z[tested] * lag[tested]
+        # 전역 Moran's I (행 표준화 가중치: S0 = 이웃이 있는 지역 수)
+        global_i = float(local[tested].mean()) if tested.any() else None
+
+        # 조건부 순열: 각 지역의 값은 고정하고 이웃 수만큼 다른 지역 값을 무작위로 뽑아 이웃 평균을 다시 계산
+        # (복원 추출 근사, 자기 자신은 뽑지 않음)
+        if permutations > 0:
+            valid_z = z[self.valid]
+            position = np.cumsum(self.valid) - 1  # 피처 번호 → valid_z 번호
+            targets = np.flatnonzero(tested)
+            counts = self.neighbors[targets].astype(np.int64)
+            owner = np.repeat(np.arange(len(targets)), counts)
+            starts = np.cumsum(counts) - counts
+            self_position = position[targets][owner]
+            observed = local[targets]
+            extreme = np.zeros(len(targets))
+            rng = np.random.default_rng(RANDOM_SEED)
+            for start in range(0, permutations, PERMUTATION_CHUNK):
+                size = min(PERMUTATION_CHUNK, permutations - start)
+                draws = rng.integers(0, self.count - 1, size=(size, len(owner)))
+                draws += draws >= self_position  # 자기 자신을 건너뜀
+                sums = np.add.reduceat(valid_z[draws], starts, axis=1)
+                simulated = z[targets] * sums / counts
+                extreme += (simulated >= observed).sum(axis=0)
+            # 양쪽 꼬리 중 작은 쪽
+            extreme = np.minimum(extreme, permutations - extreme)
+            p_values[targets] = (extreme + 1) / (permutations + 1)
+
+            for i in targets[p_values[targets] <= SIGNIFICANCE]:
+                high, high_lag = z[i] > 0, lag[i] > 0
+                clusters[i] = ('HH' if high_lag else 'HL') if high else ('LH' if high_lag else 'LL')
+        return local, p_values, clusters, global_i
+
+    def getis(self):
+        """Getis-Ord Gi* z 점수, 유의확률, hot/cold 분류 (자신 포함 이진 가중치)"""
+        n = len(self.graph)
+        scores = np.full(n, np.nan)
+        p_values = np.full(n, np.nan)
+        labels = [None] * n
+        if self.count < 3:
+            return scores, p_values, labels
+
+        mean = self.filled.sum() / self.count
+        scale = math.sqrt((self.filled ** 2).sum() / self.count - mean ** 2)
+        weight = self.neighbors + 1  # 자신 포함
+        local_sum = self.filled + self.neighbor_sum(self.filled)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denominator = scale * np.sqrt((self.count * weight - weight ** 2) / (self.count - 1))
+            scores = np.where(self.valid & (denominator > 0), (local_sum - mean * weight) / denominator, np.nan)
+
+        for i in np.flatnonzero(~np.isnan(scores)):
+            p_values[i] = math.erfc(abs(scores[i]) / math.sqrt(2))
+            if p_values[i] <= SIGNIFICANCE:
+                labels[i] = 'hot' if scores[i] > 0 else 'cold'
+        return scores, p_values, labels
+
+
+def _number(value):
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def spatial_statistic(graph, values, stat, permutations=99):
+    """피처별 통계 결과 {'summary': ..., 'regions': [{region_cd, value, ...}]}"""
+    context = SpatialContext(graph, values)
+    fields = {}
+    summary = {'regions': len(graph), 'with_value': context.count,
+               'isolated_linked': int(graph.linked.sum())}
+
+    if stat == 'lag':
+        fields['lag'] = context.lag()
+    elif stat == 'smooth':
+        fields['smoothed'] = context.smooth()
+    elif stat == 'moran':
+        local, p_values, clusters, global_i = context.moran(permutations)
+        fields.update(moran_i=local, p_value=p_values, cluster=clusters)
+        summary.update(global_moran_i=global_i, permutations=permutations)
+    elif stat == 'getis':
+        scores, p_values, labels = context.getis()
+        fields.update(gi_z=scores, p_value=p_values, hotspot=labels)
+
+    regions = []
+    for i, code in enumerate(graph.codes):
+        region = {'region_cd': code, 'value': _number(values[i])}
+        for name, column in fields.items():
+            region[name] = column[i] if isinstance(column, list) else _number(column[i])
+        regions.append(region)
+
+    for name in ('cluster', 'hotspot'):
+        if name in fields:
+            counts = {}
+            for label in fields[name]:
+                if label is not None:
+                    counts[label] = counts.get(label, 0) + 1
+            summary[name] = counts
+    return {'summary': summary, 'regions': regions}
@@ -0,0 +1,109 @@
+// 색상 구간 계산 (map.js 와 map_worker.js 에서 함께 사용)
+
+// 색상 스케일 계산 (레벨별로 동적 계산)
+function calculateColorScale(dataType, data, level) {
+    const validValues = data.map(d => d[dataType]).filter(v => v > 0).sort((a, b) => b - a);
+
+    if (validValues.length === 0) {
+        return [{ min: 0, color: 'rgb(240, 240, 240)' }];
+    }
+
+    const maxValue = Math.max(...validValues);
+
+    // 레벨별로 스케일 조정
+    const scaleRatios = {
+        'sido': [0.8, 0.6, 0.4, 0.2],
+        'sigungu': [0.1, 0.075, 0.05, 0.025],
+        'eupmyeondong': [0.01, 0.006, 0.003, 0.001],
+        'li': [0.001, 0.0006, 0.0003, 0.0002]
+    }[level];
+
+    return [
+        { min: maxValue * scaleRatios[0], color: 'rgb(34, 139, 34)' },     // 진한 초록
+        { min: maxValue * scaleRatios[1], color: 'rgb(144, 238, 144)' },   // 연한 초록
+        { min: maxValue * scaleRatios[2], color: 'rgb(255, 241, 118)' },   // 노랑
+        { min: maxValue * scaleRatios[3], color: 'rgb(255, 193, 144)' },   // 주황
+        { min: 1, color: 'rgb(255, 69, 0)' },                             // 진한 주황
+        { min: 0, color: 'rgb(240, 240, 240)' }                           // 회색
+    ];
+}
+
+// 서버의 색상 구간 경계(/api/class-breaks)를 범례용 스케일로 변환
+function breaksToColorScale(breaks) {
+    const colors = ['rgb(34, 139, 34)', 'rgb(144, 238, 144)', 'rgb(255, 241, 118)',
+                    'rgb(255, 193, 144)', 'rgb(255, 69, 0)', 'rgb(240, 240, 240)'];
+    if (breaks.length < colors.length) {
+        return [{ min: 0, color: 'rgb(240, 240, 240)' }];
+    }
+    return breaks.map((min, index) => ({ min: min, color: colors[index] }));
+}
+
+// 값에 따른 색상 반환
+function getValueColor(value, scale) {
+    if (value === 0) return 'rgb(240, 240, 240)';
+
+    for (const range of scale) {
+        if (value >= range.min) {
+            return range.color;
+        }
+    }
+    return 'rgb(240, 240, 240)';
+}
+
+// /api/data 의 희소(format=sparse)/컬럼(format=columnar) 응답을 레코드 배열로 복원
+function expandData(body) {
+    if (Array.isArray(body)) {
+        return body;
+    }
+    if (body.format === 'columnar') {
+        const names = Object.keys(body.columns);
+        const records = [];
+        for (let i = 0; i < body.length; i++) {
+            const record = {};
+            names.forEach(name => {
+                const dictionary = body.dictionaries[name];
+                const value = body.columns[name][i];
+                record[name] = dictionary ? dictionary[value] : value;
+            });
+            records.push(record);
+        }
+        return records;
+    }
+    // 희소 형식: nz 에 없는 컬럼은 0
+    const columns = body.columns;
+    return body.records.map(record => {
+        const expanded = {};
+        Object.keys(record).forEach(key => {
+            if (key !== 'nz') {
+                expanded[key] = record[key];
+            }
+        });
+        columns.forEach(column => {
+            expanded[column] = 0;
+        });
+        record.nz.forEach(([index, value]) => {
+            expanded[columns[index]] = value;
+        });
+        return expanded;
+    });
+}
+
+// region_cd → 레코드
+function indexByRegion(data) {
+    const records = {};
+    data.forEach(d => {
+        records[d.region_cd] = d;
+    });
+    return records;
+}
+
+// 경계 피처 코드 → 채움 색 (경계와 데이터 조인)
+function buildFeatureColors(geoData, idField, records, dataType, scale) {
+    const colors = {};
+    geoData.features.forEach(feature => {
+        const regionCode = feature.properties[idField];
+        const regionInfo = records[regionCode];
+        colors[regionCode] = getValueColor(regionInfo ? regionInfo[dataType] : 0, scale);
+    });
+    return colors;
+}
@@ -1,7 +1,8 @@
 // 전역 변수
 let leafletMap;
 let mapLayer;
-let mapData = [];
+let regionRecords = {}; // region_cd → 레코드
+let featureColors = {}; // 경계 피처 코드 → 채움 색
 let selectedFile = '';
 let selectedCrop = '';
 let selectedDataType = 'high_Suit_Area';
@@ -18,6 +19,35 @@ const ZOOM_LEVELS = {
     LI: { min: 10, max: 18, file: "/static/data/li_wgs84.json", level: 'li', idField: 'LI_CD' }
 };
 
+// 피처가 많은 레벨은 서버에서 렌더링한 타일로 표시 (리 경계는 없어서 읍면동 타일 사용)
+const TILE_LEVELS = ['eupmyeondong', 'li'];
+const TILE_LEVEL = 'eupmyeondong';
+
+// 데이터 로드/파싱/조인/색상 계산은 Web Worker 에서 처리 (IndexedDB 캐시 사용)
+const mapWorker = window.Worker ? new Worker('/static/js/map_worker.js') : null;
+const workerRequests = {};
+let workerRequestId = 0;
+let renderSequence = 0;
+const workerBoundaries = {}; // 레벨 → { key, geojson } (워커에서 받은 경계)
+
+if (mapWorker) {
+    mapWorker.onmessage = event => {
+        const pending = workerRequests[event.data.id];
+        delete workerRequests[event.data.id];
+        if (pending) {
+            event.data.error ? pending.reject(new Error(event.data.error)) : pending.resolve(event.data);
+        }
+    };
+}
+
+function requestWorker(message) {
+    return new Promise((resolve, reject) => {
+        const id = ++workerRequestId;
+        workerRequests[id] = { resolve: resolve, reject: reject };
+        mapWorker.postMessage(Object.assign({ id: id }, message));
+    });
+}
+
 // 지도 초기화
 function initializeMap() {
     leafletMap = L.map('mapContainer').setView([36.5, 127.5], 7);
@@ -29,6 +59,7 @@ function initializeMap() {
 
     // 줌 이벤트 리스너 추가
     leafletMap.on('zoomend', handleZoomChange);
+    leafletMap.on('click', handleTileClick);
 }
 
 // 줌 레벨에 따른 행정구역 레벨 결정
@@ -47,59 +78,23 @@ function handleZoomChange() {
     const levelConfig = getCurrentLevelConfig(currentZoom);
 
     if (currentLevel !== levelConfig.level) {
+        // 타일 레벨끼리는 같은 타일 레이어를 그대로 사용
+        const sameTiles = TILE_LEVELS.includes(currentLevel) && TILE_LEVELS.includes(levelConfig.level);
         currentLevel = levelConfig.level;
-        renderMapData();
-    }
-}
-
-// 색상 스케일 계산 (레벨별로 동적 계산)
-function calculateColorScale(dataType, data, level) {
-    const validValues = data.map(d => d[dataType]).filter(v => v > 0).sort((a, b) => b - a);
-
-    if (validValues.length === 0) {
-        return [{ min: 0, color: 'rgb(240, 240, 240)' }];
-    }
-
-    const maxValue = Math.max(...validValues);
-
-    // 레벨별로 스케일 조정
-    const scaleRatios = {
-        'sido': [0.8, 0.6, 0.4, 0.2],
-        'sigungu': [0.1, 0.075, 0.05, 0.025],
-        'eupmyeondong': [0.01, 0.006, 0.003, 0.001],
-        'li': [0.001, 0.0006, 0.0003, 0.0002]
-    }[level];
-
-    return [
-        { min: maxValue * scaleRatios[0], color: 'rgb(34, 139, 34)' },     // 진한 초록
-        { min: maxValue * scaleRatios[1], color: 'rgb(144, 238, 144)' },   // 연한 초록
-        { min: maxValue * scaleRatios[2], color: 'rgb(255, 241, 118)' },   // 노랑
-        { min: maxValue * scaleRatios[3], color: 'rgb(255, 193, 144)' },   // 주황
-        { min: 1, color: 'rgb(255, 69, 0)' },                             // 진한 주황
-        { min: 0, color: 'rgb(240, 240, 240)' }                           // 회색
-    ];
-}
-
-// 값에 따른 색상 반환
-function getValueColor(value, scale) {
-    if (value === 0) return 'rgb(240, 240, 240)';
-
-    for (const range of scale) {
-        if (value >= range.min) {
-            return range.color;
+        if (sameTiles && mapLayer instanceof L.TileLayer) {
+            updateMapLegend();
+        } else {
+            renderMapData();
         }
     }
-    return 'rgb(240, 240, 240)';
 }
 
 // 지역 스타일 설정
 function getRegionStyle(feature, levelConfig) {
     const regionCode = feature.properties[levelConfig.idField];
-    const regionInfo = mapData.find(d => d.region_cd === regionCode);
-    const value = regionInfo ? regionInfo[selectedDataType] : 0;
 
     return {
-        fillColor: getValueColor(value, colorScale),
+        fillColor: featureColors[regionCode] || 'rgb(240, 240, 240)',
         weight: 1,
         opacity: 1,
         color: '#666',
@@ -133,10 +128,12 @@ function getSelectedItemStyle(isSelected) {
     };
 }
 
-// 팝업 생성
-function createPopupContent(feature, levelConfig) {
+// 팝업 생성 (regionInfo 를 주지 않으면 regionRecords 에서 찾음)
+function createPopupContent(feature, levelConfig, regionInfo) {
     const regionCode = feature.properties[levelConfig.idField];
-    const regionInfo = mapData.find(d => d.region_cd === regionCode);
+    if (regionInfo === undefined) {
+        regionInfo = regionRecords[regionCode];
+    }
 
     const regionName = {
         'sido': () => feature.properties.CTP_KOR_NM,
@@ -284,8 +281,29 @@ function updateMapLegend() {
     });
 }
 
+// 여러 API 를 /api/batch 한 번으로 호출 (결과: id → 응답 본문)
+function fetchBatch(queries) {
+    return fetch('/api/batch', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ queries: queries })
+    })
+        .then(r => r.json())
+        .then(result => {
+            const bodies = {};
+            Object.entries(result.results).forEach(([id, item]) => {
+                if (item.status !== 200) {
+                    throw new Error(`${id}: ${item.status}`);
+                }
+                bodies[id] = item.body;
+            });
+            return bodies;
+        });
+}
+
 // 지도 데이터 렌더링
 function renderMapData() {
+    const sequence = ++renderSequence;
     if (!selectedFile || (fileType === 'crop' && !selectedCrop)) {
         if (mapLayer) {
             leafletMap.removeLayer(mapLayer);
@@ -297,16 +315,20 @@ function renderMapData() {
     const levelConfig = getCurrentLevelConfig(leafletMap.getZoom());
     currentLevel = levelConfig.level;
 
-    const apiUrl = fileType === 'crop'
-        ? `/api/data?filename=${selectedFile}&crop_code=${selectedCrop}&level=${currentLevel}`
-        : `/api/data?filename=${selectedFile}&level=${currentLevel}`;
+    if (TILE_LEVELS.includes(currentLevel)) {
+        renderTileData();
+        return;
+    }
 
-    Promise.all([
-        fetch(levelConfig.file).then(r => r.json()),
-        fetch(apiUrl).then(r => r.json())
-    ]).then(([geoData, data]) => {
-        mapData = data;
-        colorScale = calculateColorScale(selectedDataType, data, currentLevel);
+    const load = mapWorker ? loadMapDataInWorker(levelConfig) : loadMapData(levelConfig);
+
+    load.then(({ geoData, records, colors, scale }) => {
+        if (sequence !== renderSequence) {
+            return;  // 그 사이 다른 레벨/파일이 선택됨
+        }
+        regionRecords = records;
+        featureColors = colors;
+        colorScale = scale;
 
         if (mapLayer) {
             leafletMap.removeLayer(mapLayer);
@@ -317,7 +339,8 @@ function renderMapData() {
                 return getRegionStyle(feature, levelConfig);
             },
             onEachFeature: function(feature, layer) {
-                layer.bindPopup(createPopupContent(feature, levelConfig), {
+                // 팝업 내용은 열 때 만듦
+                layer.bindPopup(() => createPopupContent(feature, levelConfig), {
                     maxWidth: 300,
                     className: 'custom-popup'
                 });
@@ -337,6 +360,106 @@ function renderMapData() {
     });
 }
 
+// Web Worker 로 경계/데이터 로드와 조인, 색상 계산
+function loadMapDataInWorker(levelConfig) {
+    const cached = workerBoundaries[levelConfig.level];
+    return requestWorker({
+        level: levelConfig.level,
+        boundaryUrl: levelConfig.file,
+        idField: levelConfig.idField,
+        filename: selectedFile,
+        cropCode: fileType === 'crop' ? selectedCrop : '',
+        dataType: selectedDataType,
+        haveBoundary: cached ? cached.key : null
+    }).then(result => {
+        const key = `${levelConfig.level}:${result.boundaryVersion}`;
+        if (result.geojson) {
+            workerBoundaries[levelConfig.level] = { key: key, geojson: result.geojson };
+        }
+        return {
+            geoData: workerBoundaries[levelConfig.level].geojson,
+            records: result.records,
+            colors: result.colors,
+            scale: result.colorScale
+        };
+    });
+}
+
+// Web Worker 를 쓸 수 없는 브라우저: 경계와 데이터를 한 번의 요청으로 받아 메인 스레드에서 처리
+function loadMapData(levelConfig) {
+    const dataParams = { filename: selectedFile, level: levelConfig.level, format: 'columnar' };
+    if (fileType === 'crop') {
+        dataParams.crop_code = selectedCrop;
+    }
+
+    return fetchBatch([
+        { id: 'boundary', path: '/api/boundary', params: { level: levelConfig.level } },
+        { id: 'data', path: '/api/data', params: dataParams }
+    ]).then(({ boundary: geoData, data: body }) => {
+        const data = expandData(body);
+        const records = indexByRegion(data);
+        const scale = calculateColorScale(selectedDataType, data, levelConfig.level);
+        return {
+            geoData: geoData,
+            records: records,
+            colors: buildFeatureColors(geoData, levelConfig.idField, records, selectedDataType, scale),
+            scale: scale
+        };
+    });
+}
+
+// 타일 레이어 렌더링 (읍면동 이하: 이미지만 그리고, 클릭 시 좌표로 지역 조회)
+function renderTileData() {
+    const params = new URLSearchParams({ filename: selectedFile, column: selectedDataType, level: TILE_LEVEL });
+    if (fileType === 'crop') {
+        params.set('crop_code', selectedCrop);
+    }
+
+    fetch(`/api/class-breaks?${params}`)
+        .then(r => r.json())
+        .then(result => {
+            colorScale = breaksToColorScale(result.breaks || [0]);
+            params.set('v', result.version || '');  // 데이터 버전이 바뀌면 브라우저 캐시도 새로 받음
+
+            if (mapLayer) {
+                leafletMap.removeLayer(mapLayer);
+            }
+
+            mapLayer = L.tileLayer(`/tiles/{z}/{x}/{y}.png?${params}`, {
+                opacity: 1,
+                maxZoom: 18
+            }).addTo(leafletMap);
+
+            updateMapLegend();
+            document.getElementById('legendBox').style.display = 'block';
+        }).catch(err => {
+            console.error('데이터 로드 오류:', err);
+        });
+}
+
+// 타일 레이어 클릭 시 팝업
+function handleTileClick(e) {
+    if (!(mapLayer instanceof L.TileLayer)) {
+        return;
+    }
+
+    const params = new URLSearchParams({ lat: e.latlng.lat, lng: e.latlng.lng, filename: selectedFile, level: TILE_LEVEL });
+    if (fileType === 'crop') {
+        params.set('crop_code', selectedCrop);
+    }
+
+    fetch(`/api/lookup?${params}`)
+        .then(r => r.ok ? r.json() : null)
+        .then(result => {
+            if (!result) return;
+            const levelConfig = ZOOM_LEVELS.EUPMYEONDONG;
+            L.popup({ maxWidth: 300, className: 'custom-popup' })
+                .setLatLng(e.latlng)
+                .setContent(createPopupContent({ properties: result.properties }, levelConfig, result.data))
+                .openOn(leafletMap);
+        });
+}
+
 // CSV 다운로드 함수
 function downloadCSV() {
     if (!selectedFile) {
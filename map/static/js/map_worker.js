@@ -0,0 +1,164 @@
+// 지도 데이터 Web Worker
+// 경계 GeoJSON 과 /api/data (컬럼 형식) 를 IndexedDB 캐시(ETag/데이터 버전 기준)에서 읽거나 내려받아 파싱하고,
+// 조인과 색상 구간 계산까지 끝낸 결과만 메인 스레드로 보낸다.
+importScripts('/static/js/color_scale.js', '/static/js/data_cache.js');
+
+const boundaries = {}; // 레벨 → { version, geojson } (워커 메모리 캐시)
+
+// 경계 파일의 ETag (정적 파일이 바뀌면 달라짐)
+function boundaryVersion(url) {
+    return fetch(url, { method: 'HEAD' })
+        .then(r => r.headers.get('ETag') || r.headers.get('Last-Modified') || '')
+        .catch(() => '');
+}
+
+// 경계 파일의 해시 이름 자산 URL (static_assets.py 빌드, 없으면 null)
+// 이름이 내용 해시라 HEAD 로 버전을 확인하지 않아도 되고, 브라우저가 압축본을 immutable 로 캐시한다.
+let assetManifest = null;
+
+function assetUrl(url) {
+    if (!assetManifest) {
+        assetManifest = fetch('/static/assets/manifest.json', { cache: 'no-cache' })
+            .then(r => r.ok ? r.json() : {})
+            .catch(() => ({}));
+    }
+    return assetManifest.then(manifest => {
+        const entry = manifest[url.replace(/^\/static\//, '')];
+        return entry ? `/static/assets/${entry.file}` : null;
+    });
+}
+
+function dataVersion() {
+    return fetch('/api/version').then(r => r.json()).then(result => result.version);
+}
+
+// 정적 빌드 매니페스트의 키 (prerender.route_key 와 같은 규칙: 파라미터 이름 순서, URL 인코딩 없음)
+function routeKey(path, params) {
+    const query = Object.keys(params).sort()
+        .filter(key => params[key] !== undefined && params[key] !== null)
+        .map(key => `${key}=${params[key]}`)
+        .join('&');
+    return query ? `${path}?${query}` : path;
+}
+
+let prebuilt = null; // { version, routes }
+
+// 정적 빌드(/prebuilt)의 경로 → 파일 대응 (빌드가 없거나 데이터 버전이 다르면 null)
+function prebuiltRoutes(version) {
+    if (prebuilt && prebuilt.version === version) {
+        return Promise.resolve(prebuilt.routes);
+    }
+    return fetch('/prebuilt/manifest.json', { cache: 'no-cache' })
+        .then(r => r.ok ? r.json() : null)
+        .then(manifest => {
+            prebuilt = manifest;
+            return manifest && manifest.version === version ? manifest.routes : null;
+        })
+        .catch(() => null);
+}
+
+// 캐시에 없는 항목은 정적 빌드에서 받고, 빌드에 없는 항목만 /api/batch 한 번으로 받음
+async function fetchMissing(queries, version) {
+    const routes = queries.length > 0 ? await prebuiltRoutes(version) : null;
+    const bodies = {};
+    const remaining = [];
+    await Promise.all(queries.map(query => {
+        const entry = routes && routes[routeKey(query.path, query.params)];
+        if (!entry) {
+            remaining.push(query);
+            return null;
+        }
+        return fetch(`/prebuilt/${entry.file}`)
+            .then(r => r.ok ? r.json() : Promise.reject(new Error(`${query.id}: ${r.status}`)))
+            .then(body => {
+                bodies[query.id] = body;
+            });
+    }));
+    return Object.assign(bodies, await fetchFromApi(remaining));
+}
+
+function fetchFromApi(queries) {
+    if (queries.length === 0) {
+        return Promise.resolve({});
+    }
+    return fetch('/api/batch', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ queries: queries })
+    })
+        .then(r => r.json())
+        .then(result => {
+            const bodies = {};
+            Object.entries(result.results).forEach(([id, item]) => {
+                if (item.status !== 200) {
+                    throw new Error(`${id}: ${item.status}`);
+                }
+                bodies[id] = item.body;
+            });
+            return bodies;
+        });
+}
+
+async function render(request) {
+    const [asset, version] = await Promise.all([assetUrl(request.boundaryUrl), dataVersion()]);
+    const boundaryEtag = asset || await boundaryVersion(request.boundaryUrl);
+
+    const boundaryKey = `boundary:${request.level}`;
+    const dataKey = `data:columnar:${request.filename}:${request.cropCode || ''}:${request.level}`;
+
+    let geojson = boundaries[request.level] && boundaries[request.level].version === boundaryEtag
+        ? boundaries[request.level].geojson
+        : await cacheGet(boundaryKey, boundaryEtag);
+    let data = await cacheGet(dataKey, version);
+
+    const queries = [];
+    let boundaryFetch = null;
+    if (!geojson && asset) {
+        boundaryFetch = fetch(asset).then(r => r.ok ? r.json() : Promise.reject(new Error(`boundary: ${r.status}`)));
+    } else if (!geojson) {
+        queries.push({ id: 'boundary', path: '/api/boundary', params: { level: request.level } });
+    }
+    if (!data) {
+        const params = { filename: request.filename, level: request.level, format: 'columnar' };
+        if (request.cropCode) {
+            params.crop_code = request.cropCode;
+        }
+        queries.push({ id: 'data', path: '/api/data', params: params });
+    }
+
+    const fetched = await fetchMissing(queries, version);
+    if (boundaryFetch) {
+        fetched.boundary = await boundaryFetch;
+    }
+    if (fetched.boundary) {
+        geojson = fetched.boundary;
+        cachePut(boundaryKey, boundaryEtag, geojson);
+    }
+    if (fetched.data) {
+        data = fetched.data;
+        cachePut(dataKey, version, data, 'data:');  // 이전 데이터 버전 항목은 삭제
+    }
+    boundaries[request.level] = { version: boundaryEtag, geojson: geojson };
+
+    // 캐시에는 컬럼 형식 그대로 저장하고, 조인/색상 계산 직전에 레코드로 복원
+    data = expandData(data);
+    const records = indexByRegion(data);
+    const colorScale = calculateColorScale(request.dataType, data, request.level);
+    const colors = buildFeatureColors(geojson, request.idField, records, request.dataType, colorScale);
+
+    return {
+        boundaryVersion: boundaryEtag,
+        // 메인 스레드에 같은 버전의 경계가 이미 있으면 다시 보내지 않음
+        geojson: request.haveBoundary === `${request.level}:${boundaryEtag}` ? null : geojson,
+        records: records,
+        colors: colors,
+        colorScale: colorScale
+    };
+}
+
+self.onmessage = event => {
+    const request = event.data;
+    render(request)
+        .then(result => self.postMessage(Object.assign({ id: request.id }, result)))
+        .catch(err => self.postMessage({ id: request.id, error: String(err) }));
+};
@@ -0,0 +1,170 @@
+"""레벨별 요약 통계
+
+데이터셋의 값 컬럼마다 레벨(시도/시군구/읍면동/리)과 상위 지역(전국 또는 상위 레벨 코드)별로
+건수, 합계, 평균, 최소/최대, 분위수, 히스토그램을 한 번에 계산해 둔다.
+stdg_Cd 앞자리(상위 지역 코드)로 그룹을 만들고 정렬 한 번과 bincount 로 모든 그룹을 같이 계산한다.
+
+    stats[(작물, 레벨, 상위 레벨)] = LevelSummary  (상위 레벨 None 은 전국)
+"""
+import threading
+
+import numpy as np
+
+import root_modules  # noqa: F401  (pnu_registry 경로)
+from catalog import LEVELS
+from pnu_registry import LEVEL_DIGITS
+
+QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def histogram_edges(max_value):
+    """히스토그램 구간 경계 (0, 1, 2, 5, 10, 20, 50, ... 면적 분포가 한쪽으로 치우쳐 있어 1-2-5 간격)"""
+    edges = [0.0, 1.0]
+    step = 0
+    while edges[-1] <= max_value:
+        edges.append((1, 2, 5)[(step + 1) % 3] * 10 ** ((step + 1) // 3))
+        step += 1
+    return np.asarray(edges, dtype=np.float64)
+
+
+class LevelSummary:
+    """한 레벨의 상위 지역 그룹별 통계 배열 (그룹 × 컬럼)"""
+
+    def __init__(self, columns, group_codes, values, groups):
+        self.columns = columns
+        self.group_codes = group_codes  # 정렬된 상위 지역 코드 (전국이면 [0])
+        n_groups, n_columns = len(group_codes), len(columns)
+
+        self.count = np.zeros((n_groups, n_columns), dtype=np.int64)
+        self.sum = np.zeros((n_groups, n_columns))
+        self.min = np.full((n_groups, n_columns), np.nan)
+        self.max = np.full((n_groups, n_columns), np.nan)
+        self.quantiles = np.full((n_groups, n_columns, len(QUANTILES)), np.nan)
+        self.edges = []
+        self.hist = []
+
+        for c in range(n_columns):
+            v = values[:, c]
+            valid = ~np.isnan(v)
+            v, g = v[valid], groups[valid]
+
+            # 그룹 안에서 값 순서로 정렬하면 최소/최대/분위수가 위치 계산으로 끝난다
+            order = np.lexsort((v, g))
+            v, g = v[order], g[order]
+            count = np.bincount(g, minlength=n_groups)
+            start = np.cumsum(count) - count
+            has = count > 0
+
+            self.count[:, c] = count
+            self.sum[:, c] = np.bincount(g, weights=v, minlength=n_groups)
+            self.min[has, c] = v[start[has]]
+            self.max[has, c] = v[start[has] + count[has] - 1]
+            for k, q in enumerate(QUANTILES):
+                pos = start[has] + q * (count[has] - 1)
+                lo, hi = np.floor(pos).astype(np.int64), np.ceil(pos).astype(np.int64)
+                self.quantiles[has, c, k] = v[lo] + (v[hi] - v[lo]) * (pos - lo)
+
+            edges = histogram_edges(v.max() if v.size else 0)
+            bins = np.clip(np.searchsorted(edges, v, side='right') - 1, 0, len(edges) - 2)
+            hist = np.bincount(g * (len(edges) - 1) + bins, minlength=n_groups * (len(edges) - 1))
+            self.edges.append(edges)
+            self.hist.append(hist.reshape(n_groups, len(edges) - 1))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean = np.where(self.count > 0, self.sum / self.count, np.nan)
+
+    def group_index(self, parent_code):
+        row = int(np.searchsorted(self.group_codes, parent_code))
+        if row < len(self.group_codes) and self.group_codes[row] == parent_code:
+            return row
+        return -1
+
+    def to_dict(self, group, columns=None):
+        result = {}
+        for c, col in enumerate(self.columns):
+            if columns and col not in columns:
+                continue
+            result[col] = {
+                'count': int(self.count[group, c]),
+                'sum': float(self.sum[group, c]),
+                'mean': _float(self.mean[group, c]),
+                'min': _float(self.min[group, c]),
+                'max': _float(self.max[group, c]),
+                'quantiles': {f"p{int(q * 100)}": _float(v) for q, v in zip(QUANTILES, self.quantiles[group, c])},
+                'histogram': {'edges': self.edges[c].tolist(), 'counts': self.hist[c][group].tolist()},
+            }
+        return result
+
+
+def _float(value):
+    return None if np.isnan(value) else float(value)
+
+
+class DatasetSummary:
+    """데이터셋 하나의 레벨/상위 지역별 요약 (작물 파일은 작물별로)"""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        # 숫자 값이 하나도 없는 컬럼(이름 등)은 제외
+        self.columns = dataset.numeric_columns
+        self._summaries = {}
+        self._lock = threading.Lock()
+
+    def get(self, level, parent_level=None, crop_code=None):
+        """level 의 행을 parent_level 코드(None 이면 전국)로 묶은 요약"""
+        key = (crop_code or None, level, parent_level)
+        with self._lock:
+            if key not in self._summaries:
+                self._summaries[key] = self._build(level, parent_level, crop_code)
+            return self._summaries[key]
+
+    def precompute(self):
+        """모든 작물/레벨/상위 레벨 조합을 미리 계산 (이미 만든 것은 건너뜀)"""
+        for crop_code in (list(self.dataset.crop_rows) or [None]):
+            for level in range(len(LEVELS)):
+                for parent_level in [None] + list(range(level)):
+                    self.get(level, parent_level, crop_code)
+
+    def _build(self, level, parent_level, crop_code):
+        dataset = self.dataset
+        rows = np.flatnonzero(dataset.levels == level)
+        if crop_code:
+            rows = np.intersect1d(rows, dataset.crop_rows.get(crop_code, rows[:0]), assume_unique=True)
+
+        if parent_level is None:
+            parents = np.zeros(len(rows), dtype=np.int64)
+        else:
+            parents = dataset.codes[rows] // 10 ** (10 - LEVEL_DIGITS[parent_level])
+        group_codes, groups = np.unique(parents, return_inverse=True)
+        if len(group_codes) == 0:
+            group_codes = np.zeros(1, dtype=np.int64)
+        columns = [dataset.value_columns[c] for c in self.columns]
+        values = dataset.take(rows, self.columns)
+        return LevelSummary(columns, group_codes, values, groups.astype(np.int64))
+
+    def query(self, level_name, parent_cd=None, crop_code=None, columns=None):
+        """API 응답용 요약 (parent_cd 는 2/5/8자리 상위 지역 코드, 없으면 전국). 찾지 못하면 None
+
+        columns 에 데이터셋에 없는 컬럼이 있으면 ValueError
+        """
+        if columns:
+            unknown = [col for col in columns if col not in self.dataset.value_columns]
+            if unknown:
+                raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+        level = LEVELS.index(level_name)
+        parent_level = None
+        if parent_cd:
+            if len(parent_cd) not in LEVEL_DIGITS[:level]:
+                return None
+            parent_level = LEVEL_DIGITS.index(len(parent_cd))
+
+        summary = self.get(level, parent_level, crop_code)
+        group = summary.group_index(int(parent_cd) if parent_cd else 0)
+        if group < 0:
+            return None
+        return {
+            'level': level_name,
+            'parent_cd': parent_cd,
+            'rows': int(summary.count[group].max(initial=0)),
+            'columns': summary.to_dict(group, columns),
+        }
@@ -0,0 +1,176 @@
+"""서버 렌더링 래스터 타일
+
+경계(geometry.BoundaryLayer)와 데이터셋 값을 합쳐 256x256 PNG 타일을 만든다.
+색상 구간은 데이터 버전마다 미리 계산된 class_breaks 를 사용하고 (map.js 와 같은 색),
+결과는 (데이터 버전, 스타일, z/x/y) 를 키로 메모리 LRU 와 디스크에 캐시한다.
+"""
+import hashlib
+import os
+import shutil
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from geometry import fill_mask
+
+TILE_SIZE = 256
+
+# map.js 의 calculateColorScale 색상 (큰 값 → 작은 값, 마지막은 0/없음)
+SCALE_COLORS = np.array([
+    (34, 139, 34),
+    (144, 238, 144),
+    (255, 241, 118),
+    (255, 193, 144),
+    (255, 69, 0),
+    (240, 240, 240),
+], dtype=np.uint8)
+NO_DATA_COLOR = (240, 240, 240)
+BORDER_COLOR = (102, 102, 102, 255)
+FILL_ALPHA = 204  # fillOpacity 0.8
+
+MEMORY_TILES = 2048
+
+
+def level_for_zoom(zoom):
+    """줌 레벨 → 행정구역 레벨 (map.js 의 ZOOM_LEVELS, 리 경계는 없어서 읍면동 사용)"""
+    if zoom <= 7:
+        return 'sido'
+    if zoom == 8:
+        return 'sigungu'
+    return 'eupmyeondong'
+
+
+def encode_png(rgba):
+    """RGBA 배열(h × w × 4, uint8)을 PNG bytes 로 인코딩"""
+    height, width = rgba.shape[:2]
+    raw = np.zeros((height, width * 4 + 1), dtype=np.uint8)  # 각 줄 앞의 0 은 필터 없음
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw.tobytes(), 6))
+            + chunk(b'IEND', b''))
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8))
+
+
+def rasterize(layer, z, x, y):
+    """타일의 픽셀별 피처 인덱스 (-1: 없음)"""
+    scale = 2 ** z
+    labels = np.full((TILE_SIZE, TILE_SIZE), -1, dtype=np.int32)
+    candidates = layer.candidates(x / scale, y / scale, (x + 1) / scale, (y + 1) / scale)
+
+    for index in candidates:
+        inside = fill_mask(layer.feature_edges(index), x / scale, y / scale, 1 / (scale * TILE_SIZE),
+                           TILE_SIZE, TILE_SIZE)
+        labels[inside] = index
+
+    return labels
+
+
+def feature_colors(layer, dataset, level, crop_code, column):
+    """피처별 채움 색 (피처 수 × 3). 데이터가 없는 지역은 회색"""
+    colors = np.tile(np.array(NO_DATA_COLOR, dtype=np.uint8), (len(layer), 1))
+    if column not in dataset.value_columns:
+        return colors
+
+    rows = dataset.rows(level, crop_code)
+    region_codes = dataset.region_codes(rows, level)
+    values = np.nan_to_num(dataset.column(column, rows))
+    lookup = dict(zip(region_codes, values))
+    feature_values = np.array([lookup.get(code, 0.0) for code in layer.codes], dtype=np.float64)
+
+    breaks = dataset.class_breaks.get((crop_code or None, level), {}).get(column, [0])
+    if len(breaks) < len(SCALE_COLORS):
+        return colors
+    # getValueColor 와 같이 처음으로 값 >= 경계인 구간의 색, 1 미만(0 포함)은 회색
+    conditions = [feature_values >= b for b in breaks[:-1]]
+    class_index = np.select(conditions, range(len(conditions)), default=len(breaks) - 1)
+    return SCALE_COLORS[class_index]
+
+
+def render_tile(layer, colors, z, x, y):
+    """타일 PNG 렌더링 (경계선은 이웃 픽셀과 피처가 다른 곳에 그림)"""
+    labels = rasterize(layer, z, x, y)
+    if not (labels >= 0).any():
+        return EMPTY_TILE
+
+    rgba = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype=np.uint8)
+    filled = labels >= 0
+    rgba[filled, :3] = colors[labels[filled]]
+    rgba[filled, 3] = FILL_ALPHA
+
+    border = np.zeros_like(filled)
+    border[:, :-1] |= labels[:, :-1] != labels[:, 1:]
+    border[:-1, :] |= labels[:-1, :] != labels[1:, :]
+    rgba[border & filled] = BORDER_COLOR
+    return encode_png(rgba)
+
+
+def style_key(filename, crop_code, level, column):
+    text = f"{filename}|{crop_code or ''}|{level}|{column}"
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:12]
+
+
+class TileCache:
+    """(데이터 버전, 스타일, z/x/y) 키의 메모리 LRU + 디스크 캐시"""
+
+    def __init__(self, cache_dir, max_tiles=MEMORY_TILES):
+        self.cache_dir = cache_dir
+        self.max_tiles = max_tiles
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, version, style, z, x, y):
+        return os.path.join(self.cache_dir, version, style, str(z), str(x), f"{y}.png")
+
+    def get(self, version, style, z, x, y):
+        key = (version, style, z, x, y)
+        with self._lock:
+            if key in self._tiles:
+                self._tiles.move_to_end(key)
+                return self._tiles[key]
+
+        path = self._path(version, style, z, x, y)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                tile = f.read()
+            self._remember(key, tile)
+            return tile
+        return None
+
+    def put(self, version, style, z, x, y, tile):
+        self._remember((version, style, z, x, y), tile)
+        path = self._path(version, style, z, x, y)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(tile)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"타일 캐시 저장 오류: {e}")
+
+    def _remember(self, key, tile):
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+    def prune(self, keep_version):
+        """현재 버전이 아닌 타일을 정리"""
+        with self._lock:
+            for key in [k for k in self._tiles if k[0] != keep_version]:
+                del self._tiles[key]
+        if os.path.isdir(self.cache_dir):
+            for version in os.listdir(self.cache_dir):
+                if version != keep_version:
+                    shutil.rmtree(os.path.join(self.cache_dir, version), ignore_errors=True)
@@ -0,0 +1,233 @@
+"""법정동코드(pnu.csv) 레지스트리
+
+수집기(main.py)들과 지도 서버(map/app.py)가 함께 쓰는 행정구역 코드 목록.
+pnu.csv 를 한 번만 읽어 정수 배열(array)로 보관하고,
+상위/하위 구역 탐색과 변경전 코드 → 현행 코드 변환을 제공한다.
+"""
+import csv
+import os
+from array import array
+from threading import Lock
+
+import numpy as np
+
+# 행정구역 레벨 (10자리 법정동코드의 0 채움 위치로 결정)
+LEVEL_SIDO = 0  # 시도: 3~10자리가 모두 0
+LEVEL_SIGUNGU = 1  # 시군구: 6~10자리가 모두 0
+LEVEL_EUPMYEONDONG = 2  # 읍면동: 9~10자리가 모두 0
+LEVEL_LI = 3  # 리: 10자리 전체
+
+LEVEL_NAMES = ('sido', 'sigungu', 'eupmyeondong', 'li')
+
+# 레벨별 코드 자릿수 (region_cd 길이)
+LEVEL_DIGITS = (2, 5, 8, 10)
+LEVEL_NAME_DIGITS = dict(zip(LEVEL_NAMES, LEVEL_DIGITS))  # 'sido' → 2
+
+# pnu.csv 는 EUC-KR(CP949)로 저장되어 있고, 수집 결과 CSV 는 UTF-8(BOM)이다.
+ENCODINGS = ('utf-8-sig', 'cp949')
+
+_cache = {}
+_cache_lock = Lock()
+
+
+def code_level(code):
+    """10자리 법정동코드의 행정구역 레벨을 반환하는 함수"""
+    code = int(code)
+    if code % 100000000 == 0:
+        return LEVEL_SIDO
+    if code % 100000 == 0:
+        return LEVEL_SIGUNGU
+    if code % 100 == 0:
+        return LEVEL_EUPMYEONDONG
+    return LEVEL_LI
+
+
+def code_levels(codes):
+    """10자리 법정동코드 배열의 행정구역 레벨 (code_level 의 배열 버전)"""
+    codes = np.asarray(codes, dtype=np.int64)
+    return np.select(
+        [codes % 100000000 == 0, codes % 100000 == 0, codes % 100 == 0],
+        [LEVEL_SIDO, LEVEL_SIGUNGU, LEVEL_EUPMYEONDONG],
+        default=LEVEL_LI,
+    ).astype(np.int8)
+
+
+def truncate_code(code, level):
+    """코드를 지정한 레벨의 상위 구역 코드로 자르는 함수 (예: 리 → 읍면동)"""
+    unit = 10 ** (10 - LEVEL_DIGITS[level])
+    return int(code) // unit * unit
+
+
+def region_code(code, level=None):
+    """지도 경계 파일의 region_cd 형식(2/5/8/10자리 문자열)으로 변환하는 함수"""
+    if level is None:
+        level = code_level(code)
+    return str(int(code)).zfill(10)[:LEVEL_DIGITS[level]]
+
+
+def _parse_int(value, default=0):
+    value = (value or '').strip().replace('-', '')
+    return int(value) if value.isdigit() else default
+
+
+def _read_rows(filename):
+    """인코딩을 판별해 CSV 행을 읽는 함수 (파일은 한 번만 디코딩)"""
+    with open(filename, 'rb') as f:
+        raw = f.read()
+
+    for encoding in ENCODINGS:
+        try:
+            text = raw.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise UnicodeDecodeError(ENCODINGS[-1], raw, 0, 1, f"{filename}: 지원하지 않는 인코딩")
+
+    reader = csv.reader(text.splitlines())
+    next(reader, None)  # 헤더 건너뛰기
+    return [row for row in reader if row and row[0].strip()]
+
+
+class PnuRegistry:
+    """행정구역 코드 레지스트리
+
+    모든 필드는 코드 오름차순으로 정렬된 배열이며 같은 인덱스가 같은 구역을 가리킨다.
+        codes    : 10자리 법정동코드 (int64)
+        levels   : 행정구역 레벨 (LEVEL_*)
+        parents  : 가장 가까운 상위 구역의 인덱스 (없으면 -1)
+        created  : 생성일자 YYYYMMDD (없으면 0)
+        prev     : 변경전 행정구역코드 (없으면 0)
+    하위 구역은 child_offsets/child_index (CSR 형식)로 O(1)에 찾는다.
+    """
+
+    def __init__(self, codes, names, created=None, prev=None):
+        order = sorted(range(len(codes)), key=lambda i: codes[i])
+        count = len(order)
+        created = created or [0] * count
+        prev = prev or [0] * count
+
+        self.codes = array('q', (codes[i] for i in order))
+        self.names = tuple(names[i] for i in order)
+        self.created = array('l', (created[i] for i in order))
+        self.prev = array('q', (prev[i] for i in order))
+        self.levels = array('b', (code_level(c) for c in self.codes))
+        self._index = {code: i for i, code in enumerate(self.codes)}
+
+        # 상위 구역: 바로 위 레벨부터 시도까지 실제로 존재하는 코드를 찾는다
+        self.parents = array('l', [-1] * count)
+        for i, code in enumerate(self.codes):
+            for level in range(self.levels[i] - 1, -1, -1):
+                parent = self._index.get(truncate_code(code, level), -1)
+                if parent >= 0 and parent != i:
+                    self.parents[i] = parent
+                    break
+
+        # 하위 구역 CSR (코드 순서가 유지되도록 안정적으로 채움)
+        child_counts = [0] * (count + 1)
+        for parent in self.parents:
+            if parent >= 0:
+                child_counts[parent + 1] += 1
+        for i in range(count):
+            child_counts[i + 1] += child_counts[i]
+        self.child_offsets = array('l', child_counts)
+        self.child_index = array('l', [0] * child_counts[count])
+        cursor = list(child_counts[:count])
+        for i, parent in enumerate(self.parents):
+            if parent >= 0:
+                self.child_index[cursor[parent]] = i
+                cursor[parent] += 1
+
+        # 변경전 코드 → 현행 코드 (현행 코드와 겹치는 값은 제외)
+        self._successors = {}
+        for i, old in enumerate(self.prev):
+            if old and old not in self._index:
+                self._successors[old] = self.codes[i]
+
+    @classmethod
+    def load(cls, filename="pnu.csv"):
+        """pnu.csv 를 읽어 레지스트리를 만드는 함수 (파일이 바뀌지 않으면 캐시 재사용)"""
+        path = os.path.abspath(filename)
+        mtime = os.path.getmtime(path)
+
+        with _cache_lock:
+            cached = _cache.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+
+        codes, names, created, prev = [], [], [], []
+        seen = set()
+        for row in _read_rows(path):
+            code = _parse_int(row[0])
+            if not code or code in seen:
+                continue
+            seen.add(code)
+            codes.append(code)
+            names.append(row[1].strip() if len(row) > 1 else '')
+            created.append(_parse_int(row[3]) if len(row) > 3 else 0)
+            prev.append(_parse_int(row[4]) if len(row) > 4 else 0)
+
+        registry = cls(codes, names, created, prev)
+        with _cache_lock:
+            _cache[path] = (mtime, registry)
+        return registry
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __contains__(self, code):
+        return int(code) in self._index
+
+    def index_of(self, code):
+        """코드의 인덱스를 반환 (없으면 -1)"""
+        return self._index.get(int(code), -1)
+
+    def name_of(self, code):
+        i = self.index_of(code)
+        return self.names[i] if i >= 0 else None
+
+    def parent(self, index):
+        """상위 구역 인덱스 (없으면 -1)"""
+        return self.parents[index]
+
+    def children(self, index):
+        """하위 구역 인덱스 목록"""
+        return self.child_index[self.child_offsets[index]:self.child_offsets[index + 1]]
+
+    def ancestors(self, index):
+        """상위 구역 인덱스를 가까운 순서대로 반환"""
+        result = []
+        index = self.parents[index]
+        while index >= 0:
+            result.append(index)
+            index = self.parents[index]
+        return result
+
+    def indices_at_level(self, level):
+        return [i for i, lv in enumerate(self.levels) if lv == level]
+
+    def code_strings(self, level=None):
+        """수집기에서 쓰는 10자리 문자열 코드 목록"""
+        return [str(code).zfill(10) for code, lv in zip(self.codes, self.levels)
+                if level is None or lv == level]
+
+    def successor(self, code):
+        """변경전 코드를 현행 코드로 변환 (현행 코드나 모르는 코드는 그대로)"""
+        code = int(code)
+        seen = set()
+        while code in self._successors and code not in seen:
+            seen.add(code)
+            code = self._successors[code]
+        return code
+
+    def remap(self, codes):
+        """여러 코드를 한 번에 현행 코드로 변환"""
+        successors = self._successors
+        if not successors:
+            return [int(code) for code in codes]
+        return [self.successor(code) if int(code) in successors else int(code) for code in codes]
+
+    def successor_table(self):
+        """(변경전 코드, 현행 코드) 정렬 배열 - numpy searchsorted 로 일괄 변환할 때 사용"""
+        old_codes = sorted(self._successors)
+        return array('q', old_codes), array('q', (self.successor(code) for code in old_codes))
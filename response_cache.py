@@ -0,0 +1,250 @@
+"""수집기 API 원본 응답 캐시
+
+data.go.kr 응답(XML)을 버리지 않고 디스크에 보관해, 파싱이나 출력 형식을 바꿨을 때
+API 를 다시 호출하지 않고 로컬에서 바로 다시 만들 수 있게 한다.
+
+    http_cache/
+        objects/ab/abcdef...      응답 본문 (zlib 압축, 파일명은 원본 sha256)
+        refs/12/1234....json      요청 키 → 응답 해시, 수집 시각
+
+요청 키는 (엔드포인트 URL, 인증키를 뺀 파라미터 = STDG_CD, 작물 코드) 이다.
+같은 내용의 응답(예: "데이터 없음")은 객체 하나만 저장된다.
+
+모드 (환경변수 SOIL_CACHE_MODE)
+    online      유효기간(TTL) 안의 캐시는 그대로 쓰고, 없거나 오래되면 API 호출 후 저장 (기본)
+    replay      기간과 관계없이 캐시가 있으면 사용, 없을 때만 API 호출
+    cache-only  캐시만 사용 (API 를 호출하지 않음, 없으면 None)
+    off         캐시를 쓰지 않음
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+import requests
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "http_cache")
+DEFAULT_TTL = 30 * 24 * 3600  # 30일
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 압축 후 2GB
+
+MODES = ('online', 'replay', 'cache-only', 'off')
+
+# 캐시 키에서 제외하는 파라미터 (인증키가 바뀌어도 같은 요청)
+KEY_EXCLUDE = {'serviceKey'}
+
+
+def is_cacheable(content):
+    """정상 응답(result_Code 200)만 저장 (한도 초과, 게이트웨이 오류 등은 저장하지 않음)"""
+    return b'<result_Code>200</result_Code>' in content
+
+
+class ResponseCache:
+    """(URL, 파라미터) 키의 원본 응답 캐시"""
+
+    def __init__(self, root=DEFAULT_ROOT, mode='online', ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        if mode not in MODES:
+            raise ValueError(f"알 수 없는 캐시 모드: {mode} ({', '.join(MODES)})")
+        self.root = root
+        self.mode = mode
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.objects_dir = os.path.join(root, "objects")
+        self.refs_dir = os.path.join(root, "refs")
+        self.stats = {'hits': 0, 'misses': 0, 'requests': 0, 'stored': 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """환경변수(SOIL_CACHE_MODE, SOIL_CACHE_DIR, SOIL_CACHE_TTL_DAYS, SOIL_CACHE_MAX_MB)로 만드는 함수"""
+        return cls(
+            root=os.environ.get('SOIL_CACHE_DIR', DEFAULT_ROOT),
+            mode=os.environ.get('SOIL_CACHE_MODE', 'online'),
+            ttl=float(os.environ.get('SOIL_CACHE_TTL_DAYS', DEFAULT_TTL / 86400)) * 86400,
+            max_bytes=int(float(os.environ.get('SOIL_CACHE_MAX_MB', DEFAULT_MAX_BYTES / 1024 ** 2)) * 1024 ** 2)
+        )
+
+    # --- 키/경로 ---
+
+    @staticmethod
+    def request_key(url, params):
+        key_params = {k: str(v) for k, v in sorted(params.items()) if k not in KEY_EXCLUDE}
+        text = json.dumps([url, key_params], ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha1(text.encode('utf-8')).hexdigest(), key_params
+
+    def _ref_path(self, key):
+        return os.path.join(self.refs_dir, key[:2], f"{key}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # --- 조회/저장 ---
+
+    def lookup(self, url, params, fresh_only=None):
+        """캐시된 응답 본문 (없거나 유효기간이 지났으면 None)"""
+        key, _ = self.request_key(url, params)
+        ref_path = self._ref_path(key)
+        try:
+            with open(ref_path, 'r', encoding='utf-8') as f:
+                ref = json.load(f)
+            with open(self._object_path(ref['sha256']), 'rb') as f:
+                content = zlib.decompress(f.read())
+        except (OSError, ValueError, KeyError, zlib.error):
+            return None
+
+        if fresh_only is None:
+            fresh_only = self.mode == 'online'
+        if fresh_only and time.time() - ref.get('fetched_at', 0) > self.ttl:
+            return None
+        try:
+            os.utime(ref_path)  # 최근 사용 시각 (크기 기준 정리 시 오래 안 쓴 것부터 삭제)
+        except OSError:
+            pass
+        return content
+
+    def store(self, url, params, content):
+        key, key_params = self.request_key(url, params)
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, zlib.compress(content, 6))
+        ref = {'url': url, 'params': key_params, 'sha256': digest, 'size': len(content), 'fetched_at': time.time()}
+        self._write_atomic(self._ref_path(key), json.dumps(ref, ensure_ascii=False).encode('utf-8'))
+        with self._lock:
+            self.stats['stored'] += 1
+
+    def fetch(self, url, params, timeout=30, throttle=None):
+        """캐시 우선으로 응답 본문(bytes)을 가져오는 함수
+
+        API 를 호출할 때만 throttle() 을 먼저 부른다 (호출 간격 대기). 캐시 적중 시에는 기다리지 않는다.
+        cache-only 모드에서 캐시에 없으면 None. 요청 실패 시 requests 예외를 그대로 올린다.
+        """
+        if self.mode != 'off':
+            content = self.lookup(url, params)
+            with self._lock:
+                self.stats['hits' if content is not None else 'misses'] += 1
+            if content is not None or self.mode == 'cache-only':
+                return content
+
+        if throttle is not None:
+            throttle()
+        with self._lock:
+            self.stats['requests'] += 1
+        response = requests.get(url, params=params, timeout=timeout)
+        response.raise_for_status()
+
+        if self.mode != 'off' and is_cacheable(response.content):
+            try:
+                self.store(url, params, response.content)
+            except OSError as e:
+                print(f"응답 캐시 저장 오류: {e}")
+        return response.content
+
+    def summary(self):
+        with self._lock:
+            stats = dict(self.stats)
+        return (f"응답 캐시({self.mode}): 적중 {stats['hits']}, 미적중 {stats['misses']}, "
+                f"API 호출 {stats['requests']}, 저장 {stats['stored']}")
+
+    # --- 정리 ---
+
+    def _refs(self):
+        """(경로, 마지막 사용 시각, ref) 목록"""
+        refs = []
+        if not os.path.isdir(self.refs_dir):
+            return refs
+        for prefix in os.listdir(self.refs_dir):
+            prefix_dir = os.path.join(self.refs_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(prefix_dir, name)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        refs.append((path, os.path.getmtime(path), json.load(f)))
+                except (OSError, ValueError):
+                    continue
+        return refs
+
+    def prune(self, max_age=None, max_bytes=None):
+        """오래된 항목(max_age 초)과 용량 초과분(오래 안 쓴 것부터)을 지우고 남는 객체를 정리하는 함수"""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        now = time.time()
+        refs = self._refs()
+        removed = 0
+
+        if max_age is not None:
+            kept = []
+            for path, used_at, ref in refs:
+                if now - ref.get('fetched_at', 0) > max_age:
+                    os.remove(path)
+                    removed += 1
+                else:
+                    kept.append((path, used_at, ref))
+            refs = kept
+
+        # 객체 크기 (디스크 기준, 여러 ref 가 공유하면 한 번만 계산)
+        def object_size(digest):
+            try:
+                return os.path.getsize(self._object_path(digest))
+            except OSError:
+                return 0
+
+        refs.sort(key=lambda item: item[1])  # 오래 안 쓴 것부터
+        counts = {}
+        for _, _, ref in refs:
+            counts[ref['sha256']] = counts.get(ref['sha256'], 0) + 1
+        total = sum(object_size(digest) for digest in counts)
+        for path, _, ref in refs:
+            if total <= max_bytes:
+                break
+            os.remove(path)
+            removed += 1
+            counts[ref['sha256']] -= 1
+            if counts[ref['sha256']] == 0:
+                total -= object_size(ref['sha256'])
+
+        # 참조가 없는 객체 삭제
+        deleted_objects = 0
+        live = {digest for digest, count in counts.items() if count > 0}
+        if os.path.isdir(self.objects_dir):
+            for prefix in os.listdir(self.objects_dir):
+                prefix_dir = os.path.join(self.objects_dir, prefix)
+                for name in os.listdir(prefix_dir):
+                    if name not in live and not name.endswith('.tmp'):
+                        os.remove(os.path.join(prefix_dir, name))
+                        deleted_objects += 1
+        return {'removed_refs': removed, 'removed_objects': deleted_objects, 'bytes': total}
+
+    def fetch_times(self):
+        """요청 키 → 마지막 수집 시각 (수집 계획에서 요청별 데이터 경과 시간을 계산할 때 사용)"""
+        return {os.path.basename(path)[:-5]: ref.get('fetched_at', 0) for path, _, ref in self._refs()}
+
+    def info(self):
+        refs = self._refs()
+        digests = {ref['sha256'] for _, _, ref in refs}
+        disk_bytes = sum(os.path.getsize(self._object_path(d)) for d in digests if os.path.exists(self._object_path(d)))
+        expired = sum(1 for _, _, ref in refs if time.time() - ref.get('fetched_at', 0) > self.ttl)
+        return {'entries': len(refs), 'objects': len(digests), 'bytes': disk_bytes, 'expired': expired}
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 사용법: python response_cache.py [info | prune [최대일수]]
+    cache = ResponseCache.from_env()
+    command = sys.argv[1] if len(sys.argv) > 1 else "info"
+    if command == "info":
+        print(cache.info())
+    elif command == "prune":
+        max_age = float(sys.argv[2]) * 86400 if len(sys.argv) > 2 else None
+        print(cache.prune(max_age=max_age))
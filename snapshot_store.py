@@ -0,0 +1,357 @@
+"""수집 결과 스냅샷 저장소
+
+수집이 끝나면 결과 CSV 를 검증/정규화한 뒤 줄 단위 청크로 나누어
+내용 해시(sha256)로 저장한다. 같은 내용의 청크는 한 번만 저장되므로
+반복 수집이나 여러 폴더에 복사하던 파일이 디스크를 추가로 차지하지 않는다.
+
+    snapshots/
+        objects/ab/abcdef...      청크 (내용 해시가 곧 파일명, 변경 불가)
+        manifests/<id>.json       스냅샷 매니페스트 (파일 → 청크 목록, 수집 정보)
+        CURRENT                   현재 스냅샷 id (앱이 읽는 포인터)
+
+CURRENT 는 os.replace 로 한 번에 바뀌므로 배포와 롤백이 즉시 반영된다.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import time
+import zlib
+from threading import Lock
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+
+# 청크 경계: 줄의 crc32 가 CHUNK_LINES 로 나누어떨어지면 끊는다 (평균 CHUNK_LINES 줄)
+# 내용 기반으로 끊기 때문에 중간에 행이 추가/삭제되어도 나머지 청크는 그대로 재사용된다.
+CHUNK_LINES = 256
+MAX_CHUNK_LINES = 4096
+
+# 수집기 출력 파일 → 앱에서 쓰는 데이터 파일명
+COLLECTOR_FILES = {
+    "1-1": "SoilExamStat_Om.csv",
+    "1-2": "SoilExamStat_Ap.csv",
+    "1-3": "SoilExamStat_Ka.csv",
+    "1-4": "SoilExamStat_pH.csv",
+    "1-5": "SoilExamStat_Mg.csv",
+    "1-6": "SoilExamStat_Sa.csv",
+    "1-7": "SoilExamStat_Ca.csv",
+    "2-1": "SoilCharacStat_DrngGrad.csv",
+    "2-2": "SoilCharacStat_WashGrad.csv",
+    "2-3": "SoilCharacStat_TopslGrv.csv",
+    "2-4": "SoilCharacStat_DistrbTopograpy.csv",
+    "2-5": "SoilCharacStat_AmnForm.csv",
+    "2-6": "SoilCharacStat_Tree.csv",
+    "2-7": "SoilCharacStat_Sbr.csv",
+    "2-8": "SoilCharacStat_MainLand.csv",
+    "2-9": "SoilCharacStat_PaddyObstrcFctr.csv",
+    "2-10": "SoilCharacStat_FieldGrad.csv",
+    "apple": "SoilFitStat_apple.csv",
+}
+
+# 정규화 시 앞쪽에 두는 컬럼 (지도 서버 data/ 파일과 같은 순서)
+LEADING_COLUMNS = ['stdg_Cd', 'bjd_Nm', 'soil_Crop_Cd', 'soil_Crop_Nm']
+
+
+class SnapshotError(ValueError):
+    """검증 실패 등으로 스냅샷을 만들 수 없을 때"""
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def validate_csv(name, raw, registry=None):
+    """수집 결과 CSV 를 검증하고 정규화된 (헤더, 행 목록, 경고 목록)을 반환하는 함수"""
+    try:
+        text = raw.decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        raise SnapshotError(f"{name}: UTF-8 이 아닙니다 ({e})")
+
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        raise SnapshotError(f"{name}: 빈 파일입니다")
+
+    header, body = rows[0], [row for row in rows[1:] if row]
+    for required in ('stdg_Cd', 'bjd_Nm'):
+        if required not in header:
+            raise SnapshotError(f"{name}: '{required}' 컬럼이 없습니다")
+    if not body:
+        raise SnapshotError(f"{name}: 데이터 행이 없습니다")
+
+    code_index = header.index('stdg_Cd')
+    key_indices = [code_index] + ([header.index('soil_Crop_Cd')] if 'soil_Crop_Cd' in header else [])
+    seen = set()
+    for line_no, row in enumerate(body, start=2):
+        if len(row) != len(header):
+            raise SnapshotError(f"{name}:{line_no}: 컬럼 수가 헤더와 다릅니다 ({len(row)} != {len(header)})")
+        code = row[code_index].strip()
+        if len(code) != 10 or not code.isdigit():
+            raise SnapshotError(f"{name}:{line_no}: 잘못된 법정동코드 '{code}'")
+        key = tuple(row[i] for i in key_indices)
+        if key in seen:
+            raise SnapshotError(f"{name}:{line_no}: 중복된 행 {key}")
+        seen.add(key)
+
+    warnings = []
+    if registry is not None:
+        unknown = sum(1 for row in body if row[code_index] not in registry)
+        if unknown:
+            warnings.append(f"pnu.csv 에 없는 코드 {unknown}건")
+
+    # 컬럼 순서(식별 컬럼 우선)와 행 순서(코드 순)를 고정해 청크가 재사용되도록 한다
+    order = [header.index(col) for col in LEADING_COLUMNS if col in header]
+    order += [i for i in range(len(header)) if i not in order]
+    header = [header[i] for i in order]
+    body = sorted(([row[i] for i in order] for row in body), key=lambda row: row[0])
+    return header, body, warnings
+
+
+def split_chunks(lines):
+    """인코딩된 줄 목록을 내용 기반 청크로 나누는 함수"""
+    chunks, current = [], []
+    for line in lines:
+        current.append(line)
+        if zlib.crc32(line) % CHUNK_LINES == 0 or len(current) >= MAX_CHUNK_LINES:
+            chunks.append(b''.join(current))
+            current = []
+    if current:
+        chunks.append(b''.join(current))
+    return chunks
+
+
+def _encode_rows(rows):
+    """행 목록을 CSV 줄(bytes) 목록으로 인코딩하는 함수"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    ends = []
+    for row in rows:
+        writer.writerow(row)
+        ends.append(buffer.tell())
+    text = buffer.getvalue()
+    starts = [0] + ends[:-1]
+    return [text[start:end].encode('utf-8') for start, end in zip(starts, ends)]
+
+
+class SnapshotStore:
+    """내용 주소 기반 스냅샷 저장소"""
+
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.manifests_dir = os.path.join(root, "manifests")
+        self.current_file = os.path.join(root, "CURRENT")
+        self._manifests = {}
+        self._lock = Lock()
+
+    # --- 저장 ---
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def _put_object(self, data):
+        """청크를 저장하고 해시를 반환 (이미 있으면 쓰지 않음)"""
+        digest = _sha256(data)
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def _write_atomic(self, path, text):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def publish(self, files, run_info=None, registry=None, inherit=False, make_current=True):
+        """파일들을 검증해 새 스냅샷으로 저장하고 CURRENT 를 옮기는 함수
+
+        files: {데이터 파일명: 경로}. 하나라도 검증에 실패하면 아무것도 바꾸지 않는다.
+        inherit: files 에 없는 파일은 현재 스냅샷의 항목(청크)을 그대로 이어받는다.
+        """
+        validated = {}
+        for name, path in files.items():
+            with open(path, 'rb') as f:
+                validated[name] = validate_csv(name, f.read(), registry)
+
+        os.makedirs(self.manifests_dir, exist_ok=True)
+        collected_at = time.strftime('%Y%m%dT%H%M%S')  # 이번에 수집한 파일의 수집 시각 (이어받은 파일은 원래 값 유지)
+        entries = {}
+        new_bytes = 0
+        for name, (header, body, warnings) in sorted(validated.items()):
+            lines = ['\ufeff'.encode('utf-8') + _encode_rows([header])[0]] + _encode_rows(body)
+            chunks = []
+            for chunk in [lines[0]] + split_chunks(lines[1:]):
+                if not os.path.exists(self._object_path(_sha256(chunk))):
+                    new_bytes += len(chunk)
+                chunks.append(self._put_object(chunk))
+            content = b''.join(lines)
+            entries[name] = {
+                'size': len(content),
+                'sha256': _sha256(content),
+                'rows': len(body),
+                'columns': header,
+                'chunks': chunks,
+                'warnings': warnings,
+                'collected_at': collected_at
+            }
+
+        current = self.manifest()
+        if current and inherit:
+            for name, entry in current['files'].items():
+                entries.setdefault(name, entry)
+
+        digest = _sha256(json.dumps({n: e['sha256'] for n, e in entries.items()}, sort_keys=True).encode())
+        if current and current.get('digest') == digest:
+            print(f"변경된 내용이 없어 현재 스냅샷 {current['id']}을 유지합니다.")
+            return current
+
+        created_at = time.strftime('%Y%m%dT%H%M%S')
+        snapshot_id = f"{created_at}-{digest[:8]}"
+        manifest = {
+            'id': snapshot_id,
+            'digest': digest,
+            'created_at': created_at,
+            'parent': self.current_id(),
+            'run': run_info or {},
+            'new_bytes': new_bytes,
+            'files': entries
+        }
+
+        manifest_path = os.path.join(self.manifests_dir, f"{snapshot_id}.json")
+        self._write_atomic(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=1))
+        if make_current:
+            self.set_current(snapshot_id)
+        return manifest
+
+    def set_current(self, snapshot_id):
+        """CURRENT 포인터를 옮기는 함수 (배포/롤백)"""
+        if not os.path.exists(os.path.join(self.manifests_dir, f"{snapshot_id}.json")):
+            raise SnapshotError(f"스냅샷이 없습니다: {snapshot_id}")
+        self._write_atomic(self.current_file, snapshot_id)
+
+    def rollback(self, snapshot_id=None):
+        """지정한 스냅샷(기본: 현재 스냅샷의 parent)으로 되돌리는 함수"""
+        if snapshot_id is None:
+            snapshot_id = (self.manifest() or {}).get('parent')
+            if not snapshot_id:
+                raise SnapshotError("되돌릴 이전 스냅샷이 없습니다")
+        self.set_current(snapshot_id)
+        return snapshot_id
+
+    # --- 조회 ---
+
+    def current_id(self):
+        try:
+            with open(self.current_file, 'r', encoding='utf-8') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, snapshot_id=None):
+        """스냅샷 매니페스트 (매니페스트는 변경되지 않으므로 메모리에 캐시)"""
+        snapshot_id = snapshot_id or self.current_id()
+        if snapshot_id is None:
+            return None
+        with self._lock:
+            if snapshot_id in self._manifests:
+                return self._manifests[snapshot_id]
+        with open(os.path.join(self.manifests_dir, f"{snapshot_id}.json"), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        with self._lock:
+            self._manifests[snapshot_id] = manifest
+        return manifest
+
+    def list_snapshots(self):
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.manifests_dir) if name.endswith('.json'))
+
+    def read(self, name, snapshot_id=None):
+        """스냅샷의 파일 내용을 bytes 로 반환"""
+        entry = self.manifest(snapshot_id)['files'][name]
+        parts = []
+        for digest in entry['chunks']:
+            with open(self._object_path(digest), 'rb') as f:
+                parts.append(f.read())
+        content = b''.join(parts)
+        if _sha256(content) != entry['sha256']:
+            raise SnapshotError(f"{name}: 청크 내용이 매니페스트와 다릅니다")
+        return content
+
+    def checkout(self, target_dir, snapshot_id=None):
+        """스냅샷 파일을 디렉토리로 내보내는 함수 (내용이 같은 파일은 건드리지 않음)"""
+        os.makedirs(target_dir, exist_ok=True)
+        written = []
+        for name, entry in self.manifest(snapshot_id)['files'].items():
+            path = os.path.join(target_dir, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    if _sha256(f.read()) == entry['sha256']:
+                        continue
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(self.read(name, snapshot_id))
+            os.replace(tmp_path, path)
+            written.append(name)
+        return written
+
+    def gc(self, keep=None):
+        """어떤 매니페스트에서도 참조하지 않는 청크를 지우는 함수 (keep: 남길 스냅샷 id 목록)"""
+        snapshot_ids = keep if keep is not None else self.list_snapshots()
+        referenced = set()
+        for snapshot_id in snapshot_ids:
+            for entry in self.manifest(snapshot_id)['files'].values():
+                referenced.update(entry['chunks'])
+
+        removed = 0
+        for prefix in os.listdir(self.objects_dir) if os.path.isdir(self.objects_dir) else []:
+            for digest in os.listdir(os.path.join(self.objects_dir, prefix)):
+                if digest not in referenced:
+                    os.remove(os.path.join(self.objects_dir, prefix, digest))
+                    removed += 1
+        return removed
+
+
+def publish_collector_outputs(prefixes, output_dir=".", run_info=None, registry=None, root=DEFAULT_ROOT):
+    """수집기 출력(1-1.csv 등)을 데이터 파일명으로 바꿔 스냅샷으로 발행하는 함수
+
+    이번 실행에서 만들지 않은 파일은 현재 스냅샷의 청크를 그대로 가리키므로 복사가 일어나지 않는다.
+    """
+    store = SnapshotStore(root)
+    files = {}
+    for prefix in prefixes:
+        path = os.path.join(output_dir, f"{prefix}.csv")
+        if os.path.exists(path):
+            files[COLLECTOR_FILES.get(prefix, f"{prefix}.csv")] = path
+
+    if not files:
+        print("발행할 수집 결과가 없습니다.")
+        return None
+
+    previous_id = store.current_id()
+    manifest = store.publish(files, run_info, registry, inherit=True)
+    if manifest['id'] != previous_id:
+        print(f"스냅샷 {manifest['id']} 발행 완료: {len(files)}개 파일 갱신, "
+              f"신규 저장 {manifest['new_bytes'] / 1024:.1f}KB")
+    return manifest
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 사용법: python snapshot_store.py [list | rollback [id] | checkout <dir>]
+    snapshot_store = SnapshotStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+    if command == "list":
+        current_id = snapshot_store.current_id()
+        for sid in snapshot_store.list_snapshots():
+            print(("* " if sid == current_id else "  ") + sid)
+    elif command == "rollback":
+        print(f"CURRENT → {snapshot_store.rollback(sys.argv[2] if len(sys.argv) > 2 else None)}")
+    elif command == "checkout":
+        print(snapshot_store.checkout(sys.argv[2]))
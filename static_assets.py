@@ -0,0 +1,222 @@
+"""경계 GeoJSON 정적 자산 빌드와 사전 압축 파일 서빙
+
+지도 앱(map, apple_data, test1)의 경계 파일은 수 MB 라 방문할 때마다 그대로 내려받으면 느리다.
+빌드 단계에서 다음을 해 두고, 서빙할 때는 Accept-Encoding 에 맞는 파일을 고른다.
+
+    1. 좌표를 소수점 precision 자리로 줄이고 (5자리 ≈ 1m) 공백 없이 직렬화
+       반올림 후 연속으로 같아진 점은 한 번만 (인접 지역은 같은 꼭짓점이 같은 값으로 반올림되어 경계가 어긋나지 않음)
+    2. 내용 해시를 파일 이름에 넣음        static/assets/si_gun_gu_wgs84.<해시 12자리>.json
+    3. 압축 파일을 옆에 만듦               .json.gz (gzip -9), .json.br (brotli 모듈이 있을 때만)
+    4. static/assets/manifest.json 에 원래 이름 → 해시 파일 이름 기록 (브라우저가 읽어 해시 URL 로 요청)
+
+PrecompressedStaticFiles 는 StaticFiles 대신 마운트해서 쓴다.
+요청 파일 옆에 .br / .gz 가 있고 브라우저가 받을 수 있으면 그 파일을 Content-Encoding 과 함께 보내고,
+이름에 해시가 있는 파일은 내용이 바뀌지 않으므로 Cache-Control: immutable 로 1년간 캐시하게 한다.
+
+사용법:  python static_assets.py <앱의 static 디렉토리>... [--precision 5]
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # brotli 가 없으면 .br 파일은 만들지 않음 (gzip 만 협상)
+    brotli = None
+
+ASSET_DIR = "assets"
+MANIFEST_NAME = "manifest.json"
+DEFAULT_PRECISION = 5
+IMMUTABLE = "public, max-age=31536000, immutable"
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$')  # 이름에 내용 해시가 있는 파일
+
+# (인코딩, 파일 접미사) 서버 선호 순서
+ENCODINGS = (('br', '.br'), ('gzip', '.gz')) if brotli is not None else (('gzip', '.gz'),)
+
+_manifest_lock = threading.Lock()
+
+
+def _round_ring(ring, precision):
+    points = []
+    for point in ring:
+        rounded = [round(value, precision) for value in point[:2]]
+        if not points or points[-1] != rounded:
+            points.append(rounded)
+    return points
+
+
+def _round_coordinates(coordinates, depth, precision):
+    """depth: 0 = 점 목록(링/선), 1 = 링 목록(Polygon), 2 = Polygon 목록(MultiPolygon)"""
+    if depth == 0:
+        return _round_ring(coordinates, precision)
+    return [_round_coordinates(part, depth - 1, precision) for part in coordinates]
+
+
+GEOMETRY_DEPTH = {'LineString': 0, 'MultiPoint': 0, 'Polygon': 1, 'MultiLineString': 1, 'MultiPolygon': 2}
+
+
+def minify_geojson(geojson, precision=DEFAULT_PRECISION):
+    """좌표 자릿수를 줄이고 공백 없이 직렬화한 GeoJSON (bytes)"""
+    features = []
+    for feature in geojson.get('features', []):
+        geometry = feature.get('geometry')
+        if geometry and geometry.get('type') in GEOMETRY_DEPTH:
+            geometry = dict(geometry, coordinates=_round_coordinates(
+                geometry['coordinates'], GEOMETRY_DEPTH[geometry['type']], precision))
+        elif geometry and geometry.get('type') == 'Point':
+            geometry = dict(geometry, coordinates=[round(value, precision) for value in geometry['coordinates'][:2]])
+        features.append(dict(feature, geometry=geometry))
+    result = dict(geojson, features=features)
+    if 'bbox' in result:
+        result['bbox'] = [round(value, precision) for value in result['bbox']]
+    return json.dumps(result, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def write_atomic(path, body):
+    """임시 파일에 쓴 뒤 교체 (읽는 쪽이 쓰다 만 파일을 보지 않음)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+def write_encoded(path, body):
+    """원본과 압축 파일을 쓰고 {'size', 'gzip', 'br'} 크기 반환 (이미 있는 파일은 다시 압축하지 않음)
+
+    이름에 해시가 있는 파일에만 쓰므로 같은 이름이면 같은 내용이다.
+    """
+    encoders = {'gzip': lambda: gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encoders['br'] = lambda: brotli.compress(body, quality=11)
+
+    sizes = {'size': len(body)}
+    if not os.path.exists(path):
+        write_atomic(path, body)
+    for encoding, suffix in ENCODINGS:
+        if not os.path.exists(path + suffix):
+            write_atomic(path + suffix, encoders[encoding]())
+        sizes[encoding] = os.path.getsize(path + suffix)
+    return sizes
+
+
+def hashed_name(name, body):
+    stem, ext = os.path.splitext(os.path.basename(name))
+    return f"{stem}.{hashlib.sha256(body).hexdigest()[:12]}{ext}"
+
+
+def read_manifest(asset_dir):
+    try:
+        with open(os.path.join(asset_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def publish(asset_dir, name, body):
+    """자산 하나를 해시 이름으로 쓰고 매니페스트에 등록 (같은 이름의 이전 파일은 삭제), 매니페스트 항목 반환
+
+    name 은 매니페스트 키 (예: data/si_gun_gu_wgs84.json)
+    """
+    os.makedirs(asset_dir, exist_ok=True)
+    filename = hashed_name(name, body)
+    entry = dict(write_encoded(os.path.join(asset_dir, filename), body), file=filename)
+
+    with _manifest_lock:
+        manifest = read_manifest(asset_dir)
+        previous = manifest.get(name, {}).get('file')
+        manifest[name] = entry
+        write_atomic(os.path.join(asset_dir, MANIFEST_NAME),
+               json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True).encode('utf-8'))
+
+    if previous and previous != filename:
+        for suffix in ('', '.br', '.gz'):
+            if os.path.exists(os.path.join(asset_dir, previous + suffix)):
+                os.remove(os.path.join(asset_dir, previous + suffix))
+    return entry
+
+
+def build_static_dir(static_dir, precision=DEFAULT_PRECISION):
+    """static/data 의 GeoJSON 을 모두 static/assets 로 빌드하고 매니페스트 반환"""
+    asset_dir = os.path.join(static_dir, ASSET_DIR)
+    data_dir = os.path.join(static_dir, "data")
+    for filename in sorted(os.listdir(data_dir)):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(data_dir, filename), 'r', encoding='utf-8') as f:
+            geojson = json.load(f)
+        publish(asset_dir, f"data/{filename}", minify_geojson(geojson, precision))
+    return read_manifest(asset_dir)
+
+
+def accepted_encodings(header):
+    """Accept-Encoding 헤더에서 받을 수 있는 인코딩 (q=0 은 제외)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        token, _, params = part.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if token:
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """사전 압축 파일(.br/.gz)을 Accept-Encoding 에 맞춰 보내는 StaticFiles
+
+    이름에 내용 해시가 있는 파일은 Cache-Control: immutable (1년)
+    """
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if not isinstance(response, FileResponse):
+            return response
+
+        original = response.path
+        accepted = accepted_encodings(Headers(scope=scope).get('accept-encoding'))
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted and '*' not in accepted:
+                continue
+            try:
+                stat_result = os.stat(original + suffix)
+            except OSError:
+                continue
+            response = FileResponse(original + suffix, stat_result=stat_result,
+                                    media_type=response.media_type, headers={'Content-Encoding': encoding})
+            break
+
+        if any(os.path.exists(original + suffix) for _, suffix in ENCODINGS):
+            response.headers['Vary'] = 'Accept-Encoding'
+        if HASHED_NAME.search(path):
+            response.headers['Cache-Control'] = IMMUTABLE
+        elif os.path.basename(path) == MANIFEST_NAME:
+            response.headers['Cache-Control'] = 'no-cache'  # 해시 이름이 바뀌면 바로 알 수 있게
+        return response
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="경계 GeoJSON 정적 자산 빌드")
+    parser.add_argument("static_dirs", nargs="+", help="앱의 static 디렉토리 (data/*.json 을 assets/ 로 빌드)")
+    parser.add_argument("--precision", type=int, default=DEFAULT_PRECISION, help="좌표 소수점 자릿수")
+    args = parser.parse_args()
+
+    for static_dir in args.static_dirs:
+        for name, entry in sorted(build_static_dir(static_dir, args.precision).items()):
+            source = os.path.join(static_dir, name)
+            original = os.path.getsize(source) if os.path.exists(source) else None
+            sizes = ', '.join(f"{encoding} {entry[encoding] / 1e3:.0f}KB" for encoding, _ in ENCODINGS)
+            print(f"{static_dir}/{name}: {original / 1e3 if original else 0:.0f}KB → {entry['size'] / 1e3:.0f}KB "
+                  f"({sizes}) → {ASSET_DIR}/{entry['file']}")
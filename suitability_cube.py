@@ -0,0 +1,129 @@
+"""작물 적성 큐브 (지역 × 작물 × 적성등급)
+
+작물별 토양적성 CSV(SoilFitStat_*.csv, soil_suitability_sgg.csv)를 작물마다 나눠 읽지 않고
+하나의 밀집 배열로 만들어 두고, 지역별 추천 작물 / 작물별 최적 지역을 배열 연산으로 계산한다.
+
+    cube[지역, 작물, 등급]   면적 (ha), 등급 순서는 SUITABILITY_CLASSES
+    present[지역, 작물]      해당 지역에 그 작물 데이터가 있는지
+"""
+import numpy as np
+import pandas as pd
+
+from pnu_registry import LEVEL_DIGITS, code_levels
+
+SUITABILITY_CLASSES = ('high_Suit_Area', 'suit_Area', 'poss_Area', 'low_Suit_Area', 'etc_Area')
+CLASS_WEIGHTS = np.array([4, 3, 2, 1, 0], dtype=np.float64)  # 적성 점수 가중치 (test1 과 동일)
+
+# 순위 기준
+#   share  적지 이상(최적지 + 적지) 면적 비율
+#   score  등급 가중 평균 점수 (0~4)
+#   <등급 컬럼>  해당 등급 면적
+METRICS = ('share', 'score') + SUITABILITY_CLASSES
+
+
+class SuitabilityCube:
+    """지역 × 작물 × 적성등급 면적 배열"""
+
+    def __init__(self, codes, names, crop_codes, crop_names, cube, present):
+        self.codes = codes  # 정렬된 int64
+        self.names = names
+        self.crop_codes = crop_codes
+        self.crop_names = crop_names
+        self.cube = cube
+        self.present = present
+        self.levels = code_levels(codes)
+        self._crop_index = {code: i for i, code in enumerate(crop_codes)}
+
+        self.total = cube.sum(axis=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            valid = present & (self.total > 0)
+            self._metrics = {
+                'share': np.where(valid, (cube[:, :, 0] + cube[:, :, 1]) / self.total, np.nan),
+                'score': np.where(valid, cube @ CLASS_WEIGHTS / self.total, np.nan),
+            }
+        for k, name in enumerate(SUITABILITY_CLASSES):
+            self._metrics[name] = np.where(present, cube[:, :, k], np.nan)
+
+    @classmethod
+    def from_frames(cls, frames):
+        """작물별 토양적성 DataFrame 들로 큐브를 만드는 함수 (같은 지역/작물이 겹치면 뒤의 것을 사용)"""
+        frame = pd.concat([f[['stdg_Cd', 'bjd_Nm', 'soil_Crop_Cd', 'soil_Crop_Nm'] + list(SUITABILITY_CLASSES)]
+                           for f in frames], ignore_index=True)
+        frame = frame.drop_duplicates(['stdg_Cd', 'soil_Crop_Cd'], keep='last')
+
+        codes, region_idx = np.unique(frame['stdg_Cd'].to_numpy(dtype=np.int64), return_inverse=True)
+        crop_codes, crop_idx = np.unique(frame['soil_Crop_Cd'].astype(str).to_numpy(), return_inverse=True)
+
+        names = [''] * len(codes)
+        for i, name in zip(region_idx, frame['bjd_Nm']):
+            names[i] = name
+        crop_names = [''] * len(crop_codes)
+        for i, name in zip(crop_idx, frame['soil_Crop_Nm']):
+            crop_names[i] = name
+
+        values = frame[list(SUITABILITY_CLASSES)].apply(pd.to_numeric, errors='coerce') \
+            .fillna(0).to_numpy(dtype=np.float64)
+        cube = np.zeros((len(codes), len(crop_codes), len(SUITABILITY_CLASSES)), dtype=np.float64)
+        cube[region_idx, crop_idx] = values
+        present = np.zeros((len(codes), len(crop_codes)), dtype=bool)
+        present[region_idx, crop_idx] = True
+        return cls(codes, names, [str(c) for c in crop_codes], crop_names, cube, present)
+
+    def region_index(self, code):
+        """지역 코드(2/5/8/10자리 또는 10자리 정규화)의 행 인덱스 (없으면 -1)"""
+        code = str(code)
+        if len(code) in LEVEL_DIGITS[:3]:
+            code = code.ljust(10, '0')
+        if not code.isdigit():
+            return -1
+        row = int(np.searchsorted(self.codes, int(code)))
+        return row if row < len(self.codes) and self.codes[row] == int(code) else -1
+
+    def _entry(self, row, col):
+        areas = self.cube[row, col]
+        return {
+            'areas': {name: float(v) for name, v in zip(SUITABILITY_CLASSES, areas)},
+            'total_area': float(self.total[row, col]),
+            'share': _float(self._metrics['share'][row, col]),
+            'score': _float(self._metrics['score'][row, col]),
+        }
+
+    def crops_for_region(self, code, metric='share', n=None):
+        """지역의 작물 순위 (metric 큰 순서)"""
+        row = self.region_index(code)
+        if row < 0 or metric not in self._metrics:
+            return None
+        values = self._metrics[metric][row]
+        cols = np.flatnonzero(~np.isnan(values))
+        cols = cols[np.argsort(-values[cols], kind='stable')][:n]
+        return [dict(crop_code=self.crop_codes[c], crop_name=self.crop_names[c], value=float(values[c]),
+                     **self._entry(row, c)) for c in cols]
+
+    def regions_for_crop(self, crop_code, metric='share', level=None, n=10, parent_cd=None):
+        """작물의 최적 지역 순위 (레벨/상위 지역으로 거른 뒤 상위 n 개)"""
+        col = self._crop_index.get(crop_code)
+        if col is None or metric not in self._metrics:
+            return None
+        values = self._metrics[metric][:, col]
+        mask = ~np.isnan(values)
+        if level is not None:
+            mask &= self.levels == level
+        if parent_cd:
+            mask &= self.codes // 10 ** (10 - len(parent_cd)) == int(parent_cd)
+        rows = np.flatnonzero(mask)
+
+        keys = -values[rows]
+        if n < len(rows):
+            # 경계 값과 같은 행은 모두 후보로 남겨 같은 값이 n 과 관계없이 지역 코드 순서가 되게 함
+            candidates = keys <= np.partition(keys, n - 1)[n - 1]
+            rows, keys = rows[candidates], keys[candidates]
+        rows = rows[np.lexsort((rows, keys))][:n]
+        return [dict(stdg_Cd=str(self.codes[r]), bjd_Nm=self.names[r], value=float(values[r]),
+                     **self._entry(r, col)) for r in rows]
+
+    def crops(self):
+        return [{'soil_Crop_Cd': code, 'soil_Crop_Nm': name} for code, name in zip(self.crop_codes, self.crop_names)]
+
+
+def _float(value):
+    return None if np.isnan(value) else float(value)
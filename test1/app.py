@@ -1,12 +1,22 @@
 from fastapi import FastAPI, Query, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from typing import List
 import os
+import sys
 import glob
+import threading
 import pandas as pd
 
+# 저장소 루트의 공용 모듈 (suitability_cube, 법정동코드 레지스트리, 경계 코드 대응표)
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+from suitability_cube import METRICS, SuitabilityCube
+from pnu_registry import PnuRegistry
+from boundary_crosswalk import load_boundary
+from static_assets import ASSET_DIR, PrecompressedStaticFiles, minify_geojson, publish
+
 app = FastAPI(title="Soil Suitability Map")
 
 # CORS 설정
@@ -21,6 +31,35 @@ app.add_middleware(
 BASE_DIR = os.path.abspath(os.getcwd())
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 DATA_DIR = os.path.join(BASE_DIR, "data")
+SUITABILITY_CSV = os.path.join(DATA_DIR, "soil_suitability_sgg.csv")
+BOUNDARY_GEOJSON = os.path.join(STATIC_DIR, "data", "Si_Gun_Gu.json")
+
+# 행정구역 코드 레지스트리 (경계 코드 → 현행 법정동코드 변환에 사용)
+REGISTRY = PnuRegistry.load(os.path.join(ROOT_DIR, "pnu.csv"))
+
+# 작물 적성 큐브 (CSV 가 바뀌면 다시 만듦)
+_cube = {'mtime': None, 'cube': None}
+_cube_lock = threading.Lock()
+
+# join_key 를 붙인 경계 GeoJSON 자산 (static/assets 의 해시 이름 파일)
+_boundary_asset = {'mtime': None, 'entry': None}
+_boundary_lock = threading.Lock()
+
+
+def load_cube() -> SuitabilityCube:
+    """soil_suitability_sgg.csv 의 지역 × 작물 × 적성등급 큐브"""
+    mtime = os.path.getmtime(SUITABILITY_CSV)
+    with _cube_lock:
+        if _cube['mtime'] != mtime:
+            df = pd.read_csv(SUITABILITY_CSV, encoding='utf-8')
+            _cube['cube'] = SuitabilityCube.from_frames([df])
+            _cube['mtime'] = mtime
+        return _cube['cube']
+
+
+def load_crosswalk():
+    """시군구 경계 파일의 코드 대응표 (경계 파일이 바뀌면 다시 만듦)"""
+    return load_boundary(BOUNDARY_GEOJSON, REGISTRY)
 
 
 def _safe_join(base: str, path: str) -> str:
@@ -61,19 +100,8 @@ def list_csv(
 def get_crops():
     """작물 목록 반환"""
     try:
-        csv_path = os.path.join(DATA_DIR, "soil_suitability_sgg.csv")
-        df = pd.read_csv(csv_path, encoding='utf-8')
-
-        # 작물 목록 추출 (중복 제거)
-        crops = df[['soil_Crop_Cd', 'soil_Crop_Nm']].drop_duplicates()
-        crops_list = []
-
-        for _, row in crops.iterrows():
-            crops_list.append({
-                'code': row['soil_Crop_Cd'],
-                'name': row['soil_Crop_Nm']
-            })
-
+        cube = load_cube()
+        crops_list = [{'code': crop['soil_Crop_Cd'], 'name': crop['soil_Crop_Nm']} for crop in cube.crops()]
         return sorted(crops_list, key=lambda x: x['name'])
 
     except Exception as e:
@@ -84,57 +112,96 @@ def get_crops():
 def get_suitability_data(crop_code: str = Query(..., description="작물 코드")):
     """특정 작물의 토양 적합성 데이터 반환"""
     try:
-        csv_path = os.path.join(DATA_DIR, "soil_suitability_sgg.csv")
-        df = pd.read_csv(csv_path, encoding='utf-8')
+        cube = load_cube()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading data: {str(e)}")
 
-        # 특정 작물 필터링
-        crop_data = df[df['soil_Crop_Cd'] == crop_code]
+    # 큐브에서 작물 열만 꺼냄 (CSV 를 다시 읽거나 행 단위로 돌지 않음)
+    regions = cube.regions_for_crop(crop_code, metric='high_Suit_Area', n=len(cube.codes))
+    if not regions:
+        raise HTTPException(status_code=404, detail="Crop not found")
+    regions.sort(key=lambda region: region['stdg_Cd'])
 
-        if crop_data.empty:
-            raise HTTPException(status_code=404, detail="Crop not found")
+    # 지도 경계 피처와 코드로 조인하는 키 (경계 피처의 join_key 속성과 같은 값, 경계 밖이면 None)
+    _, crosswalk = load_crosswalk()
+    join_keys = crosswalk.join_keys_for([region['stdg_Cd'] for region in regions])
 
-        # 데이터 변환
-        result = []
-        for _, row in crop_data.iterrows():
+    result = []
+    for region, join_key in zip(regions, join_keys):
+        areas = region['areas']
+        result.append({
             # 표준화 코드를 지역명으로 매핑하기 위해 앞 5자리만 사용 (시군구 레벨)
-            region_code = str(row['stdg_Cd'])[:5] + "00000"
-
-            # 총 면적 계산
-            total_area = (row['high_Suit_Area'] + row['suit_Area'] +
-                          row['poss_Area'] + row['low_Suit_Area'] + row['etc_Area'])
-
-            # 적합성 점수 계산 (높을수록 적합)
-            if total_area > 0:
-                suitability_score = (
-                                            row['high_Suit_Area'] * 4 +
-                                            row['suit_Area'] * 3 +
-                                            row['poss_Area'] * 2 +
-                                            row['low_Suit_Area'] * 1 +
-                                            row['etc_Area'] * 0
-                                    ) / total_area
-            else:
-                suitability_score = 0
-
-            result.append({
-                'region_code': region_code,
-                'region_name': row['bjd_Nm'],
-                'high_suit_area': int(row['high_Suit_Area']),
-                'suit_area': int(row['suit_Area']),
-                'poss_area': int(row['poss_Area']),
-                'low_suit_area': int(row['low_Suit_Area']),
-                'etc_area': int(row['etc_Area']),
-                'total_area': int(total_area),
-                'suitability_score': round(suitability_score, 2)
-            })
-
-        return result
-
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error loading data: {str(e)}")
+            'region_code': region['stdg_Cd'][:5] + "00000",
+            'join_key': join_key,
+            'region_name': region['bjd_Nm'],
+            'high_suit_area': int(areas['high_Suit_Area']),
+            'suit_area': int(areas['suit_Area']),
+            'poss_area': int(areas['poss_Area']),
+            'low_suit_area': int(areas['low_Suit_Area']),
+            'etc_area': int(areas['etc_Area']),
+            'total_area': int(region['total_area']),
+            # 적합성 점수 (높을수록 적합, 면적이 없으면 0)
+            'suitability_score': round(region['score'] or 0, 2)
+        })
+
+    return result
+
+
+@app.get("/api/best-crops")
+def get_best_crops(region_code: str = Query(..., description="지역 코드 (시군구 5자리 또는 10자리)"),
+                   metric: str = Query("share", description="share, score 또는 적성등급 컬럼"),
+                   n: int = Query(10, ge=1)):
+    """지역에 적합한 작물 순위"""
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+    crops = load_cube().crops_for_region(region_code, metric, n)
+    if crops is None:
+        raise HTTPException(status_code=404, detail="Region not found")
+    return crops
+
+
+@app.get("/api/best-regions")
+def get_best_regions(crop_code: str = Query(..., description="작물 코드"),
+                     metric: str = Query("share", description="share, score 또는 적성등급 컬럼"),
+                     n: int = Query(10, ge=1)):
+    """작물에 적합한 지역 순위"""
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric: {metric}")
+    regions = load_cube().regions_for_crop(crop_code, metric, n=n)
+    if regions is None:
+        raise HTTPException(status_code=404, detail="Crop not found")
+    return regions
+
+
+@app.get("/api/boundary")
+def get_boundary():
+    """시군구 경계 GeoJSON (피처마다 데이터와 조인할 join_key 속성 포함)
+
+    좌표를 줄이고 압축해 둔 해시 이름 자산으로 리디렉트 (브라우저는 압축본을 받아 immutable 로 캐시)
+    """
+    mtime = os.path.getmtime(BOUNDARY_GEOJSON)
+    with _boundary_lock:
+        if _boundary_asset['mtime'] != mtime:
+            geojson, _ = load_crosswalk()
+            _boundary_asset['entry'] = publish(os.path.join(STATIC_DIR, ASSET_DIR), "api/boundary.json",
+                                               minify_geojson(geojson))
+            _boundary_asset['mtime'] = mtime
+    return RedirectResponse(f"/static/{ASSET_DIR}/{_boundary_asset['entry']['file']}", status_code=307)
+
+
+@app.get("/api/crosswalk")
+def get_crosswalk():
+    """경계 코드 → 현행 법정동코드 대응 (기준 시점이 달라 바뀐 코드 확인용)"""
+    _, crosswalk = load_crosswalk()
+    return {
+        'summary': crosswalk.summary(),
+        'features': [{'boundary_code': code, 'join_key': key, 'status': status}
+                     for code, key, status in zip(crosswalk.boundary_codes, crosswalk.join_keys, crosswalk.status)]
+    }
 
 
 # 정적 파일 서빙
-app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
 app.mount("/data", StaticFiles(directory=DATA_DIR), name="data")
 
 if __name__ == "__main__":
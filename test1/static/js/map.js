@@ -1,5 +1,5 @@
 // ==================== 전역 변수 ====================
-const GEO_URL = "/static/data/Si_Gun_Gu.json";
+const GEO_URL = "/api/boundary"; // 피처마다 join_key(현행 10자리 법정동코드) 포함
 const MAP_CENTER = [36.5, 127.8];
 const MAP_ZOOM = 7;
 
@@ -27,26 +27,6 @@ function hideLoading() {
   loadingEl.classList.add("hidden");
 }
 
-function normalizeRegionName(name) {
-  if (!name) return "";
-  const cleanName = name.trim();
-
-  // "시도 + 시군구" 형태에서 시군구만 추출
-  const parts = cleanName.split(" ");
-  if (parts.length >= 2) {
-    return parts[parts.length - 1]; // 마지막 부분 (시군구)
-  }
-  return cleanName;
-}
-
-function stripLastUnit(korName) {
-  if (!korName) return "";
-  const nm = String(korName).trim();
-  const last = nm.slice(-1);
-  if (["시", "군", "구"].includes(last)) return nm.slice(0, -1);
-  return nm;
-}
-
 function getColor(value, mode, minVal, maxVal) {
   if (value === null || value === undefined || isNaN(value)) {
     return "#e9ecef";
@@ -149,13 +129,31 @@ async function loadGeoJSON() {
 
 // ==================== 지도 렌더링 ====================
 
-function createDataMap(data, mode) {
-  const dataMap = new Map();
+const AREA_FIELDS = ["high_suit_area", "suit_area", "poss_area", "low_suit_area", "etc_area", "total_area"];
 
+// 같은 경계 피처에 들어가는 여러 행(예: 부천시의 옛 일반구)을 면적 합으로 합침
+function mergeByJoinKey(data) {
+  const merged = new Map();
   data.forEach(item => {
-    const regionName = normalizeRegionName(item.region_name);
-    const key = stripLastUnit(regionName);
+    if (!item.join_key) return; // 경계 파일에 없는 지역
+    const existing = merged.get(item.join_key);
+    if (!existing) {
+      merged.set(item.join_key, item);
+      return;
+    }
+    const sum = { ...existing };
+    AREA_FIELDS.forEach(field => { sum[field] = existing[field] + item[field]; });
+    const weighted = 4 * sum.high_suit_area + 3 * sum.suit_area + 2 * sum.poss_area + sum.low_suit_area;
+    sum.suitability_score = sum.total_area > 0 ? Math.round(weighted / sum.total_area * 100) / 100 : 0;
+    merged.set(item.join_key, sum);
+  });
+  return merged;
+}
+
+function createDataMap(data, mode) {
+  const dataMap = new Map();
 
+  mergeByJoinKey(data).forEach((item, key) => {
     let value;
     switch (mode) {
       case 'suitability':
@@ -203,8 +201,7 @@ function calculateMinMax(data, mode) {
 }
 
 function getStyleForFeature(feature, dataMap, mode, minVal, maxVal) {
-  const geoName = stripLastUnit(feature.properties.SIG_KOR_NM);
-  const dataItem = dataMap.get(geoName);
+  const dataItem = dataMap.get(feature.properties.join_key);
 
   if (!dataItem) {
     return {
@@ -335,7 +332,7 @@ async function renderMap() {
   if (!geojson || currentData.length === 0) return;
 
   const mode = viewModeSelect.value;
-  const { min, max } = calculateMinMax(currentData, mode);
+  const { min, max } = calculateMinMax([...mergeByJoinKey(currentData).values()], mode);
   const dataMap = createDataMap(currentData, mode);
 
   // 기존 레이어 제거
@@ -348,8 +345,7 @@ async function renderMap() {
     style: feature => getStyleForFeature(feature, dataMap, mode, min, max),
     onEachFeature: (feature, layer) => {
       const regionName = feature.properties.SIG_KOR_NM;
-      const geoName = stripLastUnit(regionName);
-      const dataItem = dataMap.get(geoName);
+      const dataItem = dataMap.get(feature.properties.join_key);
 
       layer.bindPopup(createPopupContent(regionName, dataItem, mode));
 